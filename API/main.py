@@ -3,17 +3,54 @@ API FastAPI refactorizada para clasificación de exoplanetas.
 """
 import os
 import json
-from typing import List, Dict, Any
+import time
+import hashlib
+import tempfile
+from contextlib import asynccontextmanager, contextmanager, ExitStack
+from pathlib import Path
+from typing import List, Dict, Any, Tuple, Optional, Iterator
 
 import pandas as pd
 import numpy as np
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Depends, Request, WebSocket
+from fastapi.responses import FileResponse, JSONResponse, Response, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.models.hgb_exoplanet import HGBExoplanetModel
+from src.models.importance import FeatureImportanceService
+from src.models.drift import drift_monitor
+from src.models.scoring import annotate_predictions, annotate_ensemble, format_csv_output
+from src.models.ensemble import VersionEnsemble, ensemble_members, parse_versions
+from src.models.distill import distill_version, distilled_models, load_distilled_report
+from src.models.hot_swap import ModelHolder
+from src.models.similarity import similarity_indexes
+from src.models.holdout import holdout_scores
+from src.models.promotion import promotion_gate
+from src.models.schema import SchemaError, PROCESSING_VERSION
+from src.models.streaming import PredictionStream, prediction_streams
 from src.utils.config import settings
+from src.utils.executor import run_blocking
+from src.utils.admission import AdmissionRejected, admission_gates
+from src.utils.prediction_store import prediction_store
+from src.utils.profiler import request_profiler
+from src.utils.cpu_budget import cpu_budgets, inference_budget, available_cores
+from src.utils.traffic import TrafficCaptureMiddleware, traffic_recorder
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Tareas de fondo del servidor: evicción periódica de CSV de predicciones, recarga en
+    caliente del modelo y escritura del log de tráfico.
+    """
+    prediction_store.start_background_eviction()
+    model_holder.start_watcher()
+    traffic_recorder.start()
+    yield
+    traffic_recorder.stop()
+    model_holder.stop_watcher()
+    prediction_store.stop_background_eviction()
 
 
 # Inicializar aplicación
@@ -21,6 +58,7 @@ app = FastAPI(
     title=settings.APP_NAME,
     description="API REST para clasificación automática de exoplanetas usando HistGradientBoostingClassifier. Permite entrenar modelos, realizar predicciones individuales y batch, y gestionar versiones de modelos.",
     version=settings.APP_VERSION,
+    lifespan=lifespan,
     openapi_tags=[
         {
             "name": "Model",
@@ -42,6 +80,10 @@ app = FastAPI(
             "name": "Model Versions",
             "description": "Gestión de versiones de modelos",
         },
+        {
+            "name": "Admin",
+            "description": "Estado operativo del servicio (control de admisión, perfiles de peticiones)",
+        },
     ]
 )
 
@@ -59,84 +101,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Cargar modelo al iniciar
-model = HGBExoplanetModel()
+# Captura muestreada de tráfico (TRAFFIC_CAPTURE_RATE) para reproducirlo con replay.py
+app.add_middleware(TrafficCaptureMiddleware, recorder=traffic_recorder)
+
+# Importancia de features por versión (calculada en segundo plano y cacheada)
+importance_service = FeatureImportanceService()
+
+# Cargar modelo al iniciar (versión 'latest', recargada en caliente cuando cambia el puntero)
+model_holder = ModelHolder("hgb_exoplanet_model")
 try:
-    model.load_model()
+    model_holder.load()
     print("[INFO] Modelo cargado desde archivo")
 except FileNotFoundError:
     print("[INFO] Modelo no encontrado, entrenando nuevo modelo...")
-    model.run()
+    initial_model = HGBExoplanetModel()
+    initial_model.run()
+    model_holder.publish(initial_model)
 
 
-def format_csv_output(df: pd.DataFrame, model_instance: HGBExoplanetModel) -> pd.DataFrame:
+def admission(gate_name: str, versioned: bool = True):
     """
-    Formatea el DataFrame para generar un CSV legible y bien estructurado.
+    Dependencia que reserva un cupo en la compuerta de admisión durante toda la petición.
     
     Args:
-        df: DataFrame con datos originales y predicciones
-        model_instance: Instancia del modelo usado para las predicciones
+        gate_name: Compuerta a usar (predict, predict_upload, train)
+        versioned: Si es True, el reparto justo se hace por modelo:versión de la query
         
-    Returns:
-        DataFrame formateado con columnas ordenadas y valores redondeados
+    Raises:
+        HTTPException: 429 (cola llena) o 503 (espera agotada) con cabecera Retry-After
     """
-    # Crear una copia para no modificar el original
-    formatted_df = df.copy()
-    
-    # Definir columnas de identificación (prioridad alta)
-    id_columns = ['kepid', 'kepoi_name', 'kepler_name', 'koi_disposition', 'koi_pdisposition', 'koi_score']
-    
-    # Definir columnas de predicción (nuevas)
-    prediction_columns = ['prediction_label', 'confidence']
-    
-    # Obtener columnas numéricas del modelo (excluyendo las de identificación y predicción)
-    model_columns = [col for col in model_instance.X_num.columns if col not in id_columns + prediction_columns]
-    
-    # Obtener otras columnas del dataset original
-    other_columns = [col for col in df.columns if col not in id_columns + model_columns + prediction_columns + ['predicted_disposition']]
-    
-    # Ordenar columnas: identificación, modelo, otras, predicción
-    ordered_columns = []
-    
-    # 1. Columnas de identificación (las que existen)
-    for col in id_columns:
-        if col in formatted_df.columns:
-            ordered_columns.append(col)
-    
-    # 2. Columnas del modelo
-    for col in model_columns:
-        if col in formatted_df.columns:
-            ordered_columns.append(col)
-    
-    # 3. Otras columnas del dataset
-    for col in other_columns:
-        if col not in ordered_columns:
-            ordered_columns.append(col)
-    
-    # 4. Columnas de predicción
-    for col in prediction_columns:
-        if col in formatted_df.columns:
-            ordered_columns.append(col)
-    
-    # Reordenar DataFrame
-    formatted_df = formatted_df[ordered_columns]
-    
-    # Redondear valores numéricos a 3 decimales
-    numeric_columns = formatted_df.select_dtypes(include=[np.number]).columns
-    for col in numeric_columns:
-        if col not in ['kepid', 'koi_score']:  # No redondear IDs y scores
-            formatted_df[col] = formatted_df[col].round(3)
-    
-    return formatted_df
+    gate = admission_gates[gate_name]
+
+    async def dependency(request: Request):
+        if versioned:
+            model_name = request.query_params.get("model_name", "hgb_exoplanet_model")
+            version = settings.resolve_version(model_name, request.query_params.get("version", "latest"))
+            key = f"{model_name}:{version}"
+        else:
+            key = gate_name
+
+        try:
+            await gate.acquire(key)
+        except AdmissionRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            gate.release(key, time.perf_counter() - start)
+
+    return dependency
 
 
-def load_model_by_version(model_name: str = "hgb_exoplanet_model", version: str = "latest") -> HGBExoplanetModel:
+def load_model_by_version(model_name: str = "hgb_exoplanet_model", version: str = "latest",
+                          schema_only: bool = False) -> HGBExoplanetModel:
     """
     Carga un modelo específico por versión.
     
     Args:
         model_name: Nombre del modelo
         version: Versión específica o 'latest'
+        schema_only: Si es True no lee el dataset (el esquema se toma del pipeline)
         
     Returns:
         HGBExoplanetModel cargado
@@ -157,7 +183,7 @@ def load_model_by_version(model_name: str = "hgb_exoplanet_model", version: str
         model_instance = HGBExoplanetModel()
         
         # Cargar el modelo específico
-        model_instance.load_model(model_name, version)
+        model_instance.load_model(model_name, version, schema_only=schema_only)
         
         return model_instance
         
@@ -176,6 +202,74 @@ def load_model_by_version(model_name: str = "hgb_exoplanet_model", version: str
         )
 
 
+def served_version(model_name: str, version: str) -> str:
+    """Versión concreta que atiende una petición: para 'latest', la del holder (no el puntero en disco)."""
+    if version == "latest" and model_name == model_holder.model_name and model_holder.version:
+        return model_holder.version
+    return settings.resolve_version(model_name, version)
+
+
+@contextmanager
+def serving_model(model_name: str = "hgb_exoplanet_model", version: str = "latest",
+                  schema_only: bool = False) -> Iterator[HGBExoplanetModel]:
+    """
+    Modelo para atender una petición: la versión en servicio del holder (sin leer disco y
+    con referencia contada mientras dura el bloque) o, para otras versiones, load_model_by_version.
+    """
+    if model_name == model_holder.model_name and version in ("latest", model_holder.version):
+        try:
+            with model_holder.acquire() as model_instance:
+                yield model_instance
+            return
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=f"Model not found: {str(e)}")
+    yield load_model_by_version(model_name, version, schema_only=schema_only)
+
+
+@contextmanager
+def resident_model(model_name: str, version: str) -> Iterator[HGBExoplanetModel]:
+    """
+    Versión concreta sin leer disco en cada petición: la del holder si es la servida (con
+    referencia contada durante el bloque) o, si no, de ensemble_members (cargada una vez).
+    """
+    if model_name == model_holder.model_name and version == model_holder.version:
+        with serving_model(model_name, version) as model_instance:
+            yield model_instance
+        return
+    yield ensemble_members.get(
+        model_name, version, lambda: load_model_by_version(model_name, version, schema_only=True)
+    )
+
+
+@contextmanager
+def serving_ensemble(model_name: str, versions: List[str]) -> Iterator[VersionEnsemble]:
+    """
+    Ensemble con las versiones solicitadas (sin duplicados tras resolver 'latest'), tomadas
+    de resident_model.
+    
+    Raises:
+        HTTPException: 400 si se piden demasiadas versiones, 404 si alguna no existe
+    """
+    resolved: List[str] = []
+    for version in parse_versions(versions):
+        version = served_version(model_name, version)
+        if version not in resolved:
+            resolved.append(version)
+    
+    if len(resolved) > settings.ENSEMBLE_MAX_VERSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many versions requested ({len(resolved)}). Maximum is {settings.ENSEMBLE_MAX_VERSIONS}"
+        )
+    
+    with ExitStack() as stack:
+        models: Dict[str, HGBExoplanetModel] = {}
+        for version in resolved:
+            model = stack.enter_context(resident_model(model_name, version))
+            models.setdefault(model.version, model)
+        yield VersionEnsemble(models)
+
+
 @app.get("/model/info", tags=["Model"], summary="Information about all available models")
 def model_info():
     """
@@ -197,17 +291,18 @@ def model_info():
         
         # Información del modelo actualmente cargado
         current_model_info = None
-        if model.pipe is not None:
+        if model_holder.version is not None:
             # Extraer solo el nombre del archivo del dataset (sin ruta completa)
             dataset_path = settings.get_dataset_path()
             dataset_name = os.path.basename(dataset_path) if dataset_path else "unknown"
             
-            current_model_info = {
-                "name": model.__class__.__name__,
-                "version": model.version or "unknown",
-                "dataset_name": dataset_name,  # Cambiado de "trained_on" a "dataset_name" para mayor claridad
-                "classes": list(model.pipe.classes_) if model.pipe else []
-            }
+            with model_holder.acquire() as model:
+                current_model_info = {
+                    "name": model.__class__.__name__,
+                    "version": model.version or "unknown",
+                    "dataset_name": dataset_name,  # Cambiado de "trained_on" a "dataset_name" para mayor claridad
+                    "classes": list(model.pipe.classes_) if model.pipe else []
+                }
         
         # Resumen de cada modelo
         models_summary = []
@@ -253,11 +348,16 @@ def model_info():
         raise HTTPException(status_code=500, detail=f"Error getting model information: {str(e)}")
 
 
-@app.post("/predict", tags=["Predict"], summary="Individual exoplanet prediction")
+@app.post("/predict", tags=["Predict"], summary="Individual exoplanet prediction", dependencies=[Depends(admission("predict"))])
 def predict(
     data: Dict[str, List[Dict[str, float]]],
     model_name: str = Query("hgb_exoplanet_model", description="Name of the model to use"),
-    version: str = Query("latest", description="Specific version of the model or 'latest'")
+    version: str = Query("latest", description="Specific version of the model or 'latest'"),
+    explain: bool = Query(False, description="Include the top contributing features (TreeSHAP) for each prediction"),
+    top_k: int = Query(5, ge=1, le=50, description="Number of contributing features returned when explain=true"),
+    versions: Optional[List[str]] = Query(None, description="Several versions for soft-voting ensemble scoring (repeated or comma-separated); overrides 'version'"),
+    tier: str = Query("full", pattern="^(full|fast)$", description="'full' model or 'fast' distilled model with fallback to the full model"),
+    fallback_threshold: Optional[float] = Query(None, ge=0.0, le=1.0, description="With tier=fast, rows whose confidence is below this go to the full model (default: FAST_TIER_THRESHOLD)")
 ):
     """
     Realiza predicciones individuales para uno o más exoplanetas usando una versión específica del modelo.
@@ -266,9 +366,22 @@ def predict(
         data: Diccionario con lista de objetos de exoplanetas, cada uno con características numéricas
         model_name: Nombre del modelo a usar (default: hgb_exoplanet_model)
         version: Versión específica del modelo o 'latest' (default: latest)
+        explain: Si es true, agrega "top_features" con las contribuciones TreeSHAP a la clase predicha
+        top_k: Número de features devueltas en "top_features" (default: 5)
+        versions: Varias versiones (ej: latest,v1.0.1); la entrada se alinea una vez por esquema,
+            cada versión se puntúa en paralelo y se promedian las probabilidades (voto suave)
+        tier: "full" (modelo completo) o "fast" (modelo destilado de la versión; las filas con
+            confianza menor a fallback_threshold se recalculan con el modelo completo)
+        fallback_threshold: Umbral de confianza del tier fast (default: FAST_TIER_THRESHOLD)
         
     Returns:
-        Lista de predicciones con clase y probabilidades para cada exoplaneta
+        Lista de predicciones con clase y probabilidades para cada exoplaneta. Con versions,
+        clase y probabilidades son las del ensemble y "versions" trae el detalle por versión.
+        "validation" informa las features ausentes (se imputan), las columnas ignoradas y, por
+        columna, valores no numéricos, infinitos y fuera del rango de entrenamiento
+        
+    Raises:
+        422: Con SCHEMA_STRICT, si hay valores no numéricos o infinitos
         
     Example:
         ```json
@@ -290,47 +403,308 @@ def predict(
     if not user_data:
         raise HTTPException(status_code=400, detail="No data provided for prediction")
     
+    if versions:
+        if explain:
+            raise HTTPException(status_code=400, detail="explain is not supported together with versions")
+        return predict_ensemble(user_data, model_name, versions)
+    
+    if tier == "fast":
+        if explain:
+            raise HTTPException(status_code=400, detail="explain is only available with tier=full")
+        threshold = settings.FAST_TIER_THRESHOLD if fallback_threshold is None else fallback_threshold
+        return predict_fast(user_data, model_name, version, threshold)
+    
     try:
         # Cargar modelo específico por versión
-        model_instance = load_model_by_version(model_name, version)
-        
-        X_user = pd.DataFrame(user_data)
-        # Asegurar que las columnas coincidan con el modelo
-        X_user = X_user.reindex(columns=model_instance.X_num.columns, fill_value=0.0)
+        with serving_model(model_name, version) as model_instance:
+            # Alinear con el esquema del modelo: features ausentes o no numéricas -> NaN (imputadas)
+            X_user, validation = model_instance.validate_input(pd.DataFrame(user_data), strict=settings.SCHEMA_STRICT)
+            
+            # Predicciones
+            y_pred = model_instance.predict(X_user)
+            y_proba = model_instance.predict_proba(X_user)
+            class_names = list(model_instance.pipe.classes_)
+            explanations = model_instance.explain(X_user, predicted=y_pred, top_k=top_k) if explain else None
+            drift_monitor.observe(model_name, model_instance.version, X_user)
+            
+            predictions = []
+            for i, pred in enumerate(y_pred):
+                probas = {class_names[j]: float(y_proba[i][j]) for j in range(len(class_names))}
+                prediction = {
+                    "class": pred,
+                    "probabilities": probas
+                }
+                if explanations is not None:
+                    prediction["top_features"] = explanations[i]
+                predictions.append(prediction)
         
-        # Predicciones
-        y_pred = model_instance.predict(X_user)
-        y_proba = model_instance.predict_proba(X_user)
-        class_names = list(model_instance.pipe.classes_)
+        return {
+            "predictions": predictions,
+            "model_info": {
+                "model_name": model_name,
+                "version": model_instance.version,
+                "used_model": f"{model_name}:{model_instance.version}"
+            },
+            "validation": validation
+        }
+    
+    except HTTPException:
+        raise
+    except SchemaError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "validation": e.report})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Prediction error: {str(e)}")
+
+
+def predict_ensemble(user_data: List[Dict[str, float]], model_name: str, versions: List[str]) -> Dict[str, Any]:
+    """Predicción de /predict con varias versiones: probabilidades por versión y promedio."""
+    try:
+        with serving_ensemble(model_name, versions) as ensemble:
+            X_user = pd.DataFrame(user_data)
+            X_primary, validation = ensemble.primary.validate_input(X_user, strict=settings.SCHEMA_STRICT)
+            result = ensemble.score(X_user, validated=X_primary)
+        drift_monitor.observe(model_name, ensemble.versions[0], X_primary)
         
+        classes = result["classes"]
         predictions = []
-        for i, pred in enumerate(y_pred):
-            probas = {class_names[j]: float(y_proba[i][j]) for j in range(len(class_names))}
+        for i, pred in enumerate(result["predicted"]):
             predictions.append({
                 "class": pred,
-                "probabilities": probas
+                "probabilities": {c: float(result["mean"][i, j]) for j, c in enumerate(classes)},
+                "versions": {
+                    version: {
+                        "class": classes[int(proba[i].argmax())],
+                        "probabilities": {c: float(proba[i, j]) for j, c in enumerate(classes)}
+                    }
+                    for version, proba in result["per_version"].items()
+                }
             })
         
         return {
             "predictions": predictions,
             "model_info": {
                 "model_name": model_name,
-                "version": model_instance.version,
-                "used_model": f"{model_name}:{model_instance.version}"
-            }
+                "versions": ensemble.versions,
+                "ensemble": "soft_voting",
+                "shared_schema": result["shared_schema"],
+                "used_model": ", ".join(f"{model_name}:{v}" for v in ensemble.versions)
+            },
+            "validation": validation
         }
     
     except HTTPException:
         raise
+    except SchemaError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "validation": e.report})
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Prediction error: {str(e)}")
 
 
-@app.post("/predict/upload", tags=["Predict"], summary="Batch prediction via CSV file")
+def predict_fast(user_data: List[Dict[str, float]], model_name: str, version: str, threshold: float) -> Dict[str, Any]:
+    """
+    Predicción de /predict con el modelo destilado de la versión; las filas con confianza
+    menor al umbral se recalculan con el modelo completo. La entrada se valida una vez con
+    el esquema de la versión y esa matriz usan ambos modelos.
+    """
+    try:
+        resolved_version = served_version(model_name, version)
+        if not settings.version_exists(model_name, resolved_version):
+            raise HTTPException(status_code=404, detail=f"Version '{version}' not found for model '{model_name}'")
+        
+        student = distilled_models.get(model_name, resolved_version)
+        if student is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No distilled model for '{model_name}' version '{resolved_version}'. "
+                       f"Create it with POST /model-info/{model_name}/{resolved_version}/distilled"
+            )
+        
+        with resident_model(model_name, resolved_version) as full_model:
+            # Mismo esquema que el tier full: features ausentes o no numéricas -> NaN (el HGB
+            # destilado maneja los faltantes); la misma matriz sirve al destilado y al completo
+            X_user, validation = full_model.validate_input(pd.DataFrame(user_data), strict=settings.SCHEMA_STRICT)
+            features = list(student.feature_names_in_)
+            X_student = X_user if list(X_user.columns) == features else X_user.reindex(columns=features)
+            with inference_budget.limit():
+                y_proba = student.predict_proba(X_student)
+            class_names = list(student.classes_)
+            
+            # Filas poco seguras: volver al modelo completo
+            fallback = y_proba.max(axis=1) < threshold
+            if fallback.any():
+                y_proba[fallback] = full_model.predict_proba(X_user[fallback])
+        drift_monitor.observe(model_name, resolved_version, X_user)
+        
+        predictions = []
+        for i, probas in enumerate(y_proba):
+            predictions.append({
+                "class": class_names[int(probas.argmax())],
+                "probabilities": {class_names[j]: float(probas[j]) for j in range(len(class_names))},
+                "tier": "full" if fallback[i] else "fast"
+            })
+        
+        return {
+            "predictions": predictions,
+            "model_info": {
+                "model_name": model_name,
+                "version": resolved_version,
+                "used_model": f"{model_name}:{resolved_version}",
+                "tier": "fast",
+                "fallback_threshold": threshold,
+                "fallback_rows": int(fallback.sum())
+            },
+            "validation": validation
+        }
+    
+    except HTTPException:
+        raise
+    except SchemaError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "validation": e.report})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Prediction error: {str(e)}")
+
+
+@app.websocket("/ws/predict")
+async def predict_stream(
+    websocket: WebSocket,
+    model_name: str = Query("hgb_exoplanet_model", description="Name of the model to use"),
+    version: str = Query("latest", description="Specific version of the model or 'latest'"),
+    binary_dtype: str = Query("float32", pattern="^(float32|float64)$", description="Dtype of binary frames (requests and responses)")
+):
+    """
+    Canal WebSocket de predicción en streaming para clientes que puntúan fila a fila.
+    
+    La conexión queda ligada a la versión resuelta al conectar ('latest' se fija a la versión
+    en servicio en ese momento y se mantiene aunque haya una recarga en caliente). Al conectar
+    el servidor envía {"type": "ready", ...} con la versión, el orden de features y las clases.
+    
+    Frames del cliente:
+        - texto: un objeto JSON (una fila) o una lista de objetos, como los de /predict
+        - binario: matriz (n, features) little-endian en binary_dtype, en el orden de "features";
+          NaN = valor faltante
+    
+    El servidor agrupa las filas que llegan en lotes (STREAM_MAX_BATCH_ROWS / STREAM_MAX_WAIT_MS)
+    y responde cada frame en orden de llegada: JSON {"seq", "predictions"} para frames de texto,
+    probabilidades (n, clases) en binary_dtype para frames binarios y {"seq", "error"} para
+    frames inválidos.
+    
+    Args:
+        model_name: Nombre del modelo a usar (default: hgb_exoplanet_model)
+        version: Versión específica del modelo o 'latest' (default: latest)
+        binary_dtype: float32 (compacto, default) o float64
+    """
+    with ExitStack() as stack:
+        try:
+            model_instance = stack.enter_context(serving_model(model_name, version, schema_only=True))
+        except HTTPException as e:
+            await websocket.close(code=1008, reason=str(e.detail)[:120])
+            return
+        
+        features = list(model_instance.X_num.columns)
+        classes = list(model_instance.pipe.classes_)
+        resolved_version = model_instance.version
+        
+        def score(X: np.ndarray) -> np.ndarray:
+            X_user = pd.DataFrame(X, columns=features)
+            proba = model_instance.predict_proba(X_user)
+            drift_monitor.observe(model_name, resolved_version, X_user)
+            return proba
+        
+        await websocket.accept()
+        stream = PredictionStream(websocket, score, features, classes, binary_dtype)
+        if not prediction_streams.open(stream, model_name, resolved_version):
+            await websocket.close(code=1013, reason="Too many streaming connections")
+            return
+        try:
+            await websocket.send_text(json.dumps({
+                "type": "ready",
+                "model_name": model_name,
+                "version": resolved_version,
+                "features": features,
+                "classes": [str(c) for c in classes],
+                "binary_dtype": binary_dtype,
+                "max_batch_rows": stream.max_batch_rows
+            }))
+            await stream.run()
+        finally:
+            prediction_streams.close(stream)
+
+
+@app.post("/similar", tags=["Predict"], summary="Nearest known KOIs in the model's feature space", dependencies=[Depends(admission("predict"))])
+def similar(
+    data: Dict[str, List[Dict[str, float]]],
+    model_name: str = Query("hgb_exoplanet_model", description="Name of the model whose feature space is used"),
+    version: str = Query("latest", description="Specific version of the model or 'latest'"),
+    k: int = Query(5, ge=1, le=100, description="Number of neighbours per object"),
+    disposition: Optional[str] = Query(None, description="Only return KOIs with this disposition (e.g. CONFIRMED)")
+):
+    """
+    Busca los KOIs conocidos del catálogo más parecidos a cada objeto enviado, en el espacio
+    de features de la versión (imputado con su pipeline y escalado).
+    
+    El índice se guarda con la versión (similarity_index.npz); las versiones antiguas lo
+    construyen en la primera consulta. Las entrenadas fuera de memoria indexan la muestra
+    del entrenamiento (OOC_SKETCH_ROWS filas) en lugar del catálogo completo.
+    
+    Args:
+        data: Diccionario con lista de objetos (mismo formato que /predict); las features
+            faltantes se imputan
+        model_name: Nombre del modelo
+        version: Versión específica del modelo o 'latest'
+        k: Vecinos por objeto
+        disposition: Filtrar por disposición (CANDIDATE, CONFIRMED, FALSE_POSITIVE)
+        
+    Returns:
+        Por objeto, lista de vecinos (kepid, kepoi_name, kepler_name, disposition, distance)
+        ordenada por distancia
+        
+    Raises:
+        400: Sin datos
+        404: Si la versión no existe
+    """
+    user_data = data.get("data", [])
+    if not user_data:
+        raise HTTPException(status_code=400, detail="No data provided for similarity search")
+    
+    try:
+        resolved_version = settings.resolve_version(model_name, version)
+        if not settings.version_exists(model_name, resolved_version):
+            raise HTTPException(status_code=404, detail=f"Version '{version}' not found for model '{model_name}'")
+        
+        index = similarity_indexes.get(model_name, resolved_version)
+        start = time.perf_counter()
+        neighbors = index.query(pd.DataFrame(user_data), k=k, disposition=disposition)
+        
+        return {
+            "neighbors": neighbors,
+            "model_info": {
+                "model_name": model_name,
+                "version": resolved_version,
+                "used_model": f"{model_name}:{resolved_version}"
+            },
+            "index": {
+                "rows": len(index),
+                "features": len(index.features),
+                "query_ms": round((time.perf_counter() - start) * 1e3, 3)
+            }
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Similarity search error: {str(e)}")
+
+
+@app.post("/predict/upload", tags=["Predict"], summary="Batch prediction via CSV file", dependencies=[Depends(admission("predict_upload"))])
 async def predict_upload(
+    request: Request,
     file: UploadFile = File(...),
     model_name: str = Query("hgb_exoplanet_model", description="Name of the model to use"),
-    version: str = Query("latest", description="Specific version of the model or 'latest'")
+    version: str = Query("latest", description="Specific version of the model or 'latest'"),
+    explain: bool = Query(False, description="Add a 'top_features' column with the top contributing features (TreeSHAP)"),
+    top_k: int = Query(5, ge=1, le=50, description="Number of contributing features per row when explain=true"),
+    profile: bool = Query(False, description="Profile this request (also enabled with the 'X-Profile: 1' header)"),
+    versions: Optional[List[str]] = Query(None, description="Several versions for soft-voting ensemble scoring (repeated or comma-separated); overrides 'version'")
 ):
     """
     Realiza predicciones batch subiendo un archivo CSV con datos de exoplanetas usando una versión específica del modelo.
@@ -340,73 +714,181 @@ async def predict_upload(
         file: Archivo CSV con columnas de características de exoplanetas
         model_name: Nombre del modelo a usar (default: hgb_exoplanet_model)
         version: Versión específica del modelo o 'latest' (default: latest)
+        explain: Si es true, agrega la columna top_features al CSV
+        top_k: Número de features por fila en top_features (default: 5)
+        profile: Si es true (o con la cabecera X-Profile: 1) se perfila el procesamiento con cProfile
+        versions: Varias versiones para un ensemble por voto suave; el CSV agrega
+            prediction_label_<versión> y confidence_<versión>
         
     Returns:
         - total_planets: Número total de exoplanetas procesados
         - class_distribution: Distribución de clases predichas
         - download_url: URL para descargar el CSV con predicciones
+        - cached: True si el mismo archivo ya se había procesado con este modelo/versión y opciones
         - model_info: Información del modelo utilizado
+        - validation: Features ausentes (imputadas), columnas ignoradas y problemas por columna
+          (valores no numéricos, infinitos o fuera del rango de entrenamiento)
         - csv_info: Información sobre el formato del CSV generado
+        - profile_id: (sólo si se perfiló) id del perfil descargable en /admin/profiles/{profile_id}
         
     CSV Output Features:
         - Columnas ordenadas lógicamente: identificación, modelo, otras, predicción
         - prediction_label: Predicted class (CONFIRMED, CANDIDATE, FALSE_POSITIVE)
         - confidence: Porcentaje de confianza de la predicción
+        - top_features: (opcional) "feature:contribución" separadas por "; " sobre la clase predicha
         - generated_at: Marca de tiempo de generación
         - Formato UTF-8 con separador de coma
         - Valores numéricos redondeados a 3 decimales
         - Compatible con Excel y Google Sheets
         
     Note:
-        El archivo CSV debe contener las columnas de características numéricas
-        que el modelo espera (koi_period, koi_duration, koi_depth, etc.)
+        El archivo CSV debe contener columnas de características numéricas que el modelo
+        espera (koi_period, koi_duration, koi_depth, etc.); las ausentes y las celdas no
+        numéricas se tratan como faltantes (con SCHEMA_STRICT las celdas inválidas dan 422)
+        El archivo se procesa fuera del event loop y su tamaño máximo es UPLOAD_MAX_BYTES (413 si se excede).
     """
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="File must be CSV")
+    if versions and explain:
+        raise HTTPException(status_code=400, detail="explain is not supported together with versions")
 
+    upload_path = None
     try:
-        # Cargar modelo específico por versión
-        model_instance = load_model_by_version(model_name, version)
+        # Volcar el archivo a disco por bloques (sin cargarlo entero en memoria)
+        upload_path, content_hash = await spool_upload(file)
+        
+        # Misma entrada + mismo modelo/versión + mismas opciones => mismo artefacto. 'latest' se
+        # fija a la versión del holder y se puntúa con esa misma versión aunque cambie el puntero
+        if versions:
+            versions = list(dict.fromkeys(served_version(model_name, v) for v in parse_versions(versions)))
+            resolved_version = ",".join(versions)
+        else:
+            version = served_version(model_name, version)
+            resolved_version = version
+        output_key = prediction_store.make_key(
+            content_hash, model_name, resolved_version, explain=explain, top_k=top_k if explain else None,
+            processing=PROCESSING_VERSION, strict=settings.SCHEMA_STRICT
+        )
+        # Una petición perfilada siempre se recalcula para medir el procesamiento completo
+        profiled = request_profiler.should_profile(request.headers, profile)
+        if not profiled:
+            cached = await run_blocking(prediction_store.lookup, output_key)
+            if cached is not None:
+                return {**cached["response"], "cached": True}
+        
+        # Parseo, inferencia y escritura del CSV fuera del event loop
+        args = (upload_path, file.filename, model_name, version, explain, top_k, output_key, versions)
+        if not profiled:
+            return await run_blocking(score_csv_file, *args)
+        
+        response, profile_id = await run_blocking(
+            request_profiler.run, f"POST /predict/upload {file.filename}", score_csv_file, *args
+        )
+        return {**response, "profile_id": profile_id}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+    finally:
+        if upload_path is not None:
+            upload_path.unlink(missing_ok=True)
+
+
+async def spool_upload(file: UploadFile) -> Tuple[Path, str]:
+    """
+    Copia el archivo subido a un temporal en disco por bloques, respetando UPLOAD_MAX_BYTES.
+    
+    Returns:
+        Ruta del temporal y hash SHA-256 del contenido
+        
+    Raises:
+        HTTPException: 413 si el archivo supera el tamaño máximo
+    """
+    fd, name = tempfile.mkstemp(prefix="upload_", suffix=".csv")
+    path = Path(name)
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.UPLOAD_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size is {settings.UPLOAD_MAX_BYTES // (1024 * 1024)} MB"
+                    )
+                digest.update(chunk)
+                await run_blocking(out.write, chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path, digest.hexdigest()
+
+
+def read_uploaded_csv(path: Path) -> pd.DataFrame:
+    """Lee el CSV subido con el parser C y recurre al parser Python si el formato no es estándar."""
+    try:
+        return pd.read_csv(path, comment="#", quotechar='"')
+    except pd.errors.ParserError:
+        return pd.read_csv(path, comment="#", quotechar='"', engine="python")
+
+
+def score_csv_file(
+    path: Path,
+    filename: str,
+    model_name: str,
+    version: str,
+    explain: bool = False,
+    top_k: int = 5,
+    output_key: Optional[str] = None,
+    versions: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Etapas bloqueantes de /predict/upload: parseo, carga del modelo, inferencia y escritura del CSV.
+    
+    El CSV se guarda en el almacén de predicciones bajo output_key (hash del contenido,
+    modelo, versión y opciones) para reutilizarlo si se vuelve a subir el mismo archivo.
+    Con versions, la entrada se parsea y alinea una vez y se puntúa con cada versión (ensemble).
+    
+    Returns:
+        Respuesta del endpoint /predict/upload
+    """
+    with ExitStack() as stack:
+        # Cargar modelo específico por versión (o las versiones del ensemble)
+        ensemble = stack.enter_context(serving_ensemble(model_name, versions)) if versions else None
+        model_instance = ensemble.primary if ensemble else stack.enter_context(serving_model(model_name, version))
+        required_columns = ensemble.required_columns() if ensemble else list(model_instance.X_num.columns)
         
         # Leer archivo
-        content = await file.read()
-        import io
-        df = pd.read_csv(io.BytesIO(content), comment="#", quotechar='"', engine="python")
+        df = read_uploaded_csv(path)
         
         if df.empty:
             raise HTTPException(status_code=400, detail="CSV file is empty. Please verify that the file contains data.")
 
-        # Verificar columnas necesarias para predicción
-        missing_columns = [col for col in model_instance.X_num.columns if col not in df.columns]
-        if missing_columns:
+        # Sin ninguna columna del modelo no hay nada que puntuar (las ausentes se imputan)
+        if not pd.Index(required_columns).isin(df.columns).any():
             raise HTTPException(
                 status_code=400, 
-                detail=f"Missing required columns for prediction: {missing_columns[:5]}{'...' if len(missing_columns) > 5 else ''}. "
-                       f"The file must contain at least these columns: {list(model_instance.X_num.columns[:10])}{'...' if len(model_instance.X_num.columns) > 10 else ''}"
+                detail=f"No feature columns found for prediction. "
+                       f"The file must contain some of these columns: {required_columns[:10]}{'...' if len(required_columns) > 10 else ''}"
             )
 
-        # Preparar datos para predicción
-        X_user = df.reindex(columns=model_instance.X_num.columns, fill_value=0.0)
-
-        # Predicciones
-        y_pred = model_instance.predict(X_user)
-        
-        # Obtener probabilidades si el modelo las soporta
+        # Preparar datos para predicción: conversión por columna y reporte de problemas
         try:
-            y_proba = model_instance.predict_proba(X_user)
-            # Obtener la probabilidad máxima (confianza)
-            confidence = np.max(y_proba, axis=1) * 100  # Convertir a porcentaje
-        except AttributeError:
-            # Si el modelo no soporta predict_proba
-            confidence = [np.nan] * len(y_pred)
+            X_user, validation = model_instance.validate_input(df, strict=settings.SCHEMA_STRICT)
+        except SchemaError as e:
+            raise HTTPException(status_code=422, detail={"message": str(e), "validation": e.report})
 
-        # Agregar columnas de predicción
-        df["prediction_label"] = y_pred
-        df["confidence"] = confidence
-        
-        # Agregar marca de tiempo
-        from datetime import datetime
-        df["generated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # Predicciones, confianza, (opcional) explicaciones y marca de tiempo
+        if ensemble:
+            annotate_ensemble(df, ensemble.score(df, validated=X_user))
+        else:
+            annotate_predictions(df, X_user, model_instance, explain=explain, top_k=top_k)
+        drift_monitor.observe(model_name, model_instance.version, X_user)
 
         # Formatear CSV para salida
         formatted_df = format_csv_output(df, model_instance)
@@ -415,35 +897,50 @@ async def predict_upload(
         stats = df["prediction_label"].value_counts().to_dict()
         total = len(df)
 
-        # Guardar CSV formateado con información de versión
-        output_filename = f"{os.path.splitext(file.filename)[0]}_predictions_{model_instance.version}.csv"
-        output_path = settings.get_output_path(output_filename)
-        
-        # Guardar con formato UTF-8 y separador de coma
-        formatted_df.to_csv(output_path, index=False, encoding='utf-8', sep=',')
+        # Guardar CSV formateado (direccionado por contenido) con información de versión
+        used_version = ",".join(ensemble.versions) if ensemble else settings.resolve_version(model_name, model_instance.version)
+        if output_key is None:
+            output_key = prediction_store.make_key(
+                hashlib.sha256(path.read_bytes()).hexdigest(), model_name,
+                used_version, explain=explain, top_k=top_k if explain else None,
+                processing=PROCESSING_VERSION, strict=settings.SCHEMA_STRICT
+            )
+        output_filename = prediction_store.filename(output_key)
 
-        return {
-            "total_planets": total,
-            "class_distribution": stats,
-            "download_url": f"/download/{output_filename}",
-            "model_info": {
+        if ensemble:
+            model_info = {
+                "model_name": model_name,
+                "versions": ensemble.versions,
+                "ensemble": "soft_voting",
+                "used_model": ", ".join(f"{model_name}:{v}" for v in ensemble.versions)
+            }
+        else:
+            model_info = {
                 "model_name": model_name,
                 "version": model_instance.version,
                 "used_model": f"{model_name}:{model_instance.version}"
-            },
+            }
+
+        response = {
+            "total_planets": total,
+            "class_distribution": stats,
+            "download_url": f"/download/{output_filename}",
+            "model_info": model_info,
+            "validation": validation,
             "csv_info": {
                 "columns": len(formatted_df.columns),
                 "formatted": True,
                 "encoding": "UTF-8",
                 "separator": ",",
-                "decimal_places": 3
+                "decimal_places": 3,
+                "explained": explain
             }
         }
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+        prediction_store.save(output_key, formatted_df, {
+            "download_name": f"{os.path.splitext(filename)[0]}_predictions_{used_version.replace(',', '+')}.csv",
+            "response": response
+        })
+        return {**response, "cached": False}
 
 
 @app.get("/download/{filename}", tags=["Predict"], summary="Download prediction file")
@@ -463,25 +960,42 @@ def download(filename: str):
     file_path = settings.get_output_path(filename)
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(path=file_path, filename=filename, media_type='text/csv')
+    download_name = prediction_store.download_name(filename) or filename
+    return FileResponse(path=file_path, filename=download_name, media_type='text/csv')
 
 
-@app.post("/train", tags=["Train"], summary="Retrain model with new hyperparameters")
-def train(data: Dict[str, Any]):
+@app.post("/train", tags=["Train"], summary="Retrain model with new hyperparameters", dependencies=[Depends(admission("train", versioned=False))])
+def train(
+    data: Dict[str, Any],
+    force: bool = Query(False, description="Train even if a version with the same data, schema and hyperparameters exists")
+):
     """
     Reentrena el modelo con nuevos hiperparámetros y crea una nueva versión.
     
+    Si ya existe una versión entrenada con el mismo dataset (contenido), esquema de features,
+    hiperparámetros, semilla y versión de scikit-learn, se devuelve esa versión sin entrenar,
+    salvo con force=true.
+    
+    La versión pasa a ser 'latest' sólo si supera la puerta de promoción: tamaño, tiempo de
+    carga y latencia (fila a fila y por lote) medidos frente a la versión actual sobre las
+    mismas filas, y exactitud (PROMOTION_*). Si no la supera queda guardada y puede
+    promoverse con POST /model-info/{model_name}/{version}/promote.
+    
     Args:
         data: Diccionario con hiperparámetros opcionales:
             - learning_rate: Tasa de aprendizaje (float)
             - max_leaf_nodes: Número máximo de nodos hoja (int)
             - min_samples_leaf: Mínimo de muestras por hoja (int)
             - early_stopping: Habilitar parada temprana (bool)
+        force: Entrenar aunque exista una versión con la misma huella
         
     Returns:
-        - status: Estado del entrenamiento
-        - model_version: Nueva versión del modelo creada
+        - status: "completed" (nueva versión) o "reused" (versión existente con la misma huella)
+        - model_version: Versión del modelo creada o reutilizada
+        - promoted: Si la versión pasó a ser 'latest'
+        - promotion: Mediciones, límites y resultado de cada control de la puerta
         - used_params: Parámetros utilizados en el entrenamiento
+        - fingerprint: Huella del entrenamiento
         
     Example:
         ```json
@@ -506,23 +1020,64 @@ def train(data: Dict[str, Any]):
             early_stopping=data.get("early_stopping", settings.DEFAULT_EARLY_STOPPING)
         )
 
-        # Entrenamiento completo
-        new_model.run()
+        # Entrenamiento completo o reutilización (publica la versión en disco de forma atómica
+        # si pasa la puerta de promoción)
+        new_model.run(force=force)
 
-        # Actualizar modelo global
-        global model
-        model = new_model
+        # Ponerla en servicio en este proceso sin esperar al watcher
+        if new_model.promotion["promoted"]:
+            model_holder.publish(new_model)
 
         return {
-            "status": "completed",
-            "model_version": model.version,
-            "used_params": model.get_hyperparameters()
+            "status": "reused" if new_model.reused else "completed",
+            "model_version": new_model.version,
+            "promoted": new_model.promotion["promoted"],
+            "promotion": new_model.promotion,
+            "used_params": new_model.get_hyperparameters(),
+            "fingerprint": new_model.fingerprint["digest"]
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Training error: {str(e)}")
 
 
+@app.post("/train/preview", tags=["Train"], summary="Quick training preview on a star-grouped stratified subsample", dependencies=[Depends(admission("train_preview", versioned=False))])
+def train_preview(
+    data: Optional[Dict[str, Any]] = None,
+    sample_size: int = Query(None, ge=100, description="Rows of the subsample (default: PREVIEW_SAMPLE_SIZE)"),
+    n_bootstrap: int = Query(None, ge=0, le=2000, description="Star-level bootstrap resamples for 95% confidence intervals (0 = none)"),
+    save: bool = Query(False, description="Save the preview model as a new version")
+):
+    """
+    Entrena un modelo de prueba sobre una submuestra agrupada por estrella y estratificada por
+    clase, y devuelve métricas aproximadas en segundos. Por defecto no crea ninguna versión.
+    
+    Args:
+        data: Hiperparámetros opcionales (mismos que /train)
+        sample_size: Filas de la submuestra
+        n_bootstrap: Remuestreos por estrella para intervalos de confianza del 95%
+        save: Si es true, guarda el modelo como una nueva versión
+        
+    Returns:
+        - metrics: accuracy y F1 macro sobre el test de la submuestra
+        - confidence_intervals: Intervalos del 95% (si n_bootstrap > 0)
+        - sample_rows, train_rows, test_rows, duration_seconds, hyperparameters
+    """
+    data = data or {}
+    try:
+        preview_model = HGBExoplanetModel(
+            learning_rate=data.get("learning_rate", settings.DEFAULT_LEARNING_RATE),
+            max_leaf_nodes=data.get("max_leaf_nodes", settings.DEFAULT_MAX_LEAF_NODES),
+            min_samples_leaf=data.get("min_samples_leaf", settings.DEFAULT_MIN_SAMPLES_LEAF),
+            early_stopping=data.get("early_stopping", settings.DEFAULT_EARLY_STOPPING)
+        )
+        result = preview_model.preview(sample_size=sample_size, n_bootstrap=n_bootstrap, save=save)
+        return {"status": "completed", "saved": save, **result}
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Preview training error: {str(e)}")
+
+
 @app.get("/model-info/{model_name}", tags=["Model Info"], summary="Detailed information about a specific model")
 def get_model_info(model_name: str):
     """
@@ -643,6 +1198,10 @@ def get_model_version_info(model_name: str, version: str):
         - version: Versión consultada
         - metrics: Métricas de clasificación
         - confusion_matrix: Matriz de confusión
+        - training: Telemetría del entrenamiento (tiempos, CPU y pico de memoria por etapa,
+          n_iter, tamaño de artefactos, filas y features) o null si la versión no la registró
+        - promotion: Resultado de la puerta de promoción (mediciones frente a 'latest' y
+          controles) o null si la versión no pasó por ella
         - files: Rutas relativas de los archivos
         
     Raises:
@@ -675,6 +1234,18 @@ def get_model_version_info(model_name: str, version: str):
         # Cargar matriz de confusión
         confusion_matrix = np.load(paths["matrix_path"]).tolist()
         
+        # Cargar telemetría de entrenamiento (versiones anteriores no la tienen)
+        training = None
+        if paths["metadata_path"].exists():
+            with open(paths["metadata_path"], "r") as f:
+                training = json.load(f)
+        
+        # Resultado de la puerta de promoción (versiones anteriores no lo tienen)
+        promotion = None
+        if paths["promotion_path"].exists():
+            with open(paths["promotion_path"], "r") as f:
+                promotion = json.load(f)
+        
         # Verificar si el modelo existe (opcional)
         model_exists = paths["model_path"].exists()
         
@@ -683,10 +1254,15 @@ def get_model_version_info(model_name: str, version: str):
             "version": version,
             "metrics": metrics,
             "confusion_matrix": confusion_matrix,
+            "training": training,
+            "promotion": promotion,
             "files": {
                 "model": str(paths["model_path"].relative_to(settings.BASE_DIR)) if model_exists else None,
                 "metrics": str(paths["metrics_path"].relative_to(settings.BASE_DIR)),
-                "matrix": str(paths["matrix_path"].relative_to(settings.BASE_DIR))
+                "matrix": str(paths["matrix_path"].relative_to(settings.BASE_DIR)),
+                "metadata": str(paths["metadata_path"].relative_to(settings.BASE_DIR)) if training is not None else None,
+                "similarity_index": str(paths["similarity_index_path"].relative_to(settings.BASE_DIR)) if paths["similarity_index_path"].exists() else None,
+                "holdout": str(paths["holdout_path"].relative_to(settings.BASE_DIR)) if paths["holdout_path"].exists() else None
             },
             "model_exists": model_exists
         }
@@ -697,6 +1273,474 @@ def get_model_version_info(model_name: str, version: str):
         raise HTTPException(status_code=500, detail=f"Error getting version information: {str(e)}")
 
 
+@app.get("/model-info/{model_name}/{version}/feature-importance", tags=["Model Versions"], summary="Grouped permutation feature importance of a version")
+def get_feature_importance(model_name: str, version: str):
+    """
+    Obtiene la importancia de features por permutación agrupada de una versión, medida sobre su holdout.
+    
+    El cálculo se realiza una única vez por versión en segundo plano (pool de procesos) y el
+    resultado se guarda en metrics/feature_importance.json. Mientras se calcula, responde 202.
+    
+    Args:
+        model_name: Nombre del modelo a consultar
+        version: Versión específica del modelo (ej: v1.0.0) o 'latest'
+        
+    Returns:
+        - status: "completed", "running" o "failed"
+        - importance: Puntaje base y caída de accuracy por grupo de features (si está completo)
+        
+    Raises:
+        404: Si el modelo o la versión no existen
+    """
+    try:
+        resolved_version = settings.resolve_version(model_name, version)
+        if not settings.version_exists(model_name, resolved_version):
+            raise HTTPException(status_code=404, detail=f"Version '{version}' not found for model '{model_name}'")
+        
+        state = importance_service.get_or_schedule(model_name, resolved_version)
+        
+        if state["status"] == "completed":
+            return {
+                "model_name": model_name,
+                "version": resolved_version,
+                "status": "completed",
+                "importance": state["result"]
+            }
+        if state["status"] == "failed":
+            raise HTTPException(status_code=500, detail=f"Error computing feature importance: {state['error']}")
+        
+        return JSONResponse(status_code=202, content={
+            "model_name": model_name,
+            "version": resolved_version,
+            "status": state["status"]
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting feature importance: {str(e)}")
+
+
+@app.post("/model-info/{model_name}/{version}/distilled", tags=["Model Versions"], summary="Create the distilled low-latency model of a version", dependencies=[Depends(admission("train", versioned=False))])
+def create_distilled_model(model_name: str, version: str, data: Optional[Dict[str, Any]] = None):
+    """
+    Entrena el modelo destilado (HGB con menos árboles y hojas) de una versión sobre las
+    probabilidades del modelo completo y lo guarda junto a la versión, en distilled/.
+    Habilita /predict?tier=fast para esa versión.
+    
+    Args:
+        model_name: Nombre del modelo
+        version: Versión específica del modelo (ej: v1.0.0) o 'latest'
+        data: Hiperparámetros opcionales del modelo destilado:
+            - max_leaf_nodes (default: DISTILL_MAX_LEAF_NODES)
+            - max_iter (default: DISTILL_MAX_ITER)
+            - learning_rate (default: DISTILL_LEARNING_RATE)
+        
+    Returns:
+        Reporte: acuerdo con el modelo completo, accuracy, cobertura y acuerdo del enrutamiento
+        por umbral de confianza y latencias (fila a fila y por lotes) de ambos modelos
+        
+    Raises:
+        404: Si el modelo o la versión no existen
+    """
+    data = data or {}
+    try:
+        resolved_version = settings.resolve_version(model_name, version)
+        if not settings.version_exists(model_name, resolved_version):
+            raise HTTPException(status_code=404, detail=f"Version '{version}' not found for model '{model_name}'")
+        
+        return distill_version(
+            model_name,
+            resolved_version,
+            max_leaf_nodes=data.get("max_leaf_nodes"),
+            max_iter=data.get("max_iter"),
+            learning_rate=data.get("learning_rate")
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Distillation error: {str(e)}")
+
+
+@app.get("/model-info/{model_name}/{version}/distilled", tags=["Model Versions"], summary="Report of the distilled model of a version")
+def get_distilled_model(model_name: str, version: str):
+    """
+    Obtiene el reporte del modelo destilado de una versión (acuerdo, enrutamiento y latencias).
+    
+    Raises:
+        404: Si la versión no existe o no tiene modelo destilado
+    """
+    resolved_version = settings.resolve_version(model_name, version)
+    if not settings.version_exists(model_name, resolved_version):
+        raise HTTPException(status_code=404, detail=f"Version '{version}' not found for model '{model_name}'")
+    
+    report = load_distilled_report(model_name, resolved_version)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"No distilled model for '{model_name}' version '{resolved_version}'")
+    return report
+
+
+@app.post("/model-info/{model_name}/{version}/promote", tags=["Model Versions"], summary="Run the promotion gate for a version and move latest if it passes", dependencies=[Depends(admission("train", versioned=False))])
+def promote_version(
+    model_name: str,
+    version: str,
+    force: bool = Query(False, description="Move latest even if the gate fails (measurements are still recorded)")
+):
+    """
+    Mide una versión frente a la actual 'latest' (tamaño, carga, latencia fila a fila y por
+    lote sobre las mismas filas, exactitud) y la promueve si está dentro de los límites.
+    
+    Args:
+        model_name: Nombre del modelo
+        version: Versión a promover (ej: v1.0.3)
+        force: Promover aunque no pase la puerta
+        
+    Returns:
+        Resultado de la puerta (promoted, reason, checks, measurements), guardado también en
+        promotion.json de la versión
+        
+    Raises:
+        404: Si el modelo o la versión no existen
+    """
+    try:
+        if not settings.version_exists(model_name, version) or not settings.get_version_paths(model_name, version)["model_path"].exists():
+            raise HTTPException(status_code=404, detail=f"Version '{version}' not found for model '{model_name}'")
+        
+        report = promotion_gate.promote(model_name, version, force=force)
+        
+        # Ponerla en servicio en este proceso sin esperar al watcher
+        if model_name == model_holder.model_name:
+            model_holder.check()
+        return {"model_name": model_name, **report}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Promotion error: {str(e)}")
+
+
+@app.get("/model-info/{model_name}/{version}/drift", tags=["Model Versions"], summary="Feature drift of live traffic against the training data")
+def get_drift(model_name: str, version: str):
+    """
+    Compara la distribución de las features recibidas en /predict y /predict/upload con la
+    del conjunto de entrenamiento de la versión.
+    
+    Cada feature se resume en un histograma de bins fijos (cuantiles del entrenamiento) más
+    la tasa de faltantes, por lo que la memoria no crece con el tráfico. La referencia se guarda
+    al entrenar la versión; para versiones anteriores se construye una vez en segundo plano (202).
+    
+    Args:
+        model_name: Nombre del modelo a consultar
+        version: Versión específica del modelo (ej: v1.0.0) o 'latest'
+        
+    Returns:
+        - rows_observed: Filas puntuadas desde el arranque del proceso
+        - overall: PSI máximo y medio, número de features con drift y estado global
+        - features: PSI, estado y tasas de faltantes (referencia vs tráfico) por feature
+        
+    Raises:
+        404: Si el modelo o la versión no existen
+    """
+    try:
+        resolved_version = settings.resolve_version(model_name, version)
+        if not settings.version_exists(model_name, resolved_version):
+            raise HTTPException(status_code=404, detail=f"Version '{version}' not found for model '{model_name}'")
+        
+        report = drift_monitor.report(model_name, resolved_version)
+        if report is None:
+            return JSONResponse(status_code=202, content={
+                "model_name": model_name,
+                "version": resolved_version,
+                "status": "building_reference"
+            })
+        return report
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting drift report: {str(e)}")
+
+
+def load_holdout(model_name: str, version: str):
+    """Versión resuelta y probabilidades de test cacheadas (404 si la versión no existe)."""
+    resolved_version = settings.resolve_version(model_name, version)
+    if not settings.version_exists(model_name, resolved_version):
+        raise HTTPException(status_code=404, detail=f"Version '{version}' not found for model '{model_name}'")
+    if not settings.get_version_paths(model_name, resolved_version)["model_path"].exists():
+        raise HTTPException(status_code=404, detail=f"Model file not found for '{model_name}' version '{resolved_version}'")
+    return resolved_version, holdout_scores.get(model_name, resolved_version)
+
+
+def holdout_response(model_name: str, version: str, start: float, result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "model_name": model_name,
+        "version": version,
+        **result,
+        "compute_ms": round((time.perf_counter() - start) * 1e3, 3)
+    }
+
+
+@app.get("/model-info/{model_name}/{version}/holdout", tags=["Model Versions"], summary="Summary of the stored holdout probabilities of a version")
+def get_holdout_summary(model_name: str, version: str):
+    """
+    Resumen de las probabilidades del conjunto de test guardadas con la versión (holdout.npz).
+    
+    Cada versión guarda al evaluarse la matriz de probabilidades (float32) y las etiquetas
+    reales de su test; las versiones anteriores la reconstruyen una vez en la primera consulta
+    repitiendo la división por estrella del entrenamiento.
+    
+    Args:
+        model_name: Nombre del modelo a consultar
+        version: Versión específica del modelo (ej: v1.0.0) o 'latest'
+        
+    Returns:
+        - rows, classes, class_counts: Tamaño y composición del test
+        - accuracy, log_loss, brier: Métricas sobre las probabilidades
+        - source: 'evaluate' (guardado al entrenar) o 'rebuilt' (reconstruido)
+        
+    Raises:
+        404: Si el modelo o la versión no existen
+    """
+    try:
+        start = time.perf_counter()
+        resolved_version, scores = load_holdout(model_name, version)
+        return holdout_response(model_name, resolved_version, start, scores.summary())
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting holdout summary: {str(e)}")
+
+
+@app.get("/model-info/{model_name}/{version}/holdout/curves", tags=["Model Versions"], summary="ROC and precision-recall curves from the stored holdout probabilities")
+def get_holdout_curves(
+    model_name: str,
+    version: str,
+    positive_class: Optional[str] = Query(None, description="Class evaluated one-vs-rest (default: every class)"),
+    max_points: int = Query(200, ge=2, le=5000, description="Maximum points returned per curve")
+):
+    """
+    Curvas ROC y precisión-recall uno-contra-resto calculadas sobre las probabilidades de
+    test guardadas, sin recargar el dataset ni el modelo.
+    
+    Args:
+        model_name: Nombre del modelo a consultar
+        version: Versión específica del modelo (ej: v1.0.0) o 'latest'
+        positive_class: Clase positiva (CANDIDATE, CONFIRMED, FALSE_POSITIVE); todas si se omite
+        max_points: Puntos por curva (el AUC y la precisión promedio usan todos los umbrales)
+        
+    Returns:
+        Por clase: positives, negatives, roc_auc, average_precision, roc (fpr, tpr, thresholds)
+        y pr (precision, recall, thresholds)
+        
+    Raises:
+        400: Si la clase no existe
+        404: Si el modelo o la versión no existen
+    """
+    try:
+        start = time.perf_counter()
+        resolved_version, scores = load_holdout(model_name, version)
+        curves = scores.curves(positive_class, max_points)
+        return holdout_response(model_name, resolved_version, start, {"curves": curves})
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing holdout curves: {str(e)}")
+
+
+@app.get("/model-info/{model_name}/{version}/holdout/calibration", tags=["Model Versions"], summary="Calibration bins from the stored holdout probabilities")
+def get_holdout_calibration(
+    model_name: str,
+    version: str,
+    positive_class: Optional[str] = Query(None, description="Class to calibrate one-vs-rest (default: confidence of the predicted class)"),
+    n_bins: int = Query(10, ge=2, le=100, description="Number of bins"),
+    strategy: str = Query("uniform", description="'uniform' (equal width) or 'quantile' (equal count) bins")
+):
+    """
+    Diagrama de confiabilidad de la versión: probabilidad media predicha frente a frecuencia
+    observada por bin, con ECE, MCE y Brier.
+    
+    Args:
+        model_name: Nombre del modelo a consultar
+        version: Versión específica del modelo (ej: v1.0.0) o 'latest'
+        positive_class: Clase a calibrar; si se omite, la confianza de la clase predicha
+        n_bins: Cantidad de bins
+        strategy: 'uniform' o 'quantile'
+        
+    Returns:
+        ece, mce, brier y bins (lower, upper, count, mean_predicted, observed)
+        
+    Raises:
+        400: Si la clase o la estrategia no son válidas
+        404: Si el modelo o la versión no existen
+    """
+    try:
+        start = time.perf_counter()
+        resolved_version, scores = load_holdout(model_name, version)
+        calibration = scores.calibration(positive_class, n_bins, strategy)
+        return holdout_response(model_name, resolved_version, start, calibration)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing calibration: {str(e)}")
+
+
+@app.get("/model-info/{model_name}/{version}/holdout/thresholds", tags=["Model Versions"], summary="Threshold sweep from the stored holdout probabilities")
+def get_holdout_thresholds(
+    model_name: str,
+    version: str,
+    positive_class: Optional[str] = Query(None, description="Class flagged when its probability >= threshold (default: accept predictions whose confidence >= threshold)"),
+    thresholds: Optional[List[float]] = Query(None, description="Explicit thresholds (repeatable); default is an even grid"),
+    steps: int = Query(20, ge=1, le=1000, description="Grid intervals in [0, 1] when no thresholds are given")
+):
+    """
+    Barrido de umbrales de confianza sobre las probabilidades de test guardadas.
+    
+    Con positive_class devuelve precisión, recall y F1 de la clase por umbral (y el umbral
+    de mejor F1); sin clase, la cobertura y la exactitud de aceptar sólo las predicciones con
+    confianza mayor o igual al umbral.
+    
+    Args:
+        model_name: Nombre del modelo a consultar
+        version: Versión específica del modelo (ej: v1.0.0) o 'latest'
+        positive_class: Clase positiva (CANDIDATE, CONFIRMED, FALSE_POSITIVE)
+        thresholds: Umbrales explícitos
+        steps: Intervalos de la grilla por defecto
+        
+    Returns:
+        thresholds y, por umbral, precision/recall/f1 (con clase) o coverage/accuracy (sin clase)
+        
+    Raises:
+        400: Si la clase no existe
+        404: Si el modelo o la versión no existen
+    """
+    try:
+        start = time.perf_counter()
+        resolved_version, scores = load_holdout(model_name, version)
+        sweep = scores.thresholds(positive_class, thresholds, steps)
+        return holdout_response(model_name, resolved_version, start, sweep)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing threshold sweep: {str(e)}")
+
+
+@app.get("/admin/admission", tags=["Admin"], summary="Admission control state and counters")
+def admission_stats():
+    """
+    Obtiene el estado del control de admisión por tipo de petición.
+    
+    Returns:
+        Por cada compuerta (predict, predict_upload, train): límites, peticiones activas y en cola,
+        ocupación por versión, admitidas, rechazos (429 cola llena / 503 espera agotada) y
+        tiempos medios de espera en cola y de servicio
+    """
+    return {name: gate.stats() for name, gate in admission_gates.items()}
+
+
+@app.get("/admin/model", tags=["Admin"], summary="Hot-swap state of the served model")
+def served_model_stats():
+    """
+    Obtiene el estado del modelo en servicio ('latest' en memoria, recargado cuando cambia el puntero).
+    
+    Returns:
+        Versión en servicio y peticiones que la usan, versiones retiradas que aún tienen
+        peticiones en curso, carga en progreso, intercambios, liberaciones y último error
+    """
+    return model_holder.stats()
+
+
+@app.get("/admin/traffic", tags=["Admin"], summary="Traffic capture state")
+def traffic_stats():
+    """
+    Obtiene el estado de la captura de tráfico (TRAFFIC_CAPTURE_RATE, TRAFFIC_LOG_PATH).
+    
+    Returns:
+        Tasa de muestreo, ruta del log y peticiones capturadas, escritas, pendientes y descartadas
+    """
+    return traffic_recorder.stats()
+
+
+@app.get("/admin/streams", tags=["Admin"], summary="WebSocket prediction streams")
+def stream_stats():
+    """
+    Estado de las conexiones de /ws/predict: abiertas (con su versión), rechazadas por el
+    límite STREAM_MAX_CONNECTIONS y totales de frames, filas, lotes y errores.
+    """
+    return prediction_streams.stats()
+
+
+@app.get("/admin/cpu", tags=["Admin"], summary="CPU thread budgets for training and inference")
+def cpu_budget_stats():
+    """
+    Obtiene los presupuestos de hilos OpenMP (CPU_TRAIN_THREADS / CPU_INFERENCE_THREADS).
+    
+    Returns:
+        Núcleos disponibles para este worker y, por presupuesto (train, inference): hilos de la
+        reserva compartida, hilos en uso, llamadas en curso y en espera, y totales de llamadas y esperas
+    """
+    return {
+        "available_cores": available_cores(),
+        "budgets": {name: budget.stats() for name, budget in cpu_budgets.items()}
+    }
+
+
+@app.get("/admin/profiles", tags=["Admin"], summary="List captured request profiles")
+def list_profiles():
+    """
+    Lista los perfiles capturados (petición con ?profile=true, cabecera X-Profile: 1 o
+    muestreo con PROFILE_SAMPLE_RATE). Sólo se conservan los últimos PROFILE_BUFFER_SIZE.
+    
+    Returns:
+        - profiles: id, petición, inicio, duración y tamaño de cada perfil (más reciente primero)
+    """
+    return {
+        "capacity": request_profiler.capacity,
+        "sample_rate": request_profiler.sample_rate,
+        "profiles": request_profiler.list()
+    }
+
+
+@app.get("/admin/profiles/{profile_id}", tags=["Admin"], summary="Download a request profile")
+def download_profile(
+    profile_id: str,
+    format: str = Query("prof", pattern="^(prof|text)$", description="'prof' (pstats binary) or 'text' summary"),
+    limit: int = Query(30, ge=1, le=500, description="Rows of the text summary")
+):
+    """
+    Descarga un perfil capturado.
+    
+    Args:
+        profile_id: Id devuelto en la respuesta de la petición perfilada o en /admin/profiles
+        format: "prof" para el archivo pstats (python -m pstats, snakeviz) o "text" para un
+            resumen ordenado por tiempo acumulado
+        limit: Número de funciones del resumen en texto
+        
+    Raises:
+        404: Si el perfil no existe o ya salió del buffer
+    """
+    if format == "text":
+        summary = request_profiler.summary(profile_id, limit=limit)
+        if summary is None:
+            raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found")
+        return PlainTextResponse(summary)
+    
+    data = request_profiler.get(profile_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found")
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile_{profile_id}.prof"'}
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Benchmarks del pipeline de entrenamiento e inferencia.
+
+Uso:
+    python benchmark.py            # todas las secciones
+    python benchmark.py memory     # sólo las secciones indicadas
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Agregar src al path para imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from src.models.hgb_exoplanet import HGBExoplanetModel
+from src.utils.config import settings
+
+
+def _mb(n_bytes: float) -> float:
+    return n_bytes / 1024 ** 2
+
+
+def _frames_bytes(*frames) -> int:
+    """Memoria (profunda) de los frames/series indicados."""
+    total = 0
+    for frame in frames:
+        if frame is None:
+            continue
+        usage = frame.memory_usage(deep=True)
+        total += int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    return total
+
+
+def bench_memory() -> None:
+    """Memoria del modo compacto (float32/categorías) frente al modo por defecto y paridad de accuracy."""
+    results = {}
+    for compact in (False, True):
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+
+        model = HGBExoplanetModel(compact=compact)
+        model.load_data()
+        model.prepare_features()
+        model.split_data()
+        _, load_peak = tracemalloc.get_traced_memory()
+        frames = _frames_bytes(model.df, model.X_num, model.X_train, model.X_test)
+
+        model.train_model()
+        y_pred = model.pipe.predict(model.X_test)
+        accuracy = float(np.mean(y_pred == np.asarray(model.y_test)))
+        elapsed = time.perf_counter() - start
+
+        # Igual que save_model: sólo el modo compacto libera los frames de entrenamiento
+        if compact:
+            model.release_training_data()
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[compact] = {
+            "load_peak": load_peak,
+            "frames": frames,
+            "retained": retained,
+            "accuracy": accuracy,
+            "y_pred": y_pred,
+            "seconds": elapsed,
+        }
+        del model
+
+    print("\n=== Memoria: modo por defecto vs compacto ===")
+    print(f"{'modo':<10}{'pico carga MB':>15}{'frames MB':>12}{'retenido MB':>14}{'accuracy':>11}{'tiempo s':>10}")
+    for compact, r in results.items():
+        print(f"{'compacto' if compact else 'default':<10}"
+              f"{_mb(r['load_peak']):>15.1f}{_mb(r['frames']):>12.1f}{_mb(r['retained']):>14.1f}"
+              f"{r['accuracy']:>11.4f}{r['seconds']:>10.2f}")
+
+    base, compact = results[False], results[True]
+    agreement = float(np.mean(np.asarray(base["y_pred"]) == np.asarray(compact["y_pred"])))
+    print(f"\nAhorro en frames: {100 * (1 - compact['frames'] / base['frames']):.1f}% | "
+          f"pico de carga: {100 * (1 - compact['load_peak'] / base['load_peak']):.1f}% | "
+          f"retenido tras entrenar: {100 * (1 - compact['retained'] / base['retained']):.1f}%")
+    print(f"Paridad: Δaccuracy={compact['accuracy'] - base['accuracy']:+.4f} | "
+          f"predicciones coincidentes={100 * agreement:.2f}%")
+
+
+def _wide_export(path: Path, extra_columns: int = 300) -> None:
+    """Genera una exportación ancha: kepler.csv más columnas de texto/metadatos que no son features."""
+    df = pd.read_csv(settings.get_dataset_path(), comment="#")
+    rng = np.random.default_rng(0)
+    extra = {
+        f"meta_{i}": rng.choice(["Q1-Q17 DR25", "Q1-Q16", "SOC 9.3", "DR24"], size=len(df))
+        for i in range(extra_columns)
+    }
+    pd.concat([df, pd.DataFrame(extra)], axis=1).to_csv(path, index=False)
+
+
+def bench_projection() -> None:
+    """Tiempo y pico de memoria de load_data + prepare_features con y sin proyección de columnas."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wide_path = Path(tmp) / "wide_export.csv"
+        _wide_export(wide_path)
+        schema = list(HGBExoplanetModel(csv_path=wide_path, projection="infer")._projected_columns())
+
+        print("\n=== Proyección de columnas (exportación de "
+              f"{len(pd.read_csv(wide_path, nrows=0).columns)} columnas) ===")
+        print(f"{'modo':<10}{'tiempo s':>10}{'pico MB':>10}{'features':>10}")
+        for label, kwargs in (
+            ("off", {"projection": "off"}),
+            ("infer", {"projection": "infer"}),
+            ("schema", {"feature_columns": schema}),
+        ):
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            model = HGBExoplanetModel(csv_path=wide_path, **kwargs)
+            model.load_data()
+            model.prepare_features()
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{label:<10}{elapsed:>10.2f}{_mb(peak):>10.1f}{model.X_num.shape[1]:>10}")
+            del model
+
+
+def bench_drift() -> None:
+    """Costo por fila de actualizar los sketches de drift, por lotes y fila a fila."""
+    from src.models.drift import FeatureSketch
+
+    model = HGBExoplanetModel()
+    model.load_data()
+    model.prepare_features()
+    model.split_data()
+    reference = FeatureSketch.from_reference(model.X_train)
+    X = model.X_test.to_numpy(dtype=np.float64)
+
+    print(f"\n=== Drift: sketches de {len(reference.features)} features x "
+          f"{reference.n_slots} casillas ({reference.counts.nbytes} bytes) ===")
+    live = reference.empty_like()
+    start = time.perf_counter()
+    live.update(X)
+    batch_us = (time.perf_counter() - start) / len(X) * 1e6
+
+    n_single = min(500, len(X))
+    start = time.perf_counter()
+    for i in range(n_single):
+        live.update(X[i:i + 1])
+    single_us = (time.perf_counter() - start) / n_single * 1e6
+
+    print(f"lote de {len(X)} filas: {batch_us:.2f} µs/fila | petición de una fila: {single_us:.1f} µs")
+
+
+def bench_binning() -> None:
+    """Sesión de ajuste (varios hiperparámetros) con y sin la caché de matrices binneadas."""
+    from sklearn.ensemble._hist_gradient_boosting.binning import _BinMapper
+    from src.models.binning import binned_cache
+
+    grid = [(lr, leaves) for lr in (0.05, 0.1) for leaves in (15, 31, 63)]
+    base = HGBExoplanetModel()
+    base.load_data()
+    base.prepare_features()
+    base.split_data()
+
+    # Medir el tiempo de binning real dentro de cada fit
+    binning_time = {"seconds": 0.0}
+    original = _BinMapper.fit_transform
+
+    def timed_fit_transform(self, X, y=None):
+        start = time.perf_counter()
+        result = original(self, X, y)
+        binning_time["seconds"] += time.perf_counter() - start
+        return result
+
+    print(f"\n=== Binning: sesión de ajuste de {len(grid)} entrenamientos ===")
+    print(f"{'caché':<8}{'total s':>10}{'binning s':>12}{'ahorrado s':>13}")
+    results = {}
+    _BinMapper.fit_transform = timed_fit_transform
+    try:
+        for enabled in (False, True):
+            settings.BINNING_CACHE = enabled
+            binned_cache.clear()
+            binning_time["seconds"] = 0.0
+            predictions = []
+            start = time.perf_counter()
+            for lr, leaves in grid:
+                base.learning_rate, base.max_leaf_nodes = lr, leaves
+                base.train_model()
+                predictions.append(base.pipe.predict(base.X_test))
+            total = time.perf_counter() - start
+            saved = binned_cache.stats()["saved_seconds"]
+            results[enabled] = (total, predictions)
+            print(f"{'on' if enabled else 'off':<8}{total:>10.2f}{binning_time['seconds']:>12.3f}{saved:>13.3f}")
+    finally:
+        _BinMapper.fit_transform = original
+        settings.BINNING_CACHE = True
+
+    off, on = results[False], results[True]
+    identical = all(np.array_equal(a, b) for a, b in zip(off[1], on[1]))
+    print(f"\nAhorro: {100 * (1 - on[0] / off[0]):.1f}% del tiempo total de ajuste | "
+          f"predicciones idénticas: {identical} | caché: {binned_cache.stats()}")
+
+
+def bench_bulk(copies: int = 10) -> None:
+    """Filas/segundo del scoring por lotes (score.py) según el número de workers."""
+    import os
+    import tempfile
+    from score import score_files
+
+    with tempfile.TemporaryDirectory() as tmp:
+        big_path = Path(tmp) / "catalog.csv"
+        df = pd.read_csv(settings.get_dataset_path(), comment="#")
+        pd.concat([df] * copies, ignore_index=True).to_csv(big_path, index=False)
+        del df
+
+        cores = os.cpu_count() or 1
+        counts = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+        print(f"\n=== Scoring por lotes: {copies}x kepler.csv, {cores} núcleos ===")
+        print(f"{'workers':<10}{'filas':>10}{'tiempo s':>10}{'filas/s':>12}{'speedup':>10}")
+        baseline = None
+        for workers in counts:
+            summary = score_files([big_path], output_dir=Path(tmp) / f"out_{workers}", workers=workers)
+            baseline = baseline or summary["rows_per_second"]
+            print(f"{workers:<10}{summary['rows']:>10,}{summary['seconds']:>10.2f}"
+                  f"{summary['rows_per_second']:>12,.0f}{summary['rows_per_second'] / baseline:>10.2f}")
+
+
+def bench_cpu(requests: int = 300) -> None:
+    """Latencia de inferencia fila a fila (p50/p99) mientras corre un reentrenamiento, con y sin presupuestos."""
+    import threading
+    from src.utils.cpu_budget import train_budget, inference_budget, available_cores
+
+    model = HGBExoplanetModel()
+    model.load_model(schema_only=True)
+    X = pd.read_csv(settings.get_dataset_path(), comment="#", nrows=requests).reindex(columns=model.X_num.columns)
+
+    def latencies() -> np.ndarray:
+        timings = []
+        for i in range(len(X)):
+            start = time.perf_counter()
+            model.predict_proba(X.iloc[i:i + 1])
+            timings.append(time.perf_counter() - start)
+        return np.array(timings) * 1e3
+
+    def under_training() -> np.ndarray:
+        trainer = HGBExoplanetModel(early_stopping=False)
+        trainer.load_data()
+        trainer.prepare_features()
+        trainer.split_data()
+        thread = threading.Thread(target=trainer.train_model)
+        thread.start()
+        result = latencies()
+        thread.join()
+        return result
+
+    cores = available_cores()
+    budgets = (train_budget.threads, inference_budget.threads)
+    print(f"\n=== Inferencia durante un reentrenamiento ({cores} núcleos) ===")
+    print(f"{'escenario':<34}{'p50 ms':>10}{'p99 ms':>10}")
+    scenarios = [
+        ("sin entrenamiento", budgets, latencies),
+        ("entrenando, sin presupuestos", (cores, cores), under_training),
+        (f"entrenando, train={budgets[0]} inference={budgets[1]}", budgets, under_training),
+    ]
+    try:
+        for label, (train_threads, inference_threads), run in scenarios:
+            train_budget.threads, inference_budget.threads = train_threads, inference_threads
+            timings = run()
+            print(f"{label:<34}{np.percentile(timings, 50):>10.2f}{np.percentile(timings, 99):>10.2f}")
+    finally:
+        train_budget.threads, inference_budget.threads = budgets
+
+
+def bench_stream(rows: int = 2000) -> None:
+    """Filas/segundo puntuando de a una fila: llamadas a /predict frente al canal /ws/predict."""
+    import json
+    import socket
+    import threading
+    import http.client
+    import uvicorn
+    from websockets.sync.client import connect
+    from API import main as api
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    df = pd.read_csv(settings.get_dataset_path(), comment="#", nrows=rows)
+    with api.model_holder.acquire() as model:
+        features = list(model.X_num.columns)
+    X = df[features]
+    records = X.astype(object).where(X.notna(), None).to_dict("records")
+
+    def http_predict() -> np.ndarray:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        timings = []
+        for record in records:
+            body = json.dumps({"data": [{k: v for k, v in record.items() if v is not None}]})
+            start = time.perf_counter()
+            conn.request("POST", "/predict", body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            assert response.status == 200, response.status
+            timings.append(time.perf_counter() - start)
+        conn.close()
+        return np.array(timings)
+
+    def stream(binary: bool) -> np.ndarray:
+        frames = ([X.iloc[i:i + 1].to_numpy(dtype="<f4").tobytes() for i in range(len(X))] if binary
+                  else [json.dumps(record) for record in records])
+        sent = [0.0] * len(frames)
+        with connect(f"ws://127.0.0.1:{port}/ws/predict", max_size=None) as ws:
+            json.loads(ws.recv())
+
+            def sender():
+                for i, frame in enumerate(frames):
+                    sent[i] = time.perf_counter()
+                    ws.send(frame)
+
+            writer = threading.Thread(target=sender)
+            writer.start()
+            timings = []
+            for i in range(len(frames)):
+                ws.recv()
+                timings.append(time.perf_counter() - sent[i])
+            writer.join()
+        return np.array(timings)
+
+    print(f"\n=== Predicción fila a fila: {rows:,} filas ===")
+    print(f"{'canal':<30}{'filas/s':>10}{'speedup':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    baseline = None
+    try:
+        for label, run in [("POST /predict (keep-alive)", http_predict),
+                           ("WebSocket JSON", lambda: stream(False)),
+                           ("WebSocket binario float32", lambda: stream(True))]:
+            start = time.perf_counter()
+            timings = run() * 1e3
+            throughput = rows / (time.perf_counter() - start)
+            baseline = baseline or throughput
+            print(f"{label:<30}{throughput:>10,.0f}{throughput / baseline:>10.1f}"
+                  f"{np.percentile(timings, 50):>10.2f}{np.percentile(timings, 99):>10.2f}")
+    finally:
+        server.should_exit = True
+        thread.join()
+    print(f"Lotes del servidor: {api.prediction_streams.stats()['batches']:,}")
+
+
+SECTIONS = {
+    "memory": bench_memory,
+    "projection": bench_projection,
+    "drift": bench_drift,
+    "binning": bench_binning,
+    "bulk": bench_bulk,
+    "cpu": bench_cpu,
+    "stream": bench_stream,
+}
+
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(SECTIONS)
+    for name in selected:
+        if name not in SECTIONS:
+            print(f"[ERROR] Sección desconocida: {name}. Disponibles: {list(SECTIONS)}")
+            sys.exit(1)
+        SECTIONS[name]()
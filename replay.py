@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Generador de carga que reproduce un log de tráfico capturado por la API (TRAFFIC_CAPTURE_RATE)
+contra una instancia local y reporta throughput, latencias p50/p95/p99 y errores por ruta.
+
+Modos de llegada:
+    --rate R    ritmo fijo de R peticiones/segundo (lazo abierto)
+    --speed S   respeta los tiempos entre peticiones del log, acelerados S veces
+    (ninguno)   cada worker envía la siguiente petición en cuanto recibe la respuesta
+
+En los dos primeros la latencia se mide desde el instante en que la petición debía salir,
+así que incluye la espera si el servidor (o el generador) se atrasa.
+
+Los cuerpos JSON capturados se reenvían tal cual; los que no se guardaron (demasiado
+grandes) y los CSV subidos se generan con filas de datasets/kepler.csv de la misma forma.
+
+Uso:
+    python replay.py data/traffic.jsonl
+    python replay.py data/traffic.jsonl --concurrency 16 --rate 50 --repeat 5
+    python replay.py data/traffic.jsonl --base-url http://127.0.0.1:8000 --speed 2 --json report.json
+"""
+import sys
+import json
+import time
+import queue
+import uuid
+import argparse
+import threading
+import http.client
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+
+# Agregar src al path para imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from src.utils.config import settings
+
+
+# Rutas que no se reproducen por defecto (entrenamientos y descargas de archivos de otra instancia)
+DEFAULT_EXCLUDE = ["/train", "/download"]
+
+
+def load_log(path: Path, exclude: List[str]) -> List[Dict[str, Any]]:
+    """Entradas del log en orden temporal, sin las rutas excluidas."""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                if not entry["path"].startswith(tuple(exclude)):
+                    entries.append(entry)
+    entries.sort(key=lambda e: e["ts"])
+    return entries
+
+
+class PayloadFactory:
+    """Genera cuerpos de /predict y CSV de /predict/upload con la forma registrada."""
+
+    def __init__(self, dataset_path: Path):
+        self.df = pd.read_csv(dataset_path, comment="#")
+        self._cache: Dict[Tuple[str, int], Tuple[bytes, str]] = {}
+
+    def _rows(self, n_rows: int) -> pd.DataFrame:
+        reps = -(-n_rows // len(self.df))
+        return pd.concat([self.df] * reps, ignore_index=True).head(n_rows)
+
+    def json_body(self, n_rows: int) -> Tuple[bytes, str]:
+        key = ("json", n_rows)
+        if key not in self._cache:
+            numeric = self._rows(n_rows).select_dtypes("number")
+            rows = [{k: v for k, v in row.items() if pd.notna(v)} for row in numeric.to_dict("records")]
+            self._cache[key] = (json.dumps({"data": rows}).encode("utf-8"), "application/json")
+        return self._cache[key]
+
+    def csv_upload(self, n_rows: int) -> Tuple[bytes, str]:
+        key = ("csv", n_rows)
+        if key not in self._cache:
+            content = self._rows(n_rows).to_csv(index=False).encode("utf-8")
+            boundary = uuid.uuid4().hex
+            body = (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="file"; filename="replay_{n_rows}.csv"\r\n'
+                "Content-Type: text/csv\r\n\r\n"
+            ).encode("utf-8") + content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+            self._cache[key] = (body, f"multipart/form-data; boundary={boundary}")
+        return self._cache[key]
+
+
+def build_request(entry: Dict[str, Any], factory: PayloadFactory) -> Tuple[str, str, Optional[bytes], Dict[str, str]]:
+    """(método, url relativa, cuerpo, cabeceras) para una entrada del log."""
+    url = entry["path"]
+    if entry.get("query"):
+        url += "?" + urlencode(entry["query"], doseq=True)
+
+    body, content_type = None, None
+    rows = entry.get("shape", {}).get("rows") or 1
+    if entry.get("payload") is not None:
+        body, content_type = json.dumps(entry["payload"]).encode("utf-8"), "application/json"
+    elif entry.get("content_type") == "application/json":
+        body, content_type = factory.json_body(rows)
+    elif entry.get("content_type") == "multipart/form-data":
+        body, content_type = factory.csv_upload(rows)
+
+    headers = {"Content-Type": content_type} if content_type else {}
+    return entry["method"], url, body, headers
+
+
+def replay(
+    entries: List[Dict[str, Any]],
+    base_url: str = "http://127.0.0.1:8000",
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+    speed: Optional[float] = None,
+    repeat: int = 1,
+    timeout: float = 60.0,
+    dataset_path: Optional[Path] = None
+) -> Dict[str, Any]:
+    """
+    Reproduce las entradas contra base_url.
+
+    Returns:
+        Reporte con totales y, por ruta, peticiones, errores y latencias p50/p95/p99 (ms)
+    """
+    factory = PayloadFactory(dataset_path or settings.get_dataset_path())
+    requests = [build_request(entry, factory) for entry in entries] * repeat
+    if not requests:
+        raise ValueError("El log no tiene peticiones para reproducir")
+
+    # Instante de salida de cada petición (None = en cuanto haya un worker libre)
+    if rate:
+        offsets = [i / rate for i in range(len(requests))]
+    elif speed:
+        stamps = pd.to_datetime([e["ts"] for e in entries]).astype("int64") / 1e9
+        period = (stamps[-1] - stamps[0]) + 1.0
+        offsets = [(stamps[i % len(entries)] - stamps[0] + (i // len(entries)) * period) / speed
+                   for i in range(len(requests))]
+    else:
+        offsets = [None] * len(requests)
+
+    target = urlsplit(base_url)
+    jobs: "queue.Queue[Optional[Tuple[int, Optional[float]]]]" = queue.Queue()
+    results: List[Optional[Tuple[str, Optional[int], float, Optional[str]]]] = [None] * len(requests)
+
+    def worker() -> None:
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=timeout)
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            index, scheduled = job
+            method, url, body, headers = requests[index]
+            start = scheduled if scheduled is not None else time.perf_counter()
+            status, error = None, None
+            try:
+                conn.request(method, url, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                error = type(e).__name__
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=timeout)
+            results[index] = (f"{method} {url.split('?')[0]}", status, time.perf_counter() - start, error)
+        conn.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, concurrency))]
+    for thread in threads:
+        thread.start()
+
+    began = time.perf_counter()
+    for index, offset in enumerate(offsets):
+        scheduled = None
+        if offset is not None:
+            scheduled = began + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        jobs.put((index, scheduled))
+    for _ in threads:
+        jobs.put(None)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    return build_report(results, elapsed, concurrency, rate, speed)
+
+
+def build_report(results: List[Tuple[str, Optional[int], float, Optional[str]]], elapsed: float,
+                 concurrency: int, rate: Optional[float], speed: Optional[float]) -> Dict[str, Any]:
+    by_route: Dict[str, List[Tuple[Optional[int], float, Optional[str]]]] = defaultdict(list)
+    for route, status, latency, error in results:
+        by_route[route].append((status, latency, error))
+
+    def summarize(items: List[Tuple[Optional[int], float, Optional[str]]]) -> Dict[str, Any]:
+        latencies = np.array([latency for _, latency, _ in items]) * 1e3
+        errors = sum(1 for status, _, error in items if error or status is None or status >= 400)
+        statuses: Dict[str, int] = defaultdict(int)
+        for status, _, error in items:
+            statuses[error or str(status)] += 1
+        return {
+            "requests": len(items),
+            "errors": errors,
+            "error_rate": round(errors / len(items), 4),
+            "status": dict(statuses),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+            "max_ms": round(float(latencies.max()), 2),
+        }
+
+    total = summarize([item for items in by_route.values() for item in items])
+    total["seconds"] = round(elapsed, 3)
+    total["throughput_rps"] = round(len(results) / elapsed, 2) if elapsed > 0 else None
+    return {
+        "mode": "rate" if rate else "speed" if speed else "closed_loop",
+        "concurrency": concurrency,
+        "rate": rate,
+        "speed": speed,
+        "total": total,
+        "routes": {route: summarize(items) for route, items in sorted(by_route.items())},
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    total = report["total"]
+    print(f"\n=== Replay ({report['mode']}, concurrencia {report['concurrency']}) ===")
+    print(f"{total['requests']:,} peticiones en {total['seconds']:.2f} s: {total['throughput_rps']:,} req/s, "
+          f"errores {total['error_rate']:.2%}")
+    print(f"{'ruta':<48}{'n':>7}{'err %':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in list(report["routes"].items()) + [("TOTAL", total)]:
+        print(f"{route[:47]:<48}{stats['requests']:>7}{stats['error_rate'] * 100:>8.2f}"
+              f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Reproduce un log de tráfico contra una instancia de la API")
+    parser.add_argument("log", type=Path, nargs="?", default=None, help="Log JSONL (default: TRAFFIC_LOG_PATH)")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="URL de la instancia")
+    parser.add_argument("--concurrency", type=int, default=8, help="Conexiones/workers simultáneos")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--rate", type=float, default=None, help="Peticiones por segundo (lazo abierto)")
+    mode.add_argument("--speed", type=float, default=None, help="Factor de aceleración de los tiempos del log")
+    parser.add_argument("--repeat", type=int, default=1, help="Veces que se reproduce el log")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout por petición (s)")
+    parser.add_argument("--exclude", nargs="*", default=DEFAULT_EXCLUDE, help="Prefijos de ruta a omitir")
+    parser.add_argument("--json", type=Path, default=None, help="Guardar el reporte en JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        entries = load_log(args.log or settings.TRAFFIC_LOG_PATH, args.exclude)
+        report = replay(entries, base_url=args.base_url, concurrency=args.concurrency, rate=args.rate,
+                        speed=args.speed, repeat=args.repeat, timeout=args.timeout)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=4))
+        print(f"[INFO] Reporte guardado en: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
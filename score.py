@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Scoring por lotes offline de catálogos grandes con un pool de procesos.
+
+Cada archivo se divide en bloques de filas (rangos de bytes alineados a fin de línea) que
+los workers leen, puntúan y escriben por separado; cada worker carga la versión una sola vez.
+La salida tiene el mismo formato que el CSV de /predict/upload.
+
+Uso:
+    python score.py datasets/kepler.csv
+    python score.py "dumps/*.csv" --version v1.0.2 --workers 8 --output-dir data/bulk
+    python score.py dumps/a.csv dumps/b.csv --shards --chunk-rows 100000
+
+Nota: los campos entrecomillados no deben contener saltos de línea (como en las
+exportaciones del NASA Exoplanet Archive).
+"""
+import io
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, Any, List, Tuple, Optional
+
+import pandas as pd
+
+# Agregar src al path para imports
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from src.models.hgb_exoplanet import HGBExoplanetModel
+from src.models.scoring import annotate_predictions, format_csv_output
+from src.utils.config import settings
+
+
+# Modelo de cada proceso del pool (se carga una vez por worker)
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(model_name: str, version: str) -> None:
+    model = HGBExoplanetModel()
+    model.load_model(model_name, version, schema_only=True)
+    _worker_state["model"] = model
+
+
+def _read_header(path: Path) -> Tuple[bytes, int, int]:
+    """
+    Devuelve la línea de cabecera, el offset donde empiezan los datos y una estimación
+    de bytes por fila (sobre las primeras 1000 filas).
+    """
+    with open(path, "rb") as f:
+        offset = 0
+        header = b""
+        for line in f:
+            offset += len(line)
+            if line.strip() and not line.startswith(b"#"):
+                header = line
+                break
+
+        sample = [len(line) for _, line in zip(range(1000), f)]
+    bytes_per_row = max(1, sum(sample) // len(sample)) if sample else 1
+    return header, offset, bytes_per_row
+
+
+def _byte_ranges(path: Path, start: int, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Rangos [inicio, fin) de ~chunk_bytes que terminan siempre en un salto de línea."""
+    size = path.stat().st_size
+    ranges = []
+    with open(path, "rb") as f:
+        while start < size:
+            end = min(start + chunk_bytes, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _score_chunk(path: str, header: bytes, start: int, end: int, shard_path: str,
+                 explain: bool, top_k: int, generated_at: str) -> Dict[str, Any]:
+    """Lee un rango de bytes del CSV, lo puntúa y escribe el shard formateado."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    df = pd.read_csv(io.BytesIO(header + data), comment="#", quotechar='"')
+    if df.empty:
+        return {"rows": 0, "distribution": {}}
+
+    # Misma validación que /predict/upload: ausentes e inválidos -> NaN (los imputa el pipeline)
+    model = _worker_state["model"]
+    X, _ = model.validate_input(df, strict=settings.SCHEMA_STRICT)
+    annotate_predictions(df, X, model, explain=explain, top_k=top_k, generated_at=generated_at)
+    format_csv_output(df, model).to_csv(shard_path, index=False, encoding="utf-8", sep=",")
+    return {"rows": len(df), "distribution": df["prediction_label"].value_counts().to_dict()}
+
+
+def _merge_shards(shards: List[Path], output_path: Path) -> None:
+    """Concatena los shards (cabecera sólo del primero) en output_path de forma atómica."""
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    with open(tmp_path, "wb") as out:
+        for i, shard in enumerate(shards):
+            with open(shard, "rb") as f:
+                if i > 0:
+                    f.readline()
+                shutil.copyfileobj(f, out)
+    os.replace(tmp_path, output_path)
+
+
+def expand_inputs(patterns: List[str]) -> List[Path]:
+    """Expande rutas y globs, sin duplicados y respetando el orden."""
+    paths: List[Path] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        for match in matches:
+            path = Path(match)
+            if not path.is_file():
+                raise FileNotFoundError(f"Archivo de entrada no encontrado: {match}")
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def score_files(
+    inputs: List[Path],
+    model_name: str = "hgb_exoplanet_model",
+    version: str = "latest",
+    output_dir: Optional[Path] = None,
+    workers: Optional[int] = None,
+    chunk_rows: int = 50000,
+    merge: bool = True,
+    explain: bool = False,
+    top_k: int = 5
+) -> Dict[str, Any]:
+    """
+    Puntúa los CSV de entrada en paralelo.
+
+    Returns:
+        Resumen con filas, tiempo, filas/segundo y salidas por archivo
+    """
+    version = settings.resolve_version(model_name, version)
+    if not settings.version_exists(model_name, version):
+        raise FileNotFoundError(f"Versión '{version}' no encontrada para el modelo '{model_name}'")
+    output_dir = Path(output_dir or settings.OUTPUT_DIR / "bulk")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    # Esquema del modelo para validar las cabeceras antes de lanzar el pool
+    schema = HGBExoplanetModel()
+    schema.load_model(model_name, version, schema_only=True)
+    required = list(schema.X_num.columns)
+
+    start = time.perf_counter()
+    files: Dict[Path, Dict[str, Any]] = {}
+    tasks = []
+    for path in inputs:
+        header, data_offset, bytes_per_row = _read_header(path)
+        # Como en /predict/upload, basta con alguna feature del modelo (las ausentes se imputan)
+        columns = pd.read_csv(io.BytesIO(header), nrows=0).columns
+        if not pd.Index(required).isin(columns).any():
+            raise ValueError(f"{path}: no hay columnas de features para la predicción; el archivo debe "
+                             f"tener alguna de: {required[:5]}{'...' if len(required) > 5 else ''}")
+
+        stem = f"{path.stem}_predictions_{version}"
+        shard_dir = output_dir / stem
+        shard_dir.mkdir(exist_ok=True)
+        ranges = _byte_ranges(path, data_offset, chunk_rows * bytes_per_row)
+        shards = [shard_dir / f"part-{i:05d}.csv" for i in range(len(ranges))]
+        files[path] = {"output": output_dir / f"{stem}.csv", "shard_dir": shard_dir,
+                       "shards": shards, "rows": 0, "distribution": {}}
+        tasks += [(path, header, s, e, shard) for (s, e), shard in zip(ranges, shards)]
+
+    print(f"[INFO] {len(inputs)} archivo(s), {len(tasks)} bloques, {workers} workers, modelo {model_name}:{version}")
+    outputs = []
+    try:
+        # 'spawn': el proceso que llama puede tener ya hilos OpenMP (un fork podría colgarse)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                                 initializer=_init_worker, initargs=(model_name, version)) as pool:
+            futures = {
+                pool.submit(_score_chunk, str(path), header, s, e, str(shard), explain, top_k, generated_at): path
+                for path, header, s, e, shard in tasks
+            }
+            try:
+                for future in as_completed(futures):
+                    result = future.result()
+                    info = files[futures[future]]
+                    info["rows"] += result["rows"]
+                    for label, count in result["distribution"].items():
+                        info["distribution"][label] = info["distribution"].get(label, 0) + count
+            except BaseException:
+                # No seguir puntuando los bloques pendientes si uno falló
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+        for path, info in files.items():
+            shards = [shard for shard in info["shards"] if shard.exists()]
+            if merge:
+                _merge_shards(shards, info["output"])
+                shutil.rmtree(info["shard_dir"])
+                output = str(info["output"])
+            else:
+                output = str(info["shard_dir"])
+            outputs.append({"input": str(path), "output": output, "rows": info["rows"],
+                            "class_distribution": info["distribution"]})
+    except BaseException:
+        # Sin salida parcial: eliminar los shards ya escritos
+        for info in files.values():
+            shutil.rmtree(info["shard_dir"], ignore_errors=True)
+        raise
+
+    elapsed = time.perf_counter() - start
+    total_rows = sum(info["rows"] for info in files.values())
+    summary = {
+        "model": f"{model_name}:{version}",
+        "workers": workers,
+        "chunks": len(tasks),
+        "rows": total_rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(total_rows / elapsed, 1) if elapsed > 0 else None,
+        "files": outputs,
+    }
+    for item in outputs:
+        print(f"[INFO] {item['input']}: {item['rows']:,} filas -> {item['output']}")
+    print(f"[INFO] Total: {total_rows:,} filas en {elapsed:.2f} s ({summary['rows_per_second']:,} filas/s)")
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Scoring por lotes offline de CSV de KOIs")
+    parser.add_argument("inputs", nargs="+", help="Rutas o globs de CSV de entrada")
+    parser.add_argument("--model-name", default="hgb_exoplanet_model", help="Nombre del modelo")
+    parser.add_argument("--version", default="latest", help="Versión del modelo o 'latest'")
+    parser.add_argument("--output-dir", type=Path, default=None, help="Directorio de salida (default: data/bulk)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos del pool (default: núcleos disponibles)")
+    parser.add_argument("--chunk-rows", type=int, default=50000, help="Filas aproximadas por bloque")
+    parser.add_argument("--shards", action="store_true", help="Conservar un CSV por bloque en lugar de unirlos")
+    parser.add_argument("--explain", action="store_true", help="Agregar la columna top_features (TreeSHAP)")
+    parser.add_argument("--top-k", type=int, default=5, help="Features por fila con --explain")
+    args = parser.parse_args(argv)
+
+    try:
+        score_files(
+            expand_inputs(args.inputs),
+            model_name=args.model_name,
+            version=args.version,
+            output_dir=args.output_dir,
+            workers=args.workers,
+            chunk_rows=args.chunk_rows,
+            merge=not args.shards,
+            explain=args.explain,
+            top_k=args.top_k
+        )
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,7 +12,9 @@ setup(
         "numpy>=1.24.0",
         "pandas>=2.0.0",
         "python-dotenv>=1.0.0",
-        "scikit-learn>=1.3.0",
+        "scikit-learn>=1.3.0,<1.6",
+        "threadpoolctl>=3.1.0",
         "uvicorn>=0.24.0",
+        "websockets>=11.0",
     ],
 )
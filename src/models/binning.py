@@ -0,0 +1,220 @@
+"""
+Caché de matrices binneadas para reutilizarlas entre entrenamientos del HistGradientBoostingClassifier.
+"""
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+import numpy as np
+import sklearn
+from sklearn.ensemble import HistGradientBoostingClassifier
+
+from ..utils.config import settings
+
+
+# Versiones de scikit-learn cuyos internos del HistGradientBoosting usa este módulo y
+# out_of_core (_validate_data, _bin_data, _in_fit, _BinMapper): [mínima, máxima excluida).
+# Mantener en sincronía con requirements.txt, pyproject.toml y setup.py.
+SUPPORTED_SKLEARN = ((1, 3), (1, 6))
+
+
+def check_sklearn_version(version: str = sklearn.__version__) -> None:
+    """
+    Falla al importar si la versión instalada de scikit-learn no está soportada.
+
+    El límite <1.6 es una restricción de todo el proyecto (no sólo de este módulo): la caché
+    de binning y el entrenamiento fuera de memoria usan internos privados del
+    HistGradientBoosting (_bin_data, _in_fit, _BinMapper) que cambian entre versiones.
+    """
+    current = tuple(int(part) for part in re.findall(r"\d+", version)[:2])
+    low, high = SUPPORTED_SKLEARN
+    if not low <= current < high:
+        raise ImportError(
+            f"scikit-learn {version} no está soportado: el entrenamiento con binning en caché y "
+            f"fuera de memoria depende de internos de las versiones >={low[0]}.{low[1]},<{high[0]}.{high[1]}"
+        )
+
+
+check_sklearn_version()
+
+
+def fingerprint(X: np.ndarray) -> str:
+    """Huella del contenido de una matriz (forma, dtype y bytes)."""
+    X = np.ascontiguousarray(X)
+    digest = hashlib.blake2b(X.view(np.uint8), digest_size=16)
+    digest.update(f"{X.shape}{X.dtype}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class BinnedMatrixCache:
+    """
+    LRU de matrices binneadas.
+
+    Las claves combinan la huella de la matriz imputada (dataset + split) con los parámetros
+    del binning (max_bins, columnas categóricas y, si hay submuestreo, la semilla), así que
+    cambiar learning_rate o max_leaf_nodes reutiliza el mismo binning.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry["seconds"]
+            return entry
+
+    def put(self, key: Tuple, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            self.saved_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": int(sum(e["X_binned"].nbytes for e in self._entries.values())),
+                "hits": self.hits,
+                "misses": self.misses,
+                "saved_seconds": round(self.saved_seconds, 4),
+            }
+
+
+# Caché global del proceso (compartida por los entrenamientos de una sesión)
+binned_cache = BinnedMatrixCache(settings.BINNING_CACHE_SIZE)
+
+
+class CachedBinningHGBClassifier(HistGradientBoostingClassifier):
+    """
+    HistGradientBoostingClassifier que toma las matrices binneadas (entrenamiento y
+    validación interna del early stopping) de ``binned_cache`` en lugar de recalcularlas.
+
+    Tras entrenar, ``to_estimator()`` devuelve un HistGradientBoostingClassifier estándar
+    para que los modelos guardados no dependan de esta clase.
+    """
+
+    def _binning_params(self, n_samples: int) -> Tuple:
+        mapper = self._bin_mapper
+        categorical = None if mapper.is_categorical is None else np.asarray(mapper.is_categorical).tobytes()
+        known = None if mapper.known_categories is None else tuple(
+            None if c is None else fingerprint(np.asarray(c)) for c in mapper.known_categories
+        )
+        # Por encima de subsample los cuantiles salen de una submuestra que depende de la semilla
+        seed = int(mapper.random_state) if mapper.subsample is not None and n_samples > mapper.subsample else None
+        return mapper.n_bins, mapper.subsample, categorical, known, seed
+
+    def _bin_data(self, X, is_training_data):
+        if is_training_data:
+            key = ("train", fingerprint(X)) + self._binning_params(X.shape[0])
+            self._binning_key = key
+        else:
+            key = ("validation", fingerprint(X), getattr(self, "_binning_key", None))
+
+        entry = binned_cache.get(key)
+        if entry is not None:
+            if is_training_data:
+                self._bin_mapper = entry["bin_mapper"]
+            return entry["X_binned"]
+
+        start = time.perf_counter()
+        X_binned = super()._bin_data(X, is_training_data)
+        entry = {"X_binned": X_binned, "seconds": time.perf_counter() - start}
+        if is_training_data:
+            entry["bin_mapper"] = self._bin_mapper
+        binned_cache.put(key, entry)
+        return X_binned
+
+    def to_estimator(self) -> HistGradientBoostingClassifier:
+        """Copia el estado entrenado en un HistGradientBoostingClassifier estándar."""
+        return _standard_estimator(self, "_binning_key")
+
+
+class PreBinnedHGBClassifier(HistGradientBoostingClassifier):
+    """
+    HistGradientBoostingClassifier que se entrena sobre una matriz ya binneada (uint8) con
+    un _BinMapper ajustado fuera, sin materializar nunca la matriz float64 de entrenamiento.
+
+    ``fit_binned`` pasa a ``fit`` una columna con los índices de fila en lugar de X, así la
+    división interna del early stopping (estratificada y con la misma semilla) es la misma
+    que con los datos originales; ``_bin_data`` devuelve las filas binneadas correspondientes.
+    """
+
+    def fit_binned(self, X_binned: np.ndarray, y: np.ndarray, bin_mapper) -> "PreBinnedHGBClassifier":
+        self._prebinned = (X_binned, bin_mapper)
+        try:
+            self.fit(np.arange(len(X_binned), dtype=np.float64)[:, None], y)
+        finally:
+            del self._prebinned
+        self._n_features = self.n_features_in_ = X_binned.shape[1]
+        return self
+
+    def _validate_data(self, *args, **kwargs):
+        validated = super()._validate_data(*args, **kwargs)
+        # Las restricciones por feature (monotonic_cst) se dimensionan con n_features_in_:
+        # debe ser el ancho de la matriz binneada, no el de la columna de índices
+        prebinned = getattr(self, "_prebinned", None)
+        if prebinned is not None:
+            self.n_features_in_ = prebinned[0].shape[1]
+        return validated
+
+    def _bin_data(self, X, is_training_data):
+        X_binned, bin_mapper = self._prebinned
+        rows = X[:, 0].astype(np.intp)
+        if len(rows) != len(X_binned) or not np.array_equal(rows, np.arange(len(rows))):
+            X_binned = X_binned[rows]
+        if is_training_data:
+            self._bin_mapper = bin_mapper
+            return np.asfortranarray(X_binned)
+        return np.ascontiguousarray(X_binned)
+
+    def to_estimator(self) -> HistGradientBoostingClassifier:
+        """Copia el estado entrenado en un HistGradientBoostingClassifier estándar."""
+        return _standard_estimator(self)
+
+
+def _standard_estimator(estimator: HistGradientBoostingClassifier, *private: str) -> HistGradientBoostingClassifier:
+    standard = HistGradientBoostingClassifier.__new__(HistGradientBoostingClassifier)
+    state = dict(estimator.__dict__)
+    for name in private:
+        state.pop(name, None)
+    standard.__dict__.update(state)
+    return standard
+
+
+def predict_binned(estimator: HistGradientBoostingClassifier, X_binned: np.ndarray) -> np.ndarray:
+    """Predice filas ya binneadas con el _BinMapper del estimador (sin volver a valores reales)."""
+    estimator._in_fit = True
+    try:
+        return estimator.predict(X_binned)
+    finally:
+        estimator._in_fit = False
+
+
+def predict_proba_binned(estimator: HistGradientBoostingClassifier, X_binned: np.ndarray) -> np.ndarray:
+    """Probabilidades de filas ya binneadas (ver predict_binned)."""
+    estimator._in_fit = True
+    try:
+        return estimator.predict_proba(X_binned)
+    finally:
+        estimator._in_fit = False
@@ -0,0 +1,212 @@
+"""
+Modelo destilado (compacto) por versión para predicciones de baja latencia.
+"""
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+
+from ..utils.config import settings
+from ..utils.cpu_budget import train_budget, inference_budget
+
+
+# Umbrales de confianza evaluados en el reporte de enrutamiento
+ROUTING_THRESHOLDS = (0.6, 0.7, 0.8, 0.9)
+
+
+def _single_row_latency_ms(predict_proba, X: pd.DataFrame, n_rows: int = 200) -> float:
+    """Mediana de la latencia de predict_proba fila a fila (ms)."""
+    timings = []
+    for i in range(min(n_rows, len(X))):
+        start = time.perf_counter()
+        with inference_budget.limit():
+            predict_proba(X.iloc[i:i + 1])
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1e3)
+
+
+def _batch_latency_ms(predict_proba, X: pd.DataFrame, repeats: int = 3) -> float:
+    """Mejor tiempo de predict_proba sobre todo X (ms)."""
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with inference_budget.limit():
+            predict_proba(X)
+        best = min(best, time.perf_counter() - start)
+    return float(best * 1e3)
+
+
+def train_student(teacher, X: pd.DataFrame, max_leaf_nodes: int, max_iter: int,
+                  learning_rate: float, seed: int = 42) -> HistGradientBoostingClassifier:
+    """
+    Entrena un HGB pequeño sobre las probabilidades del maestro.
+
+    Cada fila se replica una vez por clase con peso igual a la probabilidad del maestro,
+    con lo que la log-loss ponderada equivale a la entropía cruzada con etiquetas suaves.
+    Los faltantes los maneja el propio HGB (sin imputer), lo que abarata cada predicción.
+    """
+    with train_budget.limit():
+        proba = teacher.predict_proba(X)
+    classes = teacher.classes_
+    X_rep = pd.concat([X] * len(classes), ignore_index=True)
+    y_rep = np.repeat(classes, len(X))
+    weights = proba.T.ravel()
+
+    student = HistGradientBoostingClassifier(
+        max_leaf_nodes=max_leaf_nodes,
+        max_iter=max_iter,
+        learning_rate=learning_rate,
+        early_stopping=False,
+        random_state=seed
+    )
+    keep = weights > 0
+    with train_budget.limit():
+        student.fit(X_rep[keep], y_rep[keep], sample_weight=weights[keep])
+    return student
+
+
+def distill_version(
+    model_name: str,
+    version: str,
+    max_leaf_nodes: Optional[int] = None,
+    max_iter: Optional[int] = None,
+    learning_rate: Optional[float] = None,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """
+    Crea el modelo destilado de una versión a partir de su split de entrenamiento y
+    guarda el modelo y un reporte (acuerdo con el maestro, enrutamiento y latencias).
+
+    Returns:
+        Reporte del modelo destilado
+    """
+    from .hgb_exoplanet import HGBExoplanetModel
+
+    max_leaf_nodes = max_leaf_nodes or settings.DISTILL_MAX_LEAF_NODES
+    max_iter = max_iter or settings.DISTILL_MAX_ITER
+    learning_rate = learning_rate or settings.DISTILL_LEARNING_RATE
+    paths = settings.get_version_paths(model_name, version)
+    if not paths["model_path"].exists():
+        raise FileNotFoundError(f"Modelo no encontrado: {paths['model_path']}")
+
+    start = time.perf_counter()
+    teacher = joblib.load(paths["model_path"])
+
+    # Reconstruir el split de la versión (agrupado por estrella)
+    source = HGBExoplanetModel(seed=seed)
+    source.load_data()
+    source.prepare_features()
+    source.split_data()
+    columns = list(getattr(teacher, "feature_names_in_", source.X_train.columns))
+    X_train = source.X_train.reindex(columns=columns)
+    X_test = source.X_test.reindex(columns=columns)
+    y_test = source.y_test.to_numpy()
+
+    student = train_student(teacher, X_train, max_leaf_nodes, max_iter, learning_rate, seed)
+    train_seconds = time.perf_counter() - start
+
+    with train_budget.limit():
+        teacher_pred = teacher.predict(X_test)
+        student_proba = student.predict_proba(X_test)
+    student_pred = student.classes_[student_proba.argmax(axis=1)]
+    confidence = student_proba.max(axis=1)
+
+    routing = []
+    for threshold in ROUTING_THRESHOLDS:
+        served = confidence >= threshold
+        routed = np.where(served, student_pred, teacher_pred)
+        routing.append({
+            "threshold": threshold,
+            "distilled_coverage": float(served.mean()),
+            "agreement_with_teacher": float(np.mean(routed == teacher_pred)),
+            "accuracy": float(np.mean(routed == y_test)),
+        })
+
+    latency = {
+        "teacher_single_row_ms": _single_row_latency_ms(teacher.predict_proba, X_test),
+        "distilled_single_row_ms": _single_row_latency_ms(student.predict_proba, X_test),
+        "teacher_batch_ms": _batch_latency_ms(teacher.predict_proba, X_test),
+        "distilled_batch_ms": _batch_latency_ms(student.predict_proba, X_test),
+        "batch_rows": int(len(X_test)),
+    }
+    latency["single_row_speedup"] = round(latency["teacher_single_row_ms"] / latency["distilled_single_row_ms"], 2)
+    latency["batch_speedup"] = round(latency["teacher_batch_ms"] / latency["distilled_batch_ms"], 2)
+
+    paths["distilled_model_path"].parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(student, paths["distilled_model_path"])
+
+    report = {
+        "model_name": model_name,
+        "version": version,
+        "student": {
+            "max_leaf_nodes": max_leaf_nodes,
+            "max_iter": max_iter,
+            "learning_rate": learning_rate,
+            "n_trees": int(student.n_iter_ * student.n_trees_per_iteration_),
+            "model_bytes": paths["distilled_model_path"].stat().st_size,
+        },
+        "teacher": {
+            "n_trees": int(teacher[-1].n_iter_ * teacher[-1].n_trees_per_iteration_),
+            "model_bytes": paths["model_path"].stat().st_size,
+        },
+        "holdout_rows": int(len(X_test)),
+        "agreement_with_teacher": float(np.mean(student_pred == teacher_pred)),
+        "teacher_accuracy": float(np.mean(teacher_pred == y_test)),
+        "distilled_accuracy": float(np.mean(student_pred == y_test)),
+        "routing": routing,
+        "latency": latency,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "train_seconds": round(train_seconds, 3),
+    }
+    with open(paths["distilled_report_path"], "w") as f:
+        json.dump(report, f, indent=4)
+
+    distilled_models.invalidate(model_name, version)
+    print(f"[INFO] Modelo destilado guardado en: {paths['distilled_model_path']} "
+          f"(acuerdo {report['agreement_with_teacher']:.3f}, speedup x{latency['batch_speedup']})")
+    return report
+
+
+def load_distilled_report(model_name: str, version: str) -> Optional[Dict[str, Any]]:
+    """Reporte del modelo destilado de una versión, si existe."""
+    report_path = settings.get_version_paths(model_name, version)["distilled_report_path"]
+    if not report_path.exists():
+        return None
+    with open(report_path, "r") as f:
+        return json.load(f)
+
+
+class DistilledModelCache:
+    """Modelos destilados cargados en memoria (son pequeños y se usan en el camino de baja latencia)."""
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str], HistGradientBoostingClassifier] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, version: str) -> Optional[HistGradientBoostingClassifier]:
+        key = (model_name, version)
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+
+        model_path = settings.get_version_paths(model_name, version)["distilled_model_path"]
+        if not model_path.exists():
+            return None
+        student = joblib.load(model_path)
+        with self._lock:
+            self._models[key] = student
+        return student
+
+    def invalidate(self, model_name: str, version: str) -> None:
+        with self._lock:
+            self._models.pop((model_name, version), None)
+
+
+# Instancia global de modelos destilados
+distilled_models = DistilledModelCache()
@@ -0,0 +1,235 @@
+"""
+Monitoreo de drift de features con sketches de memoria constante (histogramas mergeables).
+"""
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from ..utils.config import settings
+
+
+# Umbrales habituales del Population Stability Index
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+
+class FeatureSketch:
+    """
+    Histograma por feature con cortes fijos y una casilla extra de faltantes.
+
+    El tamaño sólo depende de (features × bins); dos sketches con los mismos cortes
+    se combinan sumando conteos, así que pueden agregarse entre workers.
+    """
+
+    def __init__(self, features: List[str], cuts: np.ndarray):
+        self.features = list(features)
+        self.cuts = np.asarray(cuts, dtype=np.float64)          # (F, n_bins - 1)
+        self.n_slots = self.cuts.shape[1] + 2                   # bins + faltantes
+        self.counts = np.zeros((len(self.features), self.n_slots), dtype=np.int64)
+        self.rows = 0
+        self._offsets = np.arange(len(self.features))[None, :] * self.n_slots
+        self._lock = threading.Lock()
+
+    def update(self, X: np.ndarray, chunk_size: int = 8192) -> None:
+        """Agrega un lote de filas (n, F) al histograma con operaciones vectorizadas."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+
+        batch = np.zeros(self.counts.size, dtype=np.int64)
+        for start in range(0, len(X), chunk_size):
+            block = X[start:start + chunk_size]
+            slots = (block[:, :, None] > self.cuts[None, :, :]).sum(axis=2)
+            slots[np.isnan(block)] = self.n_slots - 1
+            batch += np.bincount((slots + self._offsets).ravel(), minlength=self.counts.size)
+
+        with self._lock:
+            self.counts += batch.reshape(self.counts.shape)
+            self.rows += len(X)
+
+    def merge(self, other: "FeatureSketch") -> None:
+        """Combina otro sketch con los mismos cortes."""
+        if other.features != self.features or not np.array_equal(other.cuts, self.cuts, equal_nan=True):
+            raise ValueError("Los sketches deben compartir features y cortes para combinarse")
+        with self._lock:
+            self.counts += other.counts
+            self.rows += other.rows
+
+    def missing_rate(self) -> np.ndarray:
+        return self.counts[:, -1] / max(self.rows, 1)
+
+    @classmethod
+    def from_reference(cls, X: pd.DataFrame, n_bins: Optional[int] = None) -> "FeatureSketch":
+        """Construye cortes por cuantiles del entrenamiento y el histograma de referencia."""
+        n_bins = n_bins or settings.DRIFT_BINS
+        values = X.to_numpy(dtype=np.float64)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # columnas sin valores
+            cuts = np.nanquantile(values, np.linspace(0, 1, n_bins + 1)[1:-1], axis=0).T
+        sketch = cls(list(X.columns), cuts)
+        sketch.update(values)
+        return sketch
+
+    def save(self, path: Path) -> None:
+        np.savez_compressed(path, features=np.array(self.features), cuts=self.cuts,
+                            counts=self.counts, rows=np.array(self.rows))
+
+    @classmethod
+    def load(cls, path: Path) -> "FeatureSketch":
+        data = np.load(path, allow_pickle=False)
+        sketch = cls(list(data["features"]), data["cuts"])
+        sketch.counts = data["counts"].astype(np.int64)
+        sketch.rows = int(data["rows"])
+        return sketch
+
+    def empty_like(self) -> "FeatureSketch":
+        return FeatureSketch(self.features, self.cuts)
+
+
+def population_stability_index(reference: np.ndarray, live: np.ndarray, eps: float = 1e-4) -> np.ndarray:
+    """PSI por fila entre dos matrices de conteos (F, slots)."""
+    p = reference / np.maximum(reference.sum(axis=1, keepdims=True), 1) + eps
+    q = live / np.maximum(live.sum(axis=1, keepdims=True), 1) + eps
+    return ((q - p) * np.log(q / p)).sum(axis=1)
+
+
+def _status(psi: float) -> str:
+    if psi >= PSI_SIGNIFICANT:
+        return "significant"
+    if psi >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
+
+
+class DriftMonitor:
+    """
+    Mantiene, por modelo y versión, el sketch de referencia (calculado al guardar la versión)
+    y un sketch vivo que se actualiza con cada fila puntuada, sin guardar el tráfico.
+    """
+
+    def __init__(self):
+        self._references: Dict[Tuple[str, str], FeatureSketch] = {}
+        self._live: Dict[Tuple[str, str], FeatureSketch] = {}
+        self._building: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="drift-reference")
+
+    def _reference(self, model_name: str, version: str) -> Optional[FeatureSketch]:
+        """Referencia de la versión; si no existe en disco se construye una vez en segundo plano."""
+        key = (model_name, version)
+        with self._lock:
+            if key in self._references:
+                return self._references[key]
+
+        path = settings.get_version_paths(model_name, version)["drift_reference_path"]
+        if path.exists():
+            reference = FeatureSketch.load(path)
+            with self._lock:
+                self._references[key] = reference
+                self._live.setdefault(key, reference.empty_like())
+            return reference
+
+        with self._lock:
+            if key not in self._building:
+                self._building[key] = self._executor.submit(self._build_reference, model_name, version)
+        return None
+
+    def _build_reference(self, model_name: str, version: str) -> None:
+        """
+        Reconstruye el split de entrenamiento de una versión antigua y guarda su referencia,
+        con las features (y el orden) con las que se entrenó su pipeline.
+        """
+        from .hgb_exoplanet import HGBExoplanetModel
+
+        try:
+            pipe = joblib.load(settings.get_version_paths(model_name, version)["model_path"])
+            features = list(pipe.feature_names_in_)
+            source = HGBExoplanetModel(feature_columns=features)
+            source.load_data()
+            source.prepare_features()
+            source.split_data()
+            save_reference(model_name, version, source.X_train.reindex(columns=features))
+        except Exception as e:
+            print(f"[WARNING] No se pudo construir la referencia de drift de {model_name}:{version}: {e}")
+        finally:
+            with self._lock:
+                self._building.pop((model_name, version), None)
+
+    def observe(self, model_name: str, version: str, X: pd.DataFrame) -> None:
+        """Actualiza el sketch vivo con las filas puntuadas (nunca interrumpe la predicción)."""
+        if not settings.DRIFT_ENABLED:
+            return
+        try:
+            version = settings.resolve_version(model_name, version)
+            if self._reference(model_name, version) is None:
+                return
+            live = self._live[(model_name, version)]
+            live.update(X.reindex(columns=live.features).to_numpy(dtype=np.float64))
+        except Exception as e:
+            print(f"[WARNING] Error actualizando el monitoreo de drift: {e}")
+
+    def report(self, model_name: str, version: str) -> Optional[Dict[str, Any]]:
+        """
+        Drift del tráfico observado frente a la referencia de la versión.
+
+        Returns:
+            Resumen con PSI y tasas de faltantes por feature, o None si la referencia aún se construye
+        """
+        version = settings.resolve_version(model_name, version)
+        reference = self._reference(model_name, version)
+        if reference is None:
+            return None
+
+        live = self._live[(model_name, version)]
+        with live._lock:
+            live_counts, live_rows = live.counts.copy(), live.rows
+
+        psi = population_stability_index(reference.counts, live_counts) if live_rows else np.zeros(len(reference.features))
+        live_missing = live_counts[:, -1] / max(live_rows, 1)
+        features = sorted(
+            (
+                {
+                    "feature": name,
+                    "psi": round(float(psi[i]), 6),
+                    "status": _status(psi[i]) if live_rows else "no_data",
+                    "reference_missing_rate": round(float(reference.missing_rate()[i]), 6),
+                    "live_missing_rate": round(float(live_missing[i]), 6),
+                }
+                for i, name in enumerate(reference.features)
+            ),
+            key=lambda item: item["psi"],
+            reverse=True
+        )
+
+        return {
+            "model_name": model_name,
+            "version": version,
+            "rows_observed": int(live_rows),
+            "reference_rows": int(reference.rows),
+            "bins": int(reference.cuts.shape[1] + 1),
+            "overall": {
+                "max_psi": round(float(psi.max()), 6) if live_rows else 0.0,
+                "mean_psi": round(float(psi.mean()), 6) if live_rows else 0.0,
+                "drifted_features": int((psi >= PSI_SIGNIFICANT).sum()) if live_rows else 0,
+                "status": _status(float(psi.max())) if live_rows else "no_data",
+            },
+            "features": features,
+        }
+
+
+def save_reference(model_name: str, version: str, X_train: pd.DataFrame) -> Path:
+    """Calcula y guarda el sketch de referencia de una versión a partir de su X_train."""
+    path = settings.get_version_paths(model_name, version)["drift_reference_path"]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    FeatureSketch.from_reference(X_train).save(path)
+    return path
+
+
+# Instancia global del monitor de drift
+drift_monitor = DriftMonitor()
@@ -0,0 +1,172 @@
+"""
+Scoring de varias versiones de un modelo sobre la misma entrada (ensemble por voto suave).
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+import numpy as np
+import pandas as pd
+
+from ..utils.config import settings
+from ..utils.cpu_budget import inference_budget
+from .hgb_exoplanet import HGBExoplanetModel
+
+
+# Pool para puntuar las versiones en paralelo (la inferencia de HGB libera el GIL)
+_ensemble_executor = ThreadPoolExecutor(max_workers=settings.ENSEMBLE_WORKERS, thread_name_prefix="ensemble")
+
+
+def parse_versions(versions: List[str]) -> List[str]:
+    """Acepta versiones repetidas (?versions=a&versions=b) o separadas por comas."""
+    parsed = []
+    for item in versions:
+        parsed += [v.strip() for v in item.split(",") if v.strip()]
+    return parsed
+
+
+class VersionEnsemble:
+    """
+    Puntúa varias versiones sobre una misma entrada.
+
+    La entrada se alinea una sola vez por esquema de features distinto (una vez en total
+    si todas las versiones comparten esquema) y cada versión predice sobre esa matriz.
+    Las probabilidades se expresan sobre la unión de clases (con las etiquetas normalizadas,
+    ej: "FALSE POSITIVE" de versiones antiguas como "FALSE_POSITIVE") y se promedian (voto suave).
+    """
+
+    def __init__(self, models: Dict[str, HGBExoplanetModel]):
+        if not models:
+            raise ValueError("El ensemble necesita al menos una versión")
+        self.models = models
+        self.classes = sorted({self._label(c) for m in models.values() for c in m.pipe.classes_})
+
+    @staticmethod
+    def _label(label: Any) -> str:
+        return HGBExoplanetModel.LABEL_MAPPING.get(str(label), str(label))
+
+    @property
+    def versions(self) -> List[str]:
+        return list(self.models)
+
+    @property
+    def primary(self) -> HGBExoplanetModel:
+        """Primera versión solicitada (usada para el esquema del CSV y el monitoreo)."""
+        return next(iter(self.models.values()))
+
+    def schemas(self) -> Dict[Tuple[str, ...], List[str]]:
+        """Versiones agrupadas por esquema de features."""
+        groups: Dict[Tuple[str, ...], List[str]] = {}
+        for version, model in self.models.items():
+            groups.setdefault(tuple(model.X_num.columns), []).append(version)
+        return groups
+
+    def required_columns(self) -> List[str]:
+        """Unión de las columnas que necesita alguna de las versiones."""
+        columns: List[str] = []
+        for schema in self.schemas():
+            columns += [c for c in schema if c not in columns]
+        return columns
+
+    def align(self, X: pd.DataFrame, validated: Optional[pd.DataFrame] = None) -> Dict[Tuple[str, ...], pd.DataFrame]:
+        """
+        Alinea la entrada una vez por esquema distinto.
+
+        Args:
+            validated: X ya validada con el esquema de la versión principal (se reutiliza)
+        """
+        primary_schema = tuple(self.primary.X_num.columns)
+        aligned = {}
+        for schema, versions in self.schemas().items():
+            if validated is not None and schema == primary_schema:
+                frame = validated
+            else:
+                frame = self.models[versions[0]].get_schema().validate(X, report=False)[0]
+            if any(self.models[v].compact for v in versions):
+                frame = frame.astype(np.float32)
+            aligned[schema] = frame
+        return aligned
+
+    def _proba(self, version: str, X: pd.DataFrame) -> np.ndarray:
+        """Probabilidades de una versión en el orden de self.classes."""
+        model = self.models[version]
+        with inference_budget.limit():
+            proba = model.pipe.predict_proba(X)
+        out = np.zeros((len(X), len(self.classes)))
+        positions = [self.classes.index(self._label(c)) for c in model.pipe.classes_]
+        out[:, positions] = proba
+        return out
+
+    def score(self, X: pd.DataFrame, validated: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """
+        Args:
+            X: Entrada original
+            validated: X ya validada con el esquema de la versión principal (evita alinearla de nuevo)
+
+        Returns:
+            classes, probabilidades por versión, promedio y clase predicha por el ensemble
+        """
+        aligned = self.align(X, validated)
+        jobs = {
+            version: _ensemble_executor.submit(self._proba, version, aligned[schema])
+            for schema, versions in self.schemas().items()
+            for version in versions
+        }
+        per_version = {version: jobs[version].result() for version in self.models}
+
+        mean = np.mean(list(per_version.values()), axis=0)
+        return {
+            "classes": self.classes,
+            "per_version": per_version,
+            "mean": mean,
+            "predicted": np.asarray(self.classes, dtype=object)[mean.argmax(axis=1)],
+            "shared_schema": len(aligned) == 1,
+        }
+
+
+class EnsembleMemberCache:
+    """
+    Versiones distintas de la servida que se mantienen cargadas (LRU acotado) para ensembles
+    y el tier fast de /predict, sin leerlas de disco en cada petición.
+
+    La clave incluye la fecha de modificación del pipeline: si la versión se reescribe,
+    la entrada anterior deja de usarse.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._models: "OrderedDict[Tuple[str, str, int], HGBExoplanetModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model_name: str, version: str, load: Callable[[], HGBExoplanetModel]) -> HGBExoplanetModel:
+        """
+        Args:
+            load: Carga la versión si no está en caché (sus excepciones se propagan)
+        """
+        model_path = settings.get_version_paths(model_name, version)["model_path"]
+        key = (model_name, version, model_path.stat().st_mtime_ns if model_path.exists() else 0)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key]
+
+        model = load()
+        with self._lock:
+            self.misses += 1
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.capacity:
+                self._models.popitem(last=False)
+        return model
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+
+# Instancia global de versiones cargadas (ensembles y tier fast)
+ensemble_members = EnsembleMemberCache(settings.ENSEMBLE_MAX_VERSIONS)
@@ -2,19 +2,49 @@
 Modelo HGBExoplanetModel refactorizado con versionado automático.
 """
 import json
+import time
+import hashlib
 import joblib
+import sklearn
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Tuple, List
 
 from sklearn.model_selection import GroupShuffleSplit
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
 from sklearn.ensemble import HistGradientBoostingClassifier
-from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, f1_score
 
 from ..utils.config import settings
+from ..utils.telemetry import TrainingTelemetry, track_stage
+from ..utils.cpu_budget import train_budget, inference_budget
+from .tree_shap import HGBTreeExplainer
+from .drift import save_reference
+from .similarity import build_similarity_index
+from .binning import CachedBinningHGBClassifier, PreBinnedHGBClassifier, predict_proba_binned
+from .holdout import HoldoutScores
+from .promotion import promotion_gate
+from .schema import FeatureSchema
+from .out_of_core import OutOfCoreDataset
+
+
+# Huellas de archivos ya calculadas: (ruta, tamaño, mtime) -> digest
+_file_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+def _file_digest(path: Path) -> str:
+    """Hash del contenido de un archivo (cacheado mientras no cambien tamaño ni mtime)."""
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_digests:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        _file_digests[key] = digest.hexdigest()
+    return _file_digests[key]
 
 
 class HGBExoplanetModel:
@@ -23,6 +53,17 @@ class HGBExoplanetModel:
     Incluye versionado automático y gestión de métricas.
     """
 
+    # Columnas con fuga de información o metadatos que nunca se usan como features
+    LEAK_OR_META = [
+        "koi_pdisposition", "koi_score", "koi_tce_delivname",
+        "kepler_name", "kepoi_name"
+    ]
+
+    # Normalización de etiquetas del archivo (versiones antiguas se entrenaron sin ella)
+    LABEL_MAPPING = {
+        "FALSE POSITIVE": "FALSE_POSITIVE"
+    }
+
     def __init__(
         self, 
         csv_path: Optional[Path] = None,
@@ -32,7 +73,11 @@ class HGBExoplanetModel:
         learning_rate: Optional[float] = None,
         max_leaf_nodes: Optional[int] = None,
         min_samples_leaf: Optional[int] = None,
-        early_stopping: Optional[bool] = None
+        early_stopping: Optional[bool] = None,
+        compact: Optional[bool] = None,
+        projection: Optional[str] = None,
+        feature_columns: Optional[List[str]] = None,
+        out_of_core: Optional[bool] = None
     ):
         self.csv_path = csv_path or settings.get_dataset_path()
         self.target = target
@@ -45,6 +90,17 @@ class HGBExoplanetModel:
         self.min_samples_leaf = min_samples_leaf if min_samples_leaf is not None else settings.DEFAULT_MIN_SAMPLES_LEAF
         self.early_stopping = early_stopping if early_stopping is not None else settings.DEFAULT_EARLY_STOPPING
 
+        # Modo compacto: float32, categorías para textos y liberación de frames tras guardar
+        self.compact = compact if compact is not None else settings.COMPACT_DATA
+
+        # Proyección al leer el CSV: "infer", "manifest" u "off" (o un esquema explícito de features)
+        self.projection = projection or settings.PROJECTION_MODE
+        self.feature_columns = feature_columns
+
+        # Entrenamiento fuera de memoria: CSV por bloques y matriz binneada uint8 (ver out_of_core)
+        self.out_of_core = out_of_core if out_of_core is not None else settings.OUT_OF_CORE
+        self.binned: Optional[OutOfCoreDataset] = None
+
         # Estado del modelo
         self.model = None
         self.pipe = None
@@ -52,46 +108,130 @@ class HGBExoplanetModel:
         self.y_train = self.y_test = None
         self.groups_train = self.groups_test = None
         self.comparison = None
-        self.y_pred = None
+        self.y_pred = self.y_proba = None
         self.version = None
-
+        self._explainer = None
+        self._schema = None
+        self.feature_ranges = None
+        self._model_dir = None
+        self.telemetry = TrainingTelemetry(sample_interval=settings.TELEMETRY_SAMPLE_INTERVAL)
+        self.fingerprint = None
+        self.reused = False
+        self.promotion = None
+
+    @track_stage("load_data", lambda self: {"rows": len(self.df), "columns": self.df.shape[1]})
     def load_data(self) -> pd.DataFrame:
-        """Carga datos desde CSV."""
-        df = pd.read_csv(self.csv_path, comment="#")
+        """Carga datos desde CSV, leyendo sólo las columnas necesarias cuando hay proyección."""
+        df = None
+        features = self._projected_columns()
+        if features is not None:
+            df = self._read_projected(features)
+        if df is None:
+            df = pd.read_csv(self.csv_path, comment="#")
+        if self.compact:
+            df = self._compact_frame(df)
         assert self.target in df.columns, f"Falta la columna objetivo {self.target}"
         assert self.group_col in df.columns, f"Falta {self.group_col} para agrupar por estrella"
         self.df = df
         print(f"[INFO] Dataset cargado: {len(df):,} filas")
         return df
 
-    def prepare_features(self) -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
-        """Prepara features eliminando columnas problemáticas."""
-        leak_or_meta = [
-            "koi_pdisposition", "koi_score", "koi_tce_delivname",
-            "kepler_name", "kepoi_name"
+    def _excluded_columns(self) -> set:
+        """Columnas que nunca son features: objetivo, fugas/metadatos, RA/DEC y el id de grupo."""
+        return {self.target, "ra", "dec", self.group_col, *self.LEAK_OR_META}
+
+    def _projected_columns(self, model_name: str = "hgb_exoplanet_model") -> Optional[List[str]]:
+        """
+        Determina las features candidatas a leer del CSV.
+
+        Returns:
+            Lista de features (sin objetivo ni grupo) o None para leer todas las columnas
+        """
+        if self.feature_columns is not None:
+            return list(self.feature_columns)
+
+        if self.projection == "manifest":
+            manifest = settings.load_manifest(model_name, "latest")
+            if manifest is not None:
+                return list(manifest["features"])
+            print("[WARNING] Sin manifiesto de versión previa, se infiere el esquema del CSV")
+
+        if self.projection in ("infer", "manifest"):
+            return self._infer_feature_columns()
+
+        return None
+
+    def _infer_feature_columns(self) -> List[str]:
+        """Inferir tipos con una muestra: sólo interesan las columnas numéricas no excluidas."""
+        sample = pd.read_csv(self.csv_path, comment="#", nrows=settings.PROJECTION_SAMPLE_ROWS)
+        excluded = self._excluded_columns()
+        return [
+            c for c, dtype in sample.dtypes.items()
+            if c not in excluded
+            and pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
         ]
-        df = self.df.copy()
 
-        X_all = df.drop(columns=[self.target] + [c for c in leak_or_meta if c in df.columns], errors="ignore")
-        X_num = X_all.select_dtypes(include=[np.number]).copy()
+    def _read_projected(self, features: List[str]) -> Optional[pd.DataFrame]:
+        """Lee sólo features, objetivo y grupo con parsers tipados; None si el esquema no encaja."""
+        header = pd.read_csv(self.csv_path, comment="#", nrows=0).columns
+        missing = [c for c in features if c not in header]
+        if missing:
+            print(f"[WARNING] Columnas del esquema ausentes en el CSV ({missing[:5]}), se lee el archivo completo")
+            return None
+
+        float_dtype = np.float32 if self.compact else np.float64
+        usecols = [c for c in header if c in set(features) | {self.target, self.group_col}]
+        dtypes = {c: float_dtype for c in features}
+        if self.compact:
+            dtypes[self.target] = "category"
 
-        # Quitar columnas completamente nulas
-        all_null = X_num.columns[X_num.isna().all()].tolist()
-        if all_null:
-            X_num = X_num.drop(columns=all_null)
+        try:
+            df = pd.read_csv(self.csv_path, comment="#", usecols=usecols, dtype=dtypes)
+        except ValueError as e:
+            print(f"[WARNING] Lectura tipada fallida ({e}), se lee el archivo completo")
+            return None
+
+        print(f"[INFO] Proyección: {len(usecols)} de {len(header)} columnas leídas")
+        return df
 
-        # Quitar RA/DEC y el id de grupo
-        for c in ["ra", "dec", self.group_col]:
-            if c in X_num.columns:
-                X_num = X_num.drop(columns=[c])
+    @staticmethod
+    def _compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Reduce el DataFrame a float32, enteros mínimos y categorías para columnas de texto."""
+        columns = {}
+        for col, series in df.items():
+            if pd.api.types.is_float_dtype(series.dtype):
+                columns[col] = series.astype(np.float32, copy=False)
+            elif pd.api.types.is_integer_dtype(series.dtype):
+                columns[col] = pd.to_numeric(series, downcast="integer")
+            elif series.dtype == object:
+                columns[col] = series.astype("category")
+            else:
+                columns[col] = series
+        return pd.DataFrame(columns, index=df.index)
+
+    @track_stage("prepare_features", lambda self: {"rows": len(self.X_num), "features": self.X_num.shape[1]})
+    def prepare_features(self) -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
+        """Prepara features eliminando columnas problemáticas."""
+        df = self.df
+        excluded = self._excluded_columns()
+
+        # Seleccionar numéricas no completamente nulas y copiar una sola vez
+        feature_cols = [
+            c for c, dtype in df.dtypes.items()
+            if c not in excluded
+            and pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+            and df[c].notna().any()
+        ]
+        X_num = df[feature_cols]
 
         y = df[self.target].copy()
         
         # Transformar etiquetas de español a inglés
-        label_mapping = {
-            "FALSE POSITIVE": "FALSE_POSITIVE"
-        }
-        y = y.replace(label_mapping)
+        label_mapping = self.LABEL_MAPPING
+        if isinstance(y.dtype, pd.CategoricalDtype):
+            y = y.cat.rename_categories(lambda c: label_mapping.get(c, c))
+        else:
+            y = y.replace(label_mapping)
         
         groups = df[self.group_col].copy()
 
@@ -100,6 +240,44 @@ class HGBExoplanetModel:
         self.X_num, self.y, self.groups = X_num, y, groups
         return X_num, y, groups
 
+    @track_stage("sketch_data", lambda self: {
+        "rows": self.binned.rows, "features": len(self.binned.features), "chunks": self.binned.chunks,
+        "sketch_rows": len(self.binned.reference)
+    })
+    def sketch_data(self, test_size: float = 0.3) -> None:
+        """
+        Camino fuera de memoria (reemplaza load_data, prepare_features y split_data): primera
+        pasada por bloques sobre el CSV con la división por estrella, medianas y cortes de bins.
+        """
+        features = self._projected_columns()
+        if features is None:
+            features = self._infer_feature_columns()
+        self.binned = OutOfCoreDataset(
+            self.csv_path, features, self.target, self.group_col,
+            label_mapping=self.LABEL_MAPPING,
+            float_dtype=np.float32 if self.compact else np.float64,
+            seed=self.seed
+        )
+        with train_budget.limit():
+            self.binned.sketch(test_size)
+        # Sólo el esquema: las filas viven binneadas en X_train / X_test
+        self.X_num = pd.DataFrame(columns=self.binned.features, dtype=self.binned.float_dtype)
+        print(f"[INFO] Features finales: {len(self.binned.features)} columnas")
+
+    @track_stage("bin_data", lambda self: {
+        "train_rows": len(self.X_train), "test_rows": len(self.X_test),
+        "binned_bytes": int(self.X_train.nbytes + self.X_test.nbytes)
+    })
+    def bin_data(self) -> None:
+        """Segunda pasada: imputa y binnea el CSV por bloques en matrices uint8 de train y test."""
+        with train_budget.limit():
+            self.binned.bin()
+        self.X_train, self.X_test = self.binned.X_train, self.binned.X_test
+        self.y_train, self.y_test = self.binned.y_train, self.binned.y_test
+        self.groups_train, self.groups_test = self.binned.groups_train, self.binned.groups_test
+        print(f"[INFO] Train: {self.X_train.shape} | Test: {self.X_test.shape}")
+
+    @track_stage("split_data", lambda self: {"train_rows": len(self.X_train), "test_rows": len(self.X_test)})
     def split_data(self, test_size: float = 0.3) -> None:
         """Divide datos por estrella para evitar data leakage."""
         gss = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=self.seed)
@@ -111,24 +289,157 @@ class HGBExoplanetModel:
 
         print(f"[INFO] Train: {self.X_train.shape} | Test: {self.X_test.shape}")
 
+    def subsample(self, n_rows: int) -> None:
+        """
+        Reduce X_num, y y groups a unas n_rows filas eligiendo estrellas completas,
+        estratificadas por su clase mayoritaria para conservar la proporción de clases.
+        """
+        if n_rows >= len(self.X_num):
+            return
+
+        rng = np.random.default_rng(self.seed)
+        stars = pd.DataFrame({"group": self.groups.to_numpy(), "label": np.asarray(self.y)})
+        per_star = stars.groupby("group").agg(
+            label=("label", lambda s: s.mode().iat[0]),
+            rows=("label", "size")
+        )
+
+        selected = []
+        shares = stars["label"].value_counts(normalize=True)
+        for label, star_rows in per_star.groupby("label"):
+            quota = n_rows * shares.get(label, 0.0)
+            order = rng.permutation(len(star_rows))
+            cumulative = star_rows["rows"].to_numpy()[order].cumsum()
+            take = max(1, int(np.searchsorted(cumulative, quota)) + 1)
+            selected.append(star_rows.index.to_numpy()[order[:take]])
+
+        mask = self.groups.isin(np.concatenate(selected)).to_numpy()
+        self.X_num, self.y, self.groups = self.X_num[mask], self.y[mask], self.groups[mask]
+        print(f"[INFO] Submuestra: {mask.sum():,} filas de {len(mask):,} ({self.groups.nunique():,} estrellas)")
+
+    def preview(
+        self,
+        sample_size: Optional[int] = None,
+        n_bootstrap: Optional[int] = None,
+        save: bool = False,
+        model_name: str = "hgb_exoplanet_model"
+    ) -> Dict[str, Any]:
+        """
+        Entrenamiento rápido de prueba sobre una submuestra agrupada por estrella y estratificada.
+
+        Args:
+            sample_size: Filas de la submuestra (default: PREVIEW_SAMPLE_SIZE)
+            n_bootstrap: Remuestreos por estrella del test para intervalos del 95% (0 = sin intervalos)
+            save: Si es True guarda la versión como un entrenamiento normal
+
+        Returns:
+            Métricas aproximadas (accuracy, F1 macro), tamaños, tiempo y, opcionalmente, intervalos
+        """
+        start = time.perf_counter()
+        sample_size = sample_size or settings.PREVIEW_SAMPLE_SIZE
+        n_bootstrap = settings.PREVIEW_N_BOOTSTRAP if n_bootstrap is None else n_bootstrap
+
+        if getattr(self, "X_num", None) is None:
+            self.load_data()
+            self.prepare_features()
+        self.subsample(sample_size)
+        self.split_data()
+        self.train_model()
+
+        with train_budget.limit():
+            self.y_pred = self.pipe.predict(self.X_test)
+        y_true = np.asarray(self.y_test)
+        metrics = {
+            "accuracy": float(accuracy_score(y_true, self.y_pred)),
+            "f1_macro": float(f1_score(y_true, self.y_pred, average="macro")),
+        }
+
+        result = {
+            "sample_rows": int(len(self.X_num)),
+            "train_rows": int(len(self.X_train)),
+            "test_rows": int(len(self.X_test)),
+            "metrics": metrics,
+            "hyperparameters": self.get_hyperparameters(),
+        }
+        if n_bootstrap:
+            result["confidence_intervals"] = self._bootstrap_intervals(y_true, self.y_pred, n_bootstrap)
+        if save:
+            result["version"] = self.save_model(model_name)["version"]
+
+        result["duration_seconds"] = round(time.perf_counter() - start, 3)
+        print(f"[INFO] Preview: accuracy={metrics['accuracy']:.3f} f1_macro={metrics['f1_macro']:.3f} "
+              f"({result['duration_seconds']} s)")
+        return result
+
+    def _bootstrap_intervals(self, y_true: np.ndarray, y_pred: np.ndarray, n_bootstrap: int) -> Dict[str, List[float]]:
+        """Intervalos percentil 95% remuestreando estrellas del test (pesos por fila)."""
+        rng = np.random.default_rng(self.seed)
+        codes, stars = pd.factorize(self.groups_test)
+        correct = (y_true == y_pred)
+
+        scores = {"accuracy": [], "f1_macro": []}
+        for _ in range(n_bootstrap):
+            weights = np.bincount(rng.integers(0, len(stars), len(stars)), minlength=len(stars))[codes]
+            scores["accuracy"].append(np.average(correct, weights=weights))
+            scores["f1_macro"].append(f1_score(y_true, y_pred, average="macro", sample_weight=weights))
+
+        return {
+            name: [float(np.percentile(values, 2.5)), float(np.percentile(values, 97.5))]
+            for name, values in scores.items()
+        }
+
+    @track_stage("train_model", lambda self: {
+        "train_rows": len(self.X_train),
+        "features": self.X_train.shape[1],
+        "n_iter": int(self.pipe.named_steps["hgb"].n_iter_)
+    })
     def train_model(self) -> None:
-        """Entrena el modelo HistGradientBoostingClassifier."""
-        self.pipe = Pipeline(steps=[
-            ("imputer", SimpleImputer(strategy="median")),
-            ("hgb", HistGradientBoostingClassifier(
-                learning_rate=self.learning_rate,
-                max_leaf_nodes=self.max_leaf_nodes,
-                min_samples_leaf=self.min_samples_leaf,
-                early_stopping=self.early_stopping,
-                random_state=self.seed
-            ))
-        ])
-        self.pipe.fit(self.X_train, self.y_train)
+        """
+        Entrena el modelo HistGradientBoostingClassifier.
+
+        Con BINNING_CACHE activo, la matriz imputada se binnea una sola vez por
+        (datos, split, max_bins) y los entrenamientos siguientes la reutilizan.
+        Fuera de memoria, X_train ya es la matriz binneada y el imputer viene ajustado del sketch.
+        El ajuste usa a lo sumo CPU_TRAIN_THREADS hilos para no competir con la inferencia.
+        """
+        params = dict(
+            learning_rate=self.learning_rate,
+            max_leaf_nodes=self.max_leaf_nodes,
+            min_samples_leaf=self.min_samples_leaf,
+            early_stopping=self.early_stopping,
+            random_state=self.seed
+        )
+        if self.binned is not None:
+            self.pipe = Pipeline(steps=[
+                ("imputer", self.binned.imputer),
+                ("hgb", PreBinnedHGBClassifier(max_bins=self.binned.max_bins, **params))
+            ])
+            with train_budget.limit():
+                self.pipe.named_steps["hgb"].fit_binned(self.X_train, self.y_train, self.binned.bin_mapper)
+        else:
+            estimator_cls = CachedBinningHGBClassifier if settings.BINNING_CACHE else HistGradientBoostingClassifier
+            self.pipe = Pipeline(steps=[
+                ("imputer", SimpleImputer(strategy="median")),
+                ("hgb", estimator_cls(**params))
+            ])
+            with train_budget.limit():
+                self.pipe.fit(self.X_train, self.y_train)
+
+        # Guardar siempre un estimador estándar de scikit-learn
+        if isinstance(self.pipe.named_steps["hgb"], (CachedBinningHGBClassifier, PreBinnedHGBClassifier)):
+            self.pipe.steps[-1] = ("hgb", self.pipe.named_steps["hgb"].to_estimator())
         print("[INFO] Modelo entrenado correctamente")
 
+    @track_stage("evaluate", lambda self: {"test_rows": len(self.X_test)})
     def evaluate(self) -> pd.DataFrame:
         """Evalúa el modelo y genera métricas."""
-        self.y_pred = self.pipe.predict(self.X_test)
+        # Probabilidades del test (se guardan con la versión); la predicción es su argmax
+        with train_budget.limit():
+            if self.binned is not None:
+                self.y_proba = predict_proba_binned(self.pipe.named_steps["hgb"], self.X_test)
+            else:
+                self.y_proba = self.pipe.predict_proba(self.X_test)
+        self.y_pred = self.pipe.classes_[np.argmax(self.y_proba, axis=1)]
         labels = ["CANDIDATE", "CONFIRMED", "FALSE_POSITIVE"]
 
         print("\n=== Classification Report (HGB) ===")
@@ -147,10 +458,33 @@ class HGBExoplanetModel:
     def save_model(self, model_name: str = "hgb_exoplanet_model", version: Optional[str] = None) -> Dict[str, str]:
         """
         Guarda el modelo con versionado automático.
+
+        El puntero 'latest' se mueve sólo cuando la versión está completa en disco y pasa la
+        puerta de promoción (tamaño, carga, latencia y exactitud frente a la versión actual).
         """
         if self.pipe is None or self.y_test is None:
             raise RuntimeError("El modelo aún no ha sido entrenado o evaluado.")
 
+        paths = self._save_artifacts(model_name, version)
+
+        # Telemetría de entrenamiento de la versión
+        paths["metadata_path"] = str(self._save_metadata(Path(paths["model_path"]).parent))
+
+        # Publicar la versión (rename atómico del symlink latest) sólo si pasa la puerta de
+        # promoción frente a la versión actual; la medición queda en promotion.json
+        self.promotion = promotion_gate.promote(model_name, self.version)
+
+        if self.compact:
+            self.release_training_data()
+
+        return paths
+
+    @track_stage("save_model", lambda self: {
+        "model_bytes": (self._model_dir / "model.pkl").stat().st_size,
+        "artifact_bytes": sum(p.stat().st_size for p in self._model_dir.rglob("*") if p.is_file())
+    })
+    def _save_artifacts(self, model_name: str, version: Optional[str]) -> Dict[str, str]:
+        """Escribe modelo, métricas, matriz, manifiesto, referencia de drift, probabilidades de test e índice de similitud de la versión."""
         # Generar versión automáticamente si no se proporciona
         if version is None:
             version = self._generate_version(model_name)
@@ -159,6 +493,7 @@ class HGBExoplanetModel:
 
         # Rutas del modelo
         model_dir = settings.MODELS_DIR / model_name / version
+        self._model_dir = model_dir
         metrics_dir = model_dir / "metrics"
         matrix_dir = model_dir / "matrix"
 
@@ -182,16 +517,33 @@ class HGBExoplanetModel:
         matrix_path = matrix_dir / "confusion_matrix.npy"
         np.save(matrix_path, cm)
 
-        # Crear/enlazar symlink latest
-        latest_link = settings.MODELS_DIR / model_name / "latest"
-        try:
-            if latest_link.exists() or latest_link.is_symlink():
-                latest_link.unlink()
-            latest_link.symlink_to(version)
-            print(f"[INFO] Symlink 'latest' actualizado -> {version}")
-        except Exception as e:
-            print(f"[WARNING] Error actualizando symlink 'latest': {e}")
-            # Continuar sin fallar el entrenamiento
+        # Guardar manifiesto con el esquema de features (usado para proyectar futuras lecturas y,
+        # con los rangos de entrenamiento, para validar la entrada de predicción)
+        reference = self.binned.reference if self.binned is not None else self.X_train
+        self.feature_ranges = FeatureSchema.ranges_from(reference)
+        self._schema = None
+        manifest_path = model_dir / "manifest.json"
+        with open(manifest_path, "w") as f:
+            json.dump({
+                "target": self.target,
+                "group_col": self.group_col,
+                "features": list(self.X_num.columns),
+                "dtypes": {c: str(t) for c, t in self.X_num.dtypes.items()},
+                "ranges": self.feature_ranges,
+                "classes": [str(c) for c in self.pipe.classes_]
+            }, f, indent=4)
+
+        # Guardar histogramas de referencia para el monitoreo de drift (fuera de memoria: sobre la muestra)
+        drift_reference_path = save_reference(model_name, version, reference)
+
+        # Probabilidades y etiquetas del test para curvas, calibración y umbrales sin repuntuar
+        holdout_path = model_dir / "holdout.npz"
+        HoldoutScores.from_predictions(np.asarray(self.y_test), self.y_proba, self.pipe.classes_).save(holdout_path)
+
+        # Índice de KOIs similares sobre el catálogo completo (fuera de memoria: sobre la muestra,
+        # leída por bloques, para no materializar una matriz float32 de todo el archivo)
+        sample_rows = self.binned.sample_positions if self.binned is not None else None
+        similarity_index_path = build_similarity_index(model_name, version, self.pipe, self.csv_path, rows=sample_rows)
 
         print(f"[INFO] Modelo guardado en: {model_path}")
         print(f"[INFO] Versión: {version}")
@@ -200,9 +552,36 @@ class HGBExoplanetModel:
             "model_path": str(model_path),
             "metrics_path": str(metrics_path),
             "matrix_path": str(matrix_path),
+            "manifest_path": str(manifest_path),
+            "drift_reference_path": str(drift_reference_path),
+            "holdout_path": str(holdout_path),
+            "similarity_index_path": str(similarity_index_path) if similarity_index_path else None,
             "version": version
         }
 
+    def _save_metadata(self, model_dir: Path) -> Path:
+        """Escribe metadata.json con la telemetría por etapa, tamaños y conteos de la versión."""
+        stages = self.telemetry.stages
+        metadata = {
+            "version": self.version,
+            "hyperparameters": self.get_hyperparameters(),
+            "compact": self.compact,
+            "out_of_core": self.binned.stats() if self.binned is not None else None,
+            "rows": int(len(self.X_train) + len(self.X_test)),
+            "features": int(self.X_train.shape[1]),
+            "train_rows": int(len(self.X_train)),
+            "test_rows": int(len(self.X_test)),
+            "n_iter": int(self.pipe.named_steps["hgb"].n_iter_),
+            "model_bytes": stages["save_model"]["model_bytes"],
+            "artifact_bytes": stages["save_model"]["artifact_bytes"],
+            "telemetry": self.telemetry.summary(),
+            "fingerprint": self.fingerprint or self.training_fingerprint(),
+        }
+        metadata_path = model_dir / "metadata.json"
+        with open(metadata_path, "w") as f:
+            json.dump(metadata, f, indent=4)
+        return metadata_path
+
     def _generate_version(self, model_name: str) -> str:
         """Genera una nueva versión basada en las existentes."""
         model_dir = settings.MODELS_DIR / model_name
@@ -227,8 +606,14 @@ class HGBExoplanetModel:
         patch += 1
         return f"v{major}.{minor}.{patch}"
 
-    def load_model(self, model_name: str = "hgb_exoplanet_model", version: str = "latest") -> None:
-        """Carga un modelo desde archivo."""
+    def load_model(self, model_name: str = "hgb_exoplanet_model", version: str = "latest",
+                   schema_only: Optional[bool] = None) -> None:
+        """
+        Carga un modelo desde archivo.
+
+        Con schema_only (por defecto, en modo compacto) no se lee el dataset: el esquema
+        de X_num se toma de las columnas con las que se entrenó el pipeline.
+        """
         model_path = settings.get_model_path(model_name, version)
         
         if model_path is None or not model_path.exists():
@@ -237,21 +622,70 @@ class HGBExoplanetModel:
         self.pipe = joblib.load(model_path)
         self.version = version
         
-        # Cargar datos para tener X_num disponible
+        # Rangos de entrenamiento para validar la entrada (versiones anteriores no los tienen)
+        manifest = settings.load_manifest(model_name, version)
+        self.feature_ranges = manifest.get("ranges") if manifest else None
+        self._schema = None
+        
+        # Cargar datos para tener X_num disponible (en modo compacto basta el esquema del pipeline)
+        schema_only = self.compact if schema_only is None else schema_only
         if not hasattr(self, 'X_num'):
-            self.load_data()
-            self.prepare_features()
+            if schema_only and hasattr(self.pipe, "feature_names_in_"):
+                self.X_num = pd.DataFrame(
+                    columns=list(self.pipe.feature_names_in_),
+                    dtype=np.float32 if self.compact else np.float64
+                )
+            else:
+                self.load_data()
+                self.prepare_features()
         
         print(f"[INFO] Modelo cargado: {model_path}")
 
+    def release_training_data(self) -> None:
+        """Libera los frames de entrenamiento conservando sólo el esquema (columnas) de X_num."""
+        if getattr(self, "X_num", None) is not None:
+            self.X_num = self.X_num.iloc[:0].copy()
+        self.df = None
+        self.binned = None
+        self.y = self.groups = None
+        self.X_train = self.X_test = None
+        self.y_train = self.y_test = None
+        self.groups_train = self.groups_test = None
+        self.y_pred = self.y_proba = None
+
+    def get_schema(self) -> FeatureSchema:
+        """Obtiene (y cachea) el esquema de entrada del modelo cargado: features, dtype y rangos."""
+        if self._schema is None or self._schema.features != list(self.X_num.columns):
+            self._schema = FeatureSchema(
+                list(self.X_num.columns),
+                dtype=np.float32 if self.compact else np.float64,
+                ranges=self.feature_ranges
+            )
+        return self._schema
+
+    def validate_input(self, X: pd.DataFrame, strict: bool = False) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Alinea y convierte X al esquema del modelo (features ausentes o no numéricas -> NaN)
+        y devuelve el reporte de problemas por columna.
+
+        Raises:
+            SchemaError: Con strict, si hay valores no numéricos o infinitos
+        """
+        return self.get_schema().validate(X, strict=strict)
+
+    def _align_features(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Alinea las columnas de X con las del modelo (sin copia si ya lo están)."""
+        return self.get_schema().validate(X, report=False)[0]
+
     def predict(self, X: pd.DataFrame) -> np.ndarray:
         """Realiza predicciones."""
         if self.pipe is None:
             raise RuntimeError("Modelo no cargado. Ejecuta load_model() primero.")
         
         # Asegurar que las columnas coincidan
-        X_aligned = X.reindex(columns=self.X_num.columns, fill_value=0.0)
-        return self.pipe.predict(X_aligned)
+        X_aligned = self._align_features(X)
+        with inference_budget.limit():
+            return self.pipe.predict(X_aligned)
 
     def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
         """Realiza predicciones con probabilidades."""
@@ -259,8 +693,23 @@ class HGBExoplanetModel:
             raise RuntimeError("Modelo no cargado. Ejecuta load_model() primero.")
         
         # Asegurar que las columnas coincidan
-        X_aligned = X.reindex(columns=self.X_num.columns, fill_value=0.0)
-        return self.pipe.predict_proba(X_aligned)
+        X_aligned = self._align_features(X)
+        with inference_budget.limit():
+            return self.pipe.predict_proba(X_aligned)
+
+    def get_explainer(self) -> HGBTreeExplainer:
+        """Obtiene (y cachea) el explicador TreeSHAP del pipeline cargado."""
+        if self.pipe is None:
+            raise RuntimeError("Modelo no cargado. Ejecuta load_model() primero.")
+
+        if self._explainer is None or self._explainer.pipe is not self.pipe:
+            self._explainer = HGBTreeExplainer(self.pipe)
+        return self._explainer
+
+    def explain(self, X: pd.DataFrame, predicted: Optional[np.ndarray] = None, top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Devuelve las features que más contribuyen a la clase predicha de cada fila."""
+        X_aligned = self._align_features(X)
+        return self.get_explainer().top_contributions(X_aligned, predicted=predicted, top_k=top_k)
 
     def get_hyperparameters(self) -> Dict[str, Any]:
         """Obtiene hiperparámetros actuales."""
@@ -271,11 +720,87 @@ class HGBExoplanetModel:
             "early_stopping": self.early_stopping
         }
 
-    def run(self) -> None:
-        """Pipeline completo de entrenamiento."""
-        self.load_data()
-        self.prepare_features()
-        self.split_data()
+    def training_fingerprint(self) -> Dict[str, Any]:
+        """
+        Huella de un entrenamiento: contenido del dataset, esquema de features (y filas, que
+        distinguen una submuestra), hiperparámetros, semilla, modo compacto y versión de scikit-learn.
+        """
+        hyperparameters = self.get_hyperparameters()
+        components = {
+            "dataset": _file_digest(Path(self.csv_path)),
+            "features": hashlib.blake2b("\x1f".join(self.X_num.columns).encode("utf-8"), digest_size=16).hexdigest(),
+            "rows": int(self.binned.rows if self.binned is not None else len(self.X_num)),
+            "hyperparameters": {
+                "learning_rate": float(hyperparameters["learning_rate"]),
+                "max_leaf_nodes": int(hyperparameters["max_leaf_nodes"]),
+                "min_samples_leaf": int(hyperparameters["min_samples_leaf"]),
+                "early_stopping": bool(hyperparameters["early_stopping"]),
+            },
+            "seed": self.seed,
+            "compact": self.compact,
+            "sklearn": sklearn.__version__,
+        }
+        if self.binned is not None:
+            # Con más filas que la muestra, medianas y cortes de bins son aproximados
+            components["out_of_core"] = {"sketch_rows": self.binned.sketch_rows}
+        digest = hashlib.blake2b(json.dumps(components, sort_keys=True).encode("utf-8"), digest_size=16)
+        return {"digest": digest.hexdigest(), **components}
+
+    @staticmethod
+    def find_version_by_fingerprint(model_name: str, digest: str) -> Optional[str]:
+        """Versión (la más reciente) guardada con la misma huella de entrenamiento, si existe."""
+        for version in reversed(settings.get_all_versions(model_name)):
+            paths = settings.get_version_paths(model_name, version)
+            if not paths["metadata_path"].exists() or not paths["model_path"].exists():
+                continue
+            with open(paths["metadata_path"], "r") as f:
+                fingerprint = json.load(f).get("fingerprint") or {}
+            if fingerprint.get("digest") == digest:
+                return version
+        return None
+
+    def run(self, force: bool = False, model_name: str = "hgb_exoplanet_model") -> None:
+        """
+        Pipeline completo de entrenamiento.
+
+        Si ya existe una versión con la misma huella (dataset, esquema, hiperparámetros,
+        semilla y scikit-learn), se reutiliza esa versión sin entrenar, salvo con force=True
+        (que entrena una versión nueva). La reutilizada pasa por la puerta de promoción sólo si
+        es más reciente que 'latest'.
+        """
+        if self.out_of_core:
+            self.sketch_data()
+        else:
+            self.load_data()
+            self.prepare_features()
+
+        self.fingerprint = self.training_fingerprint()
+        version = None if force else self.find_version_by_fingerprint(model_name, self.fingerprint["digest"])
+        if version is not None:
+            print(f"[INFO] Entrenamiento idéntico a {version} (huella {self.fingerprint['digest'][:12]}), se reutiliza")
+            self.load_model(model_name, version)
+            self.reused = True
+            # Reutilizar una versión anterior no debe mover 'latest' hacia atrás
+            current = settings.resolve_version(model_name, "latest")
+            if not settings.version_exists(model_name, current) or \
+                    settings.version_key(version) > settings.version_key(current):
+                self.promotion = promotion_gate.promote(model_name, version)
+            else:
+                self.promotion = {
+                    "candidate": version,
+                    "baseline": current,
+                    "promoted": False,
+                    "reason": "reused: already latest" if version == current else f"reused: older than latest ({current})",
+                }
+                print(f"[INFO] {model_name}:{version} no es más reciente que 'latest' ({current}); no se promueve")
+            if self.compact:
+                self.release_training_data()
+            return
+
+        if self.out_of_core:
+            self.bin_data()
+        else:
+            self.split_data()
         self.train_model()
         self.evaluate()
-        self.save_model()
+        self.save_model(model_name)
@@ -0,0 +1,317 @@
+"""
+Probabilidades del conjunto de test guardadas por versión: curvas PR/ROC, calibración y barridos de umbral.
+"""
+import time
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+import joblib
+import numpy as np
+
+from ..utils.config import settings
+
+
+def _floats(values: np.ndarray, decimals: int = 6) -> List[Optional[float]]:
+    """Lista JSON de floats (NaN -> null)."""
+    values = np.round(np.asarray(values, dtype=np.float64), decimals)
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """num / den con NaN donde den == 0."""
+    num, den = np.asarray(num, dtype=np.float64), np.asarray(den, dtype=np.float64)
+    out = np.full(np.broadcast(num, den).shape, np.nan)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def _downsample(n: int, max_points: int) -> np.ndarray:
+    """Índices equiespaciados (incluye extremos) para devolver a lo sumo max_points puntos."""
+    if n <= max_points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, max_points).round().astype(np.int64))
+
+
+class HoldoutScores:
+    """
+    Probabilidades (n, clases) en float32 y etiquetas reales (códigos int8) del conjunto de
+    test de una versión, tal como las vio ``evaluate``.
+
+    Todas las métricas salen de un ordenamiento de las probabilidades y sumas acumuladas
+    (o de ``searchsorted`` sobre las probabilidades ordenadas para una grilla de umbrales),
+    sin recargar el dataset ni el modelo.
+    """
+
+    def __init__(self, proba: np.ndarray, labels: np.ndarray, classes: List[str], source: str = "evaluate"):
+        self.proba = np.asarray(proba, dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.int8)
+        self.classes = [str(c) for c in classes]
+        self.source = source
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @classmethod
+    def from_predictions(cls, y_true: np.ndarray, proba: np.ndarray, classes: List[str],
+                         source: str = "evaluate") -> "HoldoutScores":
+        """Construye el artefacto a partir de etiquetas reales y probabilidades en el orden de classes."""
+        classes = [str(c) for c in classes]
+        codes = {c: i for i, c in enumerate(classes)}
+        y_true = np.asarray(y_true).astype(str)
+        unknown = set(np.unique(y_true)) - set(codes)
+        if unknown:
+            raise ValueError(f"Etiquetas fuera de las clases del modelo: {sorted(unknown)}")
+        uniques, inverse = np.unique(y_true, return_inverse=True)
+        labels = np.array([codes[u] for u in uniques], dtype=np.int8)[inverse]
+        return cls(proba, labels, classes, source)
+
+    def _class_index(self, positive_class: str) -> int:
+        if positive_class not in self.classes:
+            raise ValueError(f"Unknown class '{positive_class}'. Available: {self.classes}")
+        return self.classes.index(positive_class)
+
+    def _scores(self, positive_class: Optional[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (probabilidad, acierto) por fila: de la clase indicada frente al resto o, sin clase,
+        la confianza de la clase predicha y si la predicción es correcta.
+        """
+        if positive_class is None:
+            predicted = self.proba.argmax(axis=1)
+            return self.proba.max(axis=1).astype(np.float64), predicted == self.labels
+        c = self._class_index(positive_class)
+        return self.proba[:, c].astype(np.float64), self.labels == c
+
+    def summary(self) -> Dict[str, Any]:
+        """Filas, clases, exactitud, log loss y Brier del conjunto de test."""
+        n = len(self)
+        rows = np.arange(n)
+        onehot = np.zeros_like(self.proba, dtype=np.float64)
+        onehot[rows, self.labels] = 1.0
+        p_true = np.clip(self.proba[rows, self.labels].astype(np.float64), 1e-15, 1.0)
+        return {
+            "rows": n,
+            "classes": self.classes,
+            "class_counts": {c: int(k) for c, k in zip(self.classes, np.bincount(self.labels, minlength=len(self.classes)))},
+            "accuracy": round(float((self.proba.argmax(axis=1) == self.labels).mean()), 6) if n else None,
+            "log_loss": round(float(-np.log(p_true).mean()), 6) if n else None,
+            "brier": round(float(((self.proba - onehot) ** 2).sum(axis=1).mean()), 6) if n else None,
+            "source": self.source,
+        }
+
+    def curves(self, positive_class: Optional[str] = None, max_points: int = 200) -> Dict[str, Any]:
+        """
+        Curvas ROC y precisión-recall uno-contra-resto por clase (o sólo de positive_class).
+
+        El AUC y la precisión promedio se calculan sobre todos los umbrales distintos; las
+        curvas devueltas se submuestrean a max_points puntos.
+        """
+        classes = self.classes if positive_class is None else [positive_class]
+        return {c: self._binary_curves(*self._scores(c), max_points) for c in classes}
+
+    @staticmethod
+    def _binary_curves(scores: np.ndarray, positive: np.ndarray, max_points: int) -> Dict[str, Any]:
+        order = np.argsort(-scores, kind="mergesort")
+        scores, positive = scores[order], positive[order]
+
+        # Un punto por umbral distinto: el último índice de cada bloque de empates
+        last = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+        tps = np.cumsum(positive, dtype=np.int64)[last]
+        fps = (last + 1) - tps
+        thresholds = scores[last]
+        n_pos, n_neg = int(positive.sum()), int(len(positive) - positive.sum())
+
+        tpr = np.r_[0.0, _ratio(tps, n_pos)]
+        fpr = np.r_[0.0, _ratio(fps, n_neg)]
+        precision = _ratio(tps, tps + fps)
+        recall = tpr[1:]
+
+        # Regla del trapecio explícita (np.trapz está obsoleto en NumPy 2.x)
+        roc_auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)) if n_pos and n_neg else None
+        average_precision = float(np.sum(np.diff(tpr) * precision)) if n_pos else None
+
+        roc_idx = _downsample(len(tpr), max_points)
+        pr_idx = _downsample(len(precision), max_points)
+        return {
+            "positives": n_pos,
+            "negatives": n_neg,
+            "roc_auc": round(roc_auc, 6) if roc_auc is not None else None,
+            "average_precision": round(average_precision, 6) if average_precision is not None else None,
+            "roc": {
+                "fpr": _floats(fpr[roc_idx]),
+                "tpr": _floats(tpr[roc_idx]),
+                "thresholds": _floats(np.r_[np.inf, thresholds][roc_idx].clip(max=1.0)),
+            },
+            "pr": {
+                "precision": _floats(precision[pr_idx]),
+                "recall": _floats(recall[pr_idx]),
+                "thresholds": _floats(thresholds[pr_idx]),
+            },
+        }
+
+    def calibration(self, positive_class: Optional[str] = None, n_bins: int = 10,
+                    strategy: str = "uniform") -> Dict[str, Any]:
+        """
+        Diagrama de confiabilidad: por bin, probabilidad media predicha frente a frecuencia
+        observada, más ECE (error esperado de calibración) y MCE (máximo).
+
+        Sin positive_class se calibra la confianza de la clase predicha (top-label).
+
+        Args:
+            strategy: 'uniform' (bins de igual ancho) o 'quantile' (bins de igual cantidad de filas)
+        """
+        scores, hits = self._scores(positive_class)
+        if strategy == "uniform":
+            edges = np.linspace(0.0, 1.0, n_bins + 1)
+        elif strategy == "quantile":
+            edges = np.unique(np.quantile(scores, np.linspace(0.0, 1.0, n_bins + 1)))
+            edges[0], edges[-1] = 0.0, 1.0
+        else:
+            raise ValueError("strategy must be 'uniform' or 'quantile'")
+
+        n_edges = len(edges) - 1
+        bins = np.clip(np.searchsorted(edges, scores, side="right") - 1, 0, n_edges - 1)
+        counts = np.bincount(bins, minlength=n_edges)
+        mean_predicted = _ratio(np.bincount(bins, weights=scores, minlength=n_edges), counts)
+        observed = _ratio(np.bincount(bins, weights=hits, minlength=n_edges), counts)
+        gaps = np.abs(observed - mean_predicted)
+        filled = counts > 0
+
+        return {
+            "positive_class": positive_class,
+            "strategy": strategy,
+            "rows": int(len(scores)),
+            "ece": round(float(np.sum(counts[filled] * gaps[filled]) / max(len(scores), 1)), 6),
+            "mce": round(float(gaps[filled].max()), 6) if filled.any() else None,
+            "brier": round(float(np.mean((scores - hits) ** 2)), 6) if len(scores) else None,
+            "bins": {
+                "lower": _floats(edges[:-1]),
+                "upper": _floats(edges[1:]),
+                "count": counts.tolist(),
+                "mean_predicted": _floats(mean_predicted),
+                "observed": _floats(observed),
+            },
+        }
+
+    def thresholds(self, positive_class: Optional[str] = None,
+                   thresholds: Optional[List[float]] = None, steps: int = 20) -> Dict[str, Any]:
+        """
+        Barrido de umbrales de confianza.
+
+        - Con positive_class: se predice la clase cuando su probabilidad >= umbral; por umbral,
+          precisión, recall, F1 y filas marcadas. Incluye el umbral de mejor F1 de la grilla.
+        - Sin clase: se acepta la predicción cuando la confianza de la clase predicha >= umbral;
+          por umbral, cobertura (fracción aceptada) y exactitud sobre lo aceptado.
+
+        Args:
+            thresholds: Umbrales explícitos; si no, una grilla de steps + 1 puntos en [0, 1]
+        """
+        grid = np.unique(np.clip(np.asarray(thresholds, dtype=np.float64), 0.0, 1.0)) \
+            if thresholds else np.linspace(0.0, 1.0, steps + 1)
+        scores, hits = self._scores(positive_class)
+        n = len(scores)
+
+        # Filas con score >= t y, de ellas, aciertos: conteos por búsqueda binaria
+        # sobre los scores ordenados (O((n + umbrales) log n))
+        above = n - np.searchsorted(np.sort(scores), grid, side="left")
+        hits_above = int(hits.sum()) - np.searchsorted(np.sort(scores[hits]), grid, side="left")
+
+        result: Dict[str, Any] = {"positive_class": positive_class, "rows": n, "thresholds": _floats(grid)}
+        if positive_class is None:
+            result.update({
+                "accepted": above.tolist(),
+                "coverage": _floats(_ratio(above, n)),
+                "accuracy": _floats(_ratio(hits_above, above)),
+            })
+            return result
+
+        precision = _ratio(hits_above, above)
+        recall = _ratio(hits_above, int(hits.sum()))
+        f1 = _ratio(2 * precision * recall, precision + recall)
+        result.update({
+            "predicted_positive": above.tolist(),
+            "true_positive": hits_above.tolist(),
+            "precision": _floats(precision),
+            "recall": _floats(recall),
+            "f1": _floats(f1),
+        })
+        if np.isfinite(f1).any():
+            best = int(np.nanargmax(f1))
+            result["best_f1"] = {
+                "threshold": float(grid[best]),
+                "f1": round(float(f1[best]), 6),
+                "precision": round(float(precision[best]), 6),
+                "recall": round(float(recall[best]), 6),
+            }
+        return result
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.stem}.tmp.npz")
+        np.savez(tmp_path, proba=self.proba, labels=self.labels, classes=np.array(self.classes),
+                 source=np.array(self.source))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "HoldoutScores":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["proba"], data["labels"], list(data["classes"]), str(data["source"]))
+
+
+def build_holdout(model_name: str, version: str) -> Path:
+    """
+    Reconstruye el artefacto de una versión guardada sin él: repite la división por estrella
+    del entrenamiento (misma semilla) sobre settings.DATASET_PATH y puntúa el test con el pipeline.
+    """
+    from .hgb_exoplanet import HGBExoplanetModel
+
+    paths = settings.get_version_paths(model_name, version)
+    pipe = joblib.load(paths["model_path"])
+    features = list(pipe.feature_names_in_)
+
+    model = HGBExoplanetModel(feature_columns=features)
+    model.load_data()
+    model.prepare_features()
+    model.split_data()
+
+    proba = pipe.predict_proba(model.X_test.reindex(columns=features))
+    # Las versiones antiguas usan las etiquetas originales del catálogo (ej: 'FALSE POSITIVE')
+    classes = [HGBExoplanetModel.LABEL_MAPPING.get(str(c), str(c)) for c in pipe.classes_]
+    scores = HoldoutScores.from_predictions(np.asarray(model.y_test), proba, classes, source="rebuilt")
+    scores.save(paths["holdout_path"])
+    return paths["holdout_path"]
+
+
+class HoldoutCache:
+    """Artefactos cargados en memoria; si una versión no lo tiene se reconstruye una vez."""
+
+    def __init__(self):
+        self._scores: Dict[Tuple[str, str], HoldoutScores] = {}
+        self._lock = threading.Lock()
+        self._build_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def get(self, model_name: str, version: str) -> HoldoutScores:
+        key = (model_name, version)
+        with self._lock:
+            if key in self._scores:
+                return self._scores[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                if key in self._scores:
+                    return self._scores[key]
+            path = settings.get_version_paths(model_name, version)["holdout_path"]
+            if not path.exists():
+                start = time.perf_counter()
+                build_holdout(model_name, version)
+                print(f"[INFO] Probabilidades de test de {model_name}:{version} reconstruidas en "
+                      f"{time.perf_counter() - start:.2f} s")
+            scores = HoldoutScores.load(path)
+            with self._lock:
+                self._scores[key] = scores
+            return scores
+
+
+# Instancia global de probabilidades de test por versión
+holdout_scores = HoldoutCache()
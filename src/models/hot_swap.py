@@ -0,0 +1,187 @@
+"""
+Modelo 'latest' en memoria con recarga en caliente cuando cambia el puntero de la versión.
+"""
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterator
+
+from ..utils.config import settings
+from .hgb_exoplanet import HGBExoplanetModel
+
+
+class _Slot:
+    """Una versión cargada y cuántas peticiones la están usando."""
+
+    def __init__(self, version: str, model: HGBExoplanetModel):
+        self.version = version
+        self.model: Optional[HGBExoplanetModel] = model
+        self.refs = 0
+        self.retired = False
+
+
+class ModelHolder:
+    """
+    Sirve la versión a la que apunta ``latest`` y la reemplaza sin pausar peticiones.
+
+    - ``acquire()`` entrega el modelo vigente y cuenta la referencia mientras dura la petición.
+    - Un hilo vigila el puntero ``latest`` (que se publica con un rename atómico sólo cuando la
+      versión está completa en disco); al cambiar, la nueva versión se carga en segundo plano
+      y luego se intercambia con una sola asignación bajo lock.
+    - La versión anterior se libera cuando termina la última petición que la usaba.
+
+    Cada proceso (worker) tiene su propio holder, así que todos ven el cambio del puntero.
+    """
+
+    def __init__(self, model_name: str = "hgb_exoplanet_model", watch_interval: Optional[float] = None):
+        self.model_name = model_name
+        self.watch_interval = settings.MODEL_WATCH_INTERVAL if watch_interval is None else watch_interval
+        self._slot: Optional[_Slot] = None
+        self._retired: Dict[str, _Slot] = {}
+        self._lock = threading.Lock()
+        self._loading: Optional[str] = None
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        # Métricas
+        self.swaps = 0
+        self.released = 0
+        self.last_swap_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def version(self) -> Optional[str]:
+        slot = self._slot
+        return slot.version if slot else None
+
+    def _load(self, version: str) -> HGBExoplanetModel:
+        model = HGBExoplanetModel()
+        model.load_model(self.model_name, version, schema_only=True)
+        return model
+
+    def load(self) -> str:
+        """
+        Carga de forma síncrona la versión a la que apunta 'latest' (arranque del servidor).
+
+        Raises:
+            FileNotFoundError: Si no hay ninguna versión guardada
+        """
+        version = settings.resolve_version(self.model_name, "latest")
+        self.publish(self._load(version), version)
+        return version
+
+    def publish(self, model: HGBExoplanetModel, version: Optional[str] = None) -> None:
+        """Pone en servicio un modelo ya cargado (ej: recién entrenado en este proceso)."""
+        version = version or model.version
+        model.version = version
+        new_slot = _Slot(version, model)
+        with self._lock:
+            old_slot, self._slot = self._slot, new_slot
+            if old_slot is not None:
+                old_slot.retired = True
+                self._retired[old_slot.version] = old_slot
+                self._release_if_unused(old_slot)
+            self.swaps += old_slot is not None
+            self.last_swap_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[INFO] Modelo en servicio: {self.model_name}:{version}")
+
+    def _release_if_unused(self, slot: _Slot) -> None:
+        """Libera una versión retirada sin referencias (llamar con el lock tomado)."""
+        if slot.retired and slot.refs == 0 and slot.model is not None:
+            slot.model = None
+            self._retired.pop(slot.version, None)
+            self.released += 1
+            print(f"[INFO] Versión liberada: {self.model_name}:{slot.version}")
+
+    @contextmanager
+    def acquire(self) -> Iterator[HGBExoplanetModel]:
+        """
+        Modelo vigente durante el bloque. Un intercambio concurrente no afecta a quien ya lo
+        tiene: la versión anterior sigue cargada hasta que se sueltan todas sus referencias.
+
+        Raises:
+            FileNotFoundError: Si todavía no hay ningún modelo en servicio
+        """
+        with self._lock:
+            slot = self._slot
+            if slot is None:
+                raise FileNotFoundError(f"No hay ninguna versión de '{self.model_name}' en servicio")
+            slot.refs += 1
+        try:
+            yield slot.model
+        finally:
+            with self._lock:
+                slot.refs -= 1
+                self._release_if_unused(slot)
+
+    def check(self) -> bool:
+        """
+        Compara el puntero 'latest' con la versión en servicio y, si cambió, la carga en
+        segundo plano (en el hilo que llama) y la intercambia.
+
+        Returns:
+            True si se intercambió la versión
+        """
+        try:
+            target = settings.resolve_version(self.model_name, "latest")
+        except OSError:
+            return False
+        if target == self.version or not settings.version_exists(self.model_name, target):
+            return False
+
+        with self._lock:
+            if self._loading is not None:
+                return False
+            self._loading = target
+        try:
+            start = time.perf_counter()
+            model = self._load(target)
+            # Otro publish (ej: /train en este proceso) pudo ganar mientras se cargaba
+            if settings.resolve_version(self.model_name, "latest") != target or target == self.version:
+                return False
+            self.publish(model, target)
+            print(f"[INFO] Recarga en caliente de {self.model_name}:{target} en {time.perf_counter() - start:.2f} s")
+            return True
+        except Exception as e:
+            self.last_error = f"{target}: {e}"
+            print(f"[WARNING] No se pudo cargar {self.model_name}:{target}: {e}")
+            return False
+        finally:
+            with self._lock:
+                self._loading = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.watch_interval):
+            self.check()
+
+    def start_watcher(self) -> None:
+        """Inicia el hilo que vigila el puntero 'latest' (MODEL_WATCH_INTERVAL; 0 = desactivado)."""
+        if self.watch_interval <= 0 or (self._watcher and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            slot = self._slot
+            return {
+                "model_name": self.model_name,
+                "version": slot.version if slot else None,
+                "in_flight": slot.refs if slot else 0,
+                "retired_in_flight": {v: s.refs for v, s in self._retired.items()},
+                "loading": self._loading,
+                "swaps": self.swaps,
+                "released": self.released,
+                "last_swap_at": self.last_swap_at,
+                "last_error": self.last_error,
+                "watch_interval": self.watch_interval,
+                "watching": bool(self._watcher and self._watcher.is_alive()),
+            }
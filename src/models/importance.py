@@ -0,0 +1,224 @@
+"""
+Importancia de features por permutación agrupada, calculada una vez por versión.
+"""
+import re
+import json
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Optional, Dict, Any, List, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from ..utils.config import settings
+from ..utils.cpu_budget import train_budget
+
+
+# Estado de cada proceso del pool (se inicializa una vez por worker)
+_worker_state: Dict[str, Any] = {}
+
+
+def group_features(columns: List[str]) -> Dict[str, List[str]]:
+    """
+    Agrupa cada medición con sus incertidumbres (ej: koi_period, koi_period_err1, koi_period_err2).
+
+    Returns:
+        Diccionario {grupo: [columnas]} respetando el orden original
+    """
+    groups: Dict[str, List[str]] = {}
+    for col in columns:
+        base = re.sub(r"_err\d+$", "", col)
+        groups.setdefault(base, []).append(col)
+    return groups
+
+
+def _init_worker(model_path: str, X: np.ndarray, y: np.ndarray, columns: List[str]) -> None:
+    """Carga el pipeline y el holdout una sola vez por proceso."""
+    # Un hilo OpenMP por worker: el paralelismo lo da el número de procesos
+    threadpool_limits(limits=1, user_api="openmp")
+    _worker_state["pipe"] = joblib.load(model_path)
+    _worker_state["X"] = pd.DataFrame(X, columns=columns)
+    _worker_state["y"] = y
+
+
+def _score(pipe, X: pd.DataFrame, y: np.ndarray) -> float:
+    return float(np.mean(pipe.predict(X) == y))
+
+
+def _permuted_score(group_idx: int, col_idx: List[int], repeat: int, seed: int) -> Tuple[int, int, float]:
+    """Puntaje del holdout con las columnas del grupo permutadas conjuntamente."""
+    pipe, X, y = _worker_state["pipe"], _worker_state["X"], _worker_state["y"]
+    rng = np.random.default_rng([seed, group_idx, repeat])
+    perm = rng.permutation(len(X))
+
+    X_perm = X.copy()
+    X_perm.iloc[:, col_idx] = X.iloc[perm, col_idx].to_numpy()
+    return group_idx, repeat, _score(pipe, X_perm, y)
+
+
+def compute_permutation_importance(
+    model_name: str,
+    version: str,
+    n_repeats: Optional[int] = None,
+    n_jobs: Optional[int] = None,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """
+    Calcula la importancia por permutación agrupada de una versión sobre su holdout.
+
+    Los pares (grupo, repetición) se reparten en un pool de procesos; cada worker
+    carga el modelo una única vez. El resultado se guarda como artefacto de la versión.
+
+    El pool usa el contexto 'spawn' (se crea desde un hilo del servidor, que ya tiene
+    hilos y OpenMP inicializados; un fork podría heredar locks tomados) y tiene a lo sumo
+    tantos procesos como fichas tome del presupuesto de entrenamiento, que retiene mientras
+    el pool trabaja (un /train concurrente comparte esos hilos en lugar de sumarse).
+
+    Returns:
+        Diccionario con el puntaje base y la caída de accuracy por grupo
+    """
+    from .hgb_exoplanet import HGBExoplanetModel
+
+    n_repeats = n_repeats or settings.IMPORTANCE_N_REPEATS
+    n_jobs = min(n_jobs or settings.IMPORTANCE_N_JOBS or train_budget.threads, train_budget.threads)
+    paths = settings.get_version_paths(model_name, version)
+    if not paths["model_path"].exists():
+        raise FileNotFoundError(f"Modelo no encontrado: {paths['model_path']}")
+
+    start = time.perf_counter()
+
+    # Reconstruir el holdout de la versión (split agrupado por estrella)
+    holdout = HGBExoplanetModel(seed=seed)
+    holdout.load_data()
+    holdout.prepare_features()
+    holdout.split_data()
+
+    pipe = joblib.load(paths["model_path"])
+    columns = list(getattr(pipe, "feature_names_in_", holdout.X_test.columns))
+    X_test = holdout.X_test.reindex(columns=columns)
+    y_test = holdout.y_test.to_numpy()
+
+    baseline = _score(pipe, X_test, y_test)
+    groups = group_features(columns)
+    group_names = list(groups)
+    col_positions = {col: i for i, col in enumerate(columns)}
+
+    scores = np.zeros((len(group_names), n_repeats))
+    # Los procesos cuentan como hilos del presupuesto de entrenamiento mientras dura el pool
+    with train_budget.limit() as tokens, ProcessPoolExecutor(
+        max_workers=min(n_jobs, tokens),
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(str(paths["model_path"]), X_test.to_numpy(), y_test, columns)
+    ) as pool:
+        futures = [
+            pool.submit(_permuted_score, g, [col_positions[c] for c in groups[name]], r, seed)
+            for g, name in enumerate(group_names)
+            for r in range(n_repeats)
+        ]
+        for future in futures:
+            g, r, score = future.result()
+            scores[g, r] = score
+
+    drops = baseline - scores
+    result_groups = sorted(
+        (
+            {
+                "group": name,
+                "features": groups[name],
+                "importance_mean": float(drops[g].mean()),
+                "importance_std": float(drops[g].std()),
+            }
+            for g, name in enumerate(group_names)
+        ),
+        key=lambda item: item["importance_mean"],
+        reverse=True
+    )
+
+    result = {
+        "model_name": model_name,
+        "version": version,
+        "metric": "accuracy",
+        "baseline_score": baseline,
+        "n_repeats": n_repeats,
+        "holdout_rows": int(len(X_test)),
+        "groups": result_groups,
+        "computed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "duration_seconds": round(time.perf_counter() - start, 3),
+    }
+
+    importance_path = paths["importance_path"]
+    importance_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(importance_path, "w") as f:
+        json.dump(result, f, indent=4)
+
+    print(f"[INFO] Importancia de features guardada en: {importance_path}")
+    return result
+
+
+class FeatureImportanceService:
+    """
+    Sirve la importancia de features desde caché y la calcula en segundo plano
+    como máximo una vez por versión, sin bloquear las peticiones de predicción.
+    """
+
+    def __init__(self):
+        self._cache: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._jobs: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="feature-importance")
+
+    def get(self, model_name: str, version: str) -> Optional[Dict[str, Any]]:
+        """Devuelve el resultado en caché o desde el artefacto de la versión, si existe."""
+        key = (model_name, version)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+
+        importance_path = settings.get_version_paths(model_name, version)["importance_path"]
+        if not importance_path.exists():
+            return None
+
+        with open(importance_path, "r") as f:
+            result = json.load(f)
+        with self._lock:
+            self._cache[key] = result
+        return result
+
+    def get_or_schedule(self, model_name: str, version: str) -> Dict[str, Any]:
+        """
+        Devuelve {"status": "completed", "result": ...} si ya está calculada; si no,
+        lanza (una sola vez) el cálculo y devuelve su estado.
+        """
+        result = self.get(model_name, version)
+        if result is not None:
+            return {"status": "completed", "result": result}
+
+        key = (model_name, version)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                job = self._executor.submit(self._run, model_name, version)
+                self._jobs[key] = job
+
+        if not job.done():
+            return {"status": "running"}
+
+        error = job.exception()
+        if error is not None:
+            # Permitir reintentar en la próxima consulta
+            with self._lock:
+                self._jobs.pop(key, None)
+            return {"status": "failed", "error": str(error)}
+        return {"status": "completed", "result": job.result()}
+
+    def _run(self, model_name: str, version: str) -> Dict[str, Any]:
+        result = compute_permutation_importance(model_name, version)
+        with self._lock:
+            self._cache[(model_name, version)] = result
+        return result
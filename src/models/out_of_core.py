@@ -0,0 +1,255 @@
+"""
+Entrenamiento fuera de memoria: el CSV se lee por bloques y sólo se conserva la matriz binneada (uint8).
+"""
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import GroupShuffleSplit
+from sklearn.ensemble._hist_gradient_boosting.binning import _BinMapper
+
+from ..utils.config import settings
+from .binning import check_sklearn_version
+
+# _BinMapper es interno de scikit-learn
+check_sklearn_version()
+
+
+class ReservoirSketch:
+    """
+    Muestra uniforme de tamaño fijo de las filas de un stream (algoritmo R, vectorizado por
+    bloque) junto con el id de grupo y la posición en el stream de cada fila muestreada, y
+    conteos exactos de no nulos.
+
+    Mientras el stream tenga menos filas que la capacidad, la muestra es el stream completo
+    en su orden original.
+    """
+
+    def __init__(self, n_features: int, capacity: int, seed: int = 42):
+        self.capacity = max(1, capacity)
+        # np.empty reserva sin tocar páginas: la RSS crece sólo con las filas escritas
+        self._values = np.empty((self.capacity, n_features), dtype=np.float64)
+        self._groups: Optional[np.ndarray] = None
+        self._positions = np.empty(self.capacity, dtype=np.int64)
+        self.non_null = np.zeros(n_features, dtype=np.int64)
+        self.filled = 0
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:self.filled]
+
+    @property
+    def groups(self) -> np.ndarray:
+        return self._groups[:self.filled]
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self._positions[:self.filled]
+
+    def update(self, X: np.ndarray, groups: np.ndarray) -> None:
+        """Agrega un bloque de filas (n, F) y sus grupos."""
+        self.non_null += (~np.isnan(X)).sum(axis=0)
+
+        if self._groups is None:
+            self._groups = np.empty(self.capacity, dtype=groups.dtype)
+
+        # Llenado inicial
+        take = min(self.capacity - self.filled, len(X))
+        if take > 0:
+            self._values[self.filled:self.filled + take] = X[:take]
+            self._groups[self.filled:self.filled + take] = groups[:take]
+            self._positions[self.filled:self.filled + take] = self.seen + np.arange(take)
+            self.filled += take
+            self.seen += take
+            X, groups = X[take:], groups[take:]
+        if not len(X):
+            return
+
+        # Reemplazo: la fila t entra con probabilidad capacity / (t + 1) en una posición al azar
+        slots = self._rng.integers(0, self.seen + np.arange(1, len(X) + 1))
+        keep = slots < self.capacity
+        self._values[slots[keep]] = X[keep]
+        self._groups[slots[keep]] = groups[keep]
+        self._positions[slots[keep]] = self.seen + np.flatnonzero(keep)
+        self.seen += len(X)
+
+
+class OutOfCoreDataset:
+    """
+    Dataset de entrenamiento construido en dos pasadas por bloques sobre el CSV.
+
+    1. ``sketch()``: etiquetas e ids de estrella de todas las filas (un byte y un id por fila),
+       conteos de no nulos y una muestra de tamaño fijo. Con eso se hace la división por
+       estrella y se ajustan el imputer (medianas) y los cortes de bins sobre las filas de
+       entrenamiento de la muestra, igual que el pipeline en memoria con su X_train.
+    2. ``bin()``: cada bloque se imputa y binnea y se escribe directamente en las matrices
+       uint8 de entrenamiento y test.
+
+    El pico de memoria queda acotado por la matriz binneada (1 byte por celda, frente a 8 del
+    float64 y varios más del texto parseado por pandas), la muestra y un bloque.
+    """
+
+    def __init__(
+        self,
+        csv_path: Path,
+        features: List[str],
+        target: str = "koi_disposition",
+        group_col: str = "kepid",
+        label_mapping: Optional[Dict[str, str]] = None,
+        float_dtype=np.float64,
+        chunk_rows: Optional[int] = None,
+        sketch_rows: Optional[int] = None,
+        max_bins: int = 255,
+        seed: int = 42
+    ):
+        self.csv_path = csv_path
+        self.features = list(features)
+        self.target = target
+        self.group_col = group_col
+        self.label_mapping = label_mapping or {}
+        self.float_dtype = float_dtype
+        self.chunk_rows = chunk_rows or settings.OOC_CHUNK_ROWS
+        self.sketch_rows = sketch_rows or settings.OOC_SKETCH_ROWS
+        self.max_bins = max_bins
+        self.seed = seed
+
+        self.rows = 0
+        self.dropped_rows = 0
+        self.chunks = 0
+        self.labels: List[str] = []
+        self.y_codes = self.groups = self.is_test = None
+        self.reference: Optional[pd.DataFrame] = None
+        self.sample_positions: Optional[np.ndarray] = None
+        self.imputer: Optional[SimpleImputer] = None
+        self.bin_mapper: Optional[_BinMapper] = None
+        self.X_train = self.X_test = None
+        self.timings: Dict[str, float] = {}
+
+    def _chunks(self) -> Iterator[Tuple[pd.DataFrame, np.ndarray, np.ndarray]]:
+        """Bloques (features, etiquetas, grupos) sin las filas que no tienen etiqueta."""
+        header = pd.read_csv(self.csv_path, comment="#", nrows=0).columns
+        missing = [c for c in self.features + [self.target, self.group_col] if c not in header]
+        if missing:
+            raise ValueError(f"Columnas ausentes en el CSV: {missing[:5]}")
+
+        wanted = set(self.features) | {self.target, self.group_col}
+        reader = pd.read_csv(
+            self.csv_path, comment="#", chunksize=self.chunk_rows,
+            usecols=[c for c in header if c in wanted],
+            dtype={c: self.float_dtype for c in self.features}
+        )
+        for chunk in reader:
+            labeled = chunk[self.target].notna().to_numpy()
+            if not labeled.all():
+                self.dropped_rows += int((~labeled).sum())
+                chunk = chunk[labeled]
+            y = chunk[self.target].astype(str).replace(self.label_mapping).to_numpy()
+            yield chunk[self.features], y, chunk[self.group_col].to_numpy()
+
+    def sketch(self, test_size: float = 0.3) -> None:
+        """Primera pasada: etiquetas, grupos, muestra, división por estrella, imputer y bins."""
+        start = time.perf_counter()
+        sketch = ReservoirSketch(len(self.features), self.sketch_rows, self.seed)
+        codes, groups, label_codes = [], [], {}
+        self.rows = self.dropped_rows = self.chunks = 0
+
+        for X, y, group in self._chunks():
+            uniques, inverse = np.unique(y, return_inverse=True)
+            for label in uniques:
+                label_codes.setdefault(label, len(label_codes))
+            codes.append(np.array([label_codes[u] for u in uniques], dtype=np.uint8)[inverse])
+            groups.append(group)
+            sketch.update(X.to_numpy(dtype=np.float64), group)
+            self.rows += len(y)
+            self.chunks += 1
+
+        if not self.rows:
+            raise ValueError("El dataset no tiene filas con etiqueta")
+        self.labels = list(label_codes)
+        self.y_codes = np.concatenate(codes)
+        self.groups = np.concatenate(groups)
+
+        # Features sin ningún valor en todo el archivo (como en prepare_features)
+        keep = sketch.non_null > 0
+        self.features = [f for f, k in zip(self.features, keep) if k]
+
+        # División por estrella (misma que split_data sobre los datos en memoria)
+        gss = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=self.seed)
+        (train_idx, test_idx), = gss.split(self.groups, groups=self.groups)
+        self.is_test = np.zeros(self.rows, dtype=bool)
+        self.is_test[test_idx] = True
+
+        # Imputer y cortes de bins sobre las filas de entrenamiento de la muestra
+        in_train = np.isin(sketch.groups, np.unique(self.groups[train_idx]))
+        self.reference = pd.DataFrame(sketch.values[np.ix_(in_train, keep)], columns=self.features)
+        # Posiciones (entre las filas con etiqueta) de toda la muestra, para el índice de similitud
+        self.sample_positions = np.sort(sketch.positions)
+        del sketch
+        self.imputer = SimpleImputer(strategy="median").fit(self.reference)
+        self.bin_mapper = _BinMapper(n_bins=self.max_bins + 1, random_state=self.seed)
+        self.bin_mapper.fit(self.imputer.transform(self.reference))
+
+        self.timings["sketch_seconds"] = round(time.perf_counter() - start, 4)
+        print(f"[INFO] Sketch: {self.rows:,} filas en {self.chunks} bloques, muestra de "
+              f"{len(self.reference):,} filas de entrenamiento, {len(self.features)} features")
+        if self.dropped_rows:
+            print(f"[WARNING] {self.dropped_rows:,} filas sin {self.target} descartadas")
+
+    def bin(self) -> None:
+        """Segunda pasada: imputa y binnea cada bloque directamente en X_train / X_test."""
+        if self.bin_mapper is None:
+            raise RuntimeError("Ejecuta sketch() antes de bin()")
+        start = time.perf_counter()
+        n_features = self.imputer.transform(self.reference.iloc[:1]).shape[1]
+        n_test = int(self.is_test.sum())
+        # Entrenamiento en orden Fortran (el que usa el grower), test en orden C (predicción)
+        self.X_train = np.empty((self.rows - n_test, n_features), dtype=np.uint8, order="F")
+        self.X_test = np.empty((n_test, n_features), dtype=np.uint8)
+        positions = np.where(self.is_test, np.cumsum(self.is_test) - 1, np.cumsum(~self.is_test) - 1)
+
+        offset = 0
+        for X, _, _ in self._chunks():
+            binned = self.bin_mapper.transform(self.imputer.transform(X))
+            rows = slice(offset, offset + len(binned))
+            test, pos = self.is_test[rows], positions[rows]
+            self.X_train[pos[~test]] = binned[~test]
+            self.X_test[pos[test]] = binned[test]
+            offset += len(binned)
+
+        if offset != self.rows:
+            raise RuntimeError(f"El CSV cambió entre pasadas ({self.rows:,} -> {offset:,} filas)")
+        self.timings["bin_seconds"] = round(time.perf_counter() - start, 4)
+        print(f"[INFO] Matriz binneada: {self.X_train.shape} + {self.X_test.shape} uint8 "
+              f"({(self.X_train.nbytes + self.X_test.nbytes) / 1024 ** 2:.1f} MB)")
+
+    @property
+    def y_train(self) -> np.ndarray:
+        return np.asarray(self.labels, dtype=object)[self.y_codes[~self.is_test]]
+
+    @property
+    def y_test(self) -> np.ndarray:
+        return np.asarray(self.labels, dtype=object)[self.y_codes[self.is_test]]
+
+    @property
+    def groups_train(self) -> np.ndarray:
+        return self.groups[~self.is_test]
+
+    @property
+    def groups_test(self) -> np.ndarray:
+        return self.groups[self.is_test]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "dropped_rows": self.dropped_rows,
+            "chunks": self.chunks,
+            "chunk_rows": self.chunk_rows,
+            "sketch_rows": int(len(self.reference)) if self.reference is not None else 0,
+            "binned_bytes": int(self.X_train.nbytes + self.X_test.nbytes) if self.X_train is not None else 0,
+            **self.timings,
+        }
@@ -0,0 +1,253 @@
+"""
+Puerta de promoción: una versión nueva pasa a 'latest' sólo si su tamaño, carga, latencia y exactitud
+están dentro de los límites frente a la versión en servicio.
+"""
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from ..utils.config import settings
+from ..utils.cpu_budget import inference_budget
+
+
+def _accuracy(model_name: str, version: str) -> Optional[float]:
+    """Exactitud sobre el test de la versión (classification_report.json)."""
+    metrics_path = settings.get_version_paths(model_name, version)["metrics_path"]
+    if not metrics_path.exists():
+        return None
+    with open(metrics_path, "r") as f:
+        accuracy = json.load(f).get("accuracy")
+    return float(accuracy) if accuracy is not None else None
+
+
+class PromotionGate:
+    """
+    Compara la versión candidata con la que apunta 'latest' sobre un conjunto fijo de filas
+    del catálogo (las mismas para las dos):
+
+    - model_bytes: tamaño de model.pkl
+    - load_ms: carga del pickle (mínimo de PROMOTION_LOAD_REPEATS cargas)
+    - single_row_ms: mediana de predict_proba fila a fila (PROMOTION_SINGLE_ROW_REPEATS llamadas)
+    - batch_ms: predict_proba sobre todo el conjunto (mínimo de 3)
+    - accuracy: exactitud en el test de cada versión
+
+    Las mediciones de las dos versiones se intercalan para que el ruido de la máquina las
+    afecte por igual. Los límites son razones candidata / actual (0 = sin límite), más un
+    piso absoluto de exactitud y la caída máxima tolerada frente a la actual. El resultado
+    se guarda en promotion.json de la candidata, se promueva o no; si la medición falla
+    (ej: un pickle que no carga) la candidata no se promueve y el error queda registrado.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, probe_rows: Optional[int] = None,
+                 max_size_ratio: Optional[float] = None, max_load_ratio: Optional[float] = None,
+                 max_latency_ratio: Optional[float] = None, min_accuracy: Optional[float] = None,
+                 max_accuracy_drop: Optional[float] = None):
+        self._enabled = enabled
+        self.probe_rows = probe_rows or settings.PROMOTION_PROBE_ROWS
+        self.max_size_ratio = settings.PROMOTION_MAX_SIZE_RATIO if max_size_ratio is None else max_size_ratio
+        self.max_load_ratio = settings.PROMOTION_MAX_LOAD_RATIO if max_load_ratio is None else max_load_ratio
+        self.max_latency_ratio = settings.PROMOTION_MAX_LATENCY_RATIO if max_latency_ratio is None else max_latency_ratio
+        self.min_accuracy = settings.PROMOTION_MIN_ACCURACY if min_accuracy is None else min_accuracy
+        self.max_accuracy_drop = settings.PROMOTION_MAX_ACCURACY_DROP if max_accuracy_drop is None else max_accuracy_drop
+        self.single_row_repeats = settings.PROMOTION_SINGLE_ROW_REPEATS
+        self.load_repeats = settings.PROMOTION_LOAD_REPEATS
+        self._probes: Dict[Tuple, pd.DataFrame] = {}
+        self._probe_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.PROMOTION_GATE if self._enabled is None else self._enabled
+
+    def load_probe(self, features: List[str]) -> pd.DataFrame:
+        """
+        Filas fijas (muestra uniforme con semilla 0) del dataset, sólo con las columnas de features.
+
+        El archivo se recorre por bloques (OOC_CHUNK_ROWS) con un reservorio de probe_rows filas,
+        así la memoria no depende del tamaño del dataset; la muestra se guarda por archivo
+        (ruta, tamaño y fecha de modificación) y no se vuelve a leer en cada versión.
+        """
+        from .out_of_core import ReservoirSketch
+
+        csv_path = settings.get_dataset_path()
+        stat = csv_path.stat()
+        header = pd.read_csv(csv_path, comment="#", nrows=0).columns
+        columns = [c for c in header if c in set(features)]
+        key = (str(csv_path), stat.st_size, stat.st_mtime_ns, tuple(columns), self.probe_rows)
+        with self._probe_lock:
+            if key in self._probes:
+                return self._probes[key]
+
+            sketch = ReservoirSketch(len(columns), self.probe_rows, seed=0)
+            for chunk in pd.read_csv(csv_path, comment="#", usecols=columns, chunksize=settings.OOC_CHUNK_ROWS):
+                values = chunk[columns].to_numpy(dtype=np.float64)
+                sketch.update(values, np.zeros(len(values), dtype=np.int8))
+            order = np.argsort(sketch.positions)
+            probe = pd.DataFrame(sketch.values[order], columns=columns)
+            self._probes = {key: probe}
+            return probe
+
+    def measure(self, model_name: str, versions: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Mediciones de las versiones sobre el mismo conjunto de prueba, intercaladas."""
+        from .hgb_exoplanet import HGBExoplanetModel
+
+        paths = {v: settings.get_version_paths(model_name, v)["model_path"] for v in versions}
+
+        load_ms = {v: [] for v in versions}
+        pipes = {}
+        for _ in range(max(1, self.load_repeats)):
+            for v in versions:
+                start = time.perf_counter()
+                pipes[v] = joblib.load(paths[v])
+                load_ms[v].append((time.perf_counter() - start) * 1e3)
+
+        features = sorted({f for pipe in pipes.values() for f in pipe.feature_names_in_})
+        probe = self.load_probe(features)
+        X = {v: probe.reindex(columns=list(pipes[v].feature_names_in_)).astype(np.float64) for v in versions}
+        rows = {v: [X[v].iloc[[i % len(probe)]] for i in range(self.single_row_repeats)] for v in versions}
+
+        single_ms = {v: [] for v in versions}
+        batch_ms = {v: [] for v in versions}
+        predictions = {}
+        with inference_budget.limit():
+            for v in versions:
+                pipes[v].predict_proba(rows[v][0])  # calentamiento
+            for i in range(self.single_row_repeats):
+                for v in versions:
+                    start = time.perf_counter()
+                    pipes[v].predict_proba(rows[v][i])
+                    single_ms[v].append((time.perf_counter() - start) * 1e3)
+            for _ in range(3):
+                for v in versions:
+                    start = time.perf_counter()
+                    proba = pipes[v].predict_proba(X[v])
+                    batch_ms[v].append((time.perf_counter() - start) * 1e3)
+                    # Las versiones antiguas usan las etiquetas originales (ej: 'FALSE POSITIVE')
+                    classes = [HGBExoplanetModel.LABEL_MAPPING.get(str(c), str(c)) for c in pipes[v].classes_]
+                    predictions[v] = np.asarray(classes)[proba.argmax(axis=1)]
+
+        return {
+            v: {
+                "model_bytes": int(paths[v].stat().st_size),
+                "load_ms": round(min(load_ms[v]), 3),
+                "single_row_ms": round(float(np.median(single_ms[v])), 3),
+                "batch_ms": round(min(batch_ms[v]), 3),
+                "batch_rows": int(len(probe)),
+                "n_iter": int(pipes[v].named_steps["hgb"].n_iter_) if "hgb" in getattr(pipes[v], "named_steps", {}) else None,
+                "accuracy": _accuracy(model_name, v),
+                "predictions": predictions[v],
+            }
+            for v in versions
+        }
+
+    def _checks(self, candidate: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        checks = []
+        if baseline is not None:
+            for name, limit in (("model_bytes", self.max_size_ratio), ("load_ms", self.max_load_ratio),
+                                ("single_row_ms", self.max_latency_ratio), ("batch_ms", self.max_latency_ratio)):
+                if not limit:
+                    continue
+                ratio = candidate[name] / baseline[name] if baseline[name] else 1.0
+                checks.append({"name": name, "candidate": candidate[name], "baseline": baseline[name],
+                               "ratio": round(ratio, 4), "limit": limit, "passed": ratio <= limit})
+
+        accuracy = candidate["accuracy"]
+        if self.min_accuracy:
+            checks.append({"name": "min_accuracy", "candidate": accuracy, "limit": self.min_accuracy,
+                           "passed": accuracy is not None and accuracy >= self.min_accuracy})
+        if baseline is not None and baseline["accuracy"] is not None and self.max_accuracy_drop is not None:
+            drop = baseline["accuracy"] - (accuracy or 0.0)
+            checks.append({"name": "accuracy_drop", "candidate": accuracy, "baseline": baseline["accuracy"],
+                           "drop": round(drop, 6), "limit": self.max_accuracy_drop,
+                           "passed": accuracy is not None and drop <= self.max_accuracy_drop})
+        return checks
+
+    def evaluate(self, model_name: str, candidate: str) -> Dict[str, Any]:
+        """
+        Mide la candidata frente a 'latest' y decide si se promueve (sin mover el puntero).
+        Un error al medir la candidata la bloquea; uno de 'latest' queda en baseline_error y
+        la candidata se evalúa como si no hubiera referencia.
+        """
+        # Sin puntero (o apuntando a una versión sin modelo) no hay contra qué comparar
+        latest_link = settings.MODELS_DIR / model_name / "latest"
+        baseline = latest_link.resolve().name if latest_link.exists() else None
+        if baseline is not None and not settings.get_version_paths(model_name, baseline)["model_path"].exists():
+            baseline = None
+
+        report: Dict[str, Any] = {
+            "candidate": candidate,
+            "baseline": baseline,
+            "evaluated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        if not self.enabled:
+            return {**report, "promoted": True, "reason": "gate disabled", "checks": []}
+        if baseline == candidate:
+            return {**report, "promoted": True, "reason": "already latest", "checks": []}
+
+        start = time.perf_counter()
+        # Primero la candidata sola: sólo un error suyo bloquea la promoción
+        try:
+            measurements = self.measure(model_name, [candidate])
+        except Exception as e:
+            # Los artefactos ya están guardados: la versión queda, pero no pasa a 'latest'
+            print(f"[WARNING] Error midiendo {model_name}:{candidate} para la promoción: {e}")
+            report.update({
+                "promoted": False,
+                "reason": "failed: measurement",
+                "checks": [{"name": "measurement", "passed": False, "error": f"{type(e).__name__}: {e}"}],
+                "gate_seconds": round(time.perf_counter() - start, 3),
+            })
+            return report
+        if baseline:
+            # Luego ambas intercaladas sobre la misma prueba; si falla, el error es de 'latest'
+            # (una versión dañada no debe impedir reemplazarla) y se sigue como sin referencia
+            try:
+                measurements = self.measure(model_name, [candidate, baseline])
+            except Exception as e:
+                print(f"[WARNING] Error midiendo {model_name}:{baseline} (latest); se evalúa sin referencia: {e}")
+                report["baseline_error"] = f"{type(e).__name__}: {e}"
+                baseline = None
+        predictions = {v: m.pop("predictions") for v, m in measurements.items()}
+        checks = self._checks(measurements[candidate], measurements.get(baseline))
+        failed = [c["name"] for c in checks if not c["passed"]]
+
+        report.update({
+            "promoted": not failed,
+            "reason": f"failed: {', '.join(failed)}" if failed else ("within budgets" if baseline else "no baseline"),
+            "checks": checks,
+            "measurements": measurements,
+            "agreement": round(float(np.mean(predictions[candidate] == predictions[baseline])), 6) if baseline else None,
+            "gate_seconds": round(time.perf_counter() - start, 3),
+        })
+        return report
+
+    def promote(self, model_name: str, candidate: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Evalúa la candidata, mueve 'latest' si pasa la puerta (o con force) y guarda el
+        resultado en promotion.json de la versión.
+        """
+        report = self.evaluate(model_name, candidate)
+        report["forced"] = force and not report["promoted"]
+        if report["promoted"] or force:
+            try:
+                settings.publish_latest(model_name, candidate)
+                print(f"[INFO] Symlink 'latest' actualizado -> {candidate} ({report['reason']})")
+            except OSError as e:
+                print(f"[WARNING] Error actualizando symlink 'latest': {e}")
+        else:
+            print(f"[WARNING] {model_name}:{candidate} no se promueve a 'latest' ({report['reason']}); "
+                  f"sigue {report['baseline']}")
+
+        promotion_path = settings.get_version_paths(model_name, candidate)["promotion_path"]
+        with open(promotion_path, "w") as f:
+            json.dump(report, f, indent=4)
+        return report
+
+
+# Instancia global de la puerta de promoción
+promotion_gate = PromotionGate()
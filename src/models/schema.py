@@ -0,0 +1,148 @@
+"""
+Validación y coerción vectorizadas de la entrada de predicción contra el esquema de features de una versión.
+"""
+import warnings
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Versión del procesamiento de la entrada; forma parte de la clave de las salidas guardadas
+# (prediction_store), así un cambio de comportamiento no sirve artefactos calculados antes.
+# 1: features ausentes -> 0.0; 2: validación por columna, ausentes e inválidos -> NaN
+PROCESSING_VERSION = 2
+
+
+class SchemaError(ValueError):
+    """Entrada con valores no numéricos o infinitos en modo estricto; lleva el reporte por columna."""
+
+    def __init__(self, report: Dict[str, Any]):
+        self.report = report
+        columns = [c for c, issues in report["columns"].items() if issues["invalid"] or issues["non_finite"]]
+        super().__init__(f"Non-numeric or infinite values in columns: {', '.join(columns[:5])}"
+                         f"{'...' if len(columns) > 5 else ''}")
+
+
+class FeatureSchema:
+    """
+    Esquema de entrada de una versión: orden de las features, dtype del pipeline y rango
+    [mín, máx] visto en el entrenamiento (si la versión lo guardó en su manifiesto).
+
+    ``validate`` arma la matriz (filas, features) recorriendo las columnas, con operaciones
+    sobre la columna completa (nunca por fila):
+
+    - features ausentes -> NaN (las imputa el pipeline con la mediana de entrenamiento)
+    - números como texto ("1.5") -> float; texto no numérico -> NaN, contado como 'invalid'
+    - ±inf -> NaN, contado como 'non_finite'
+    - valores fuera del rango de entrenamiento -> se conservan, contados como 'out_of_range'
+    """
+
+    def __init__(self, features: List[str], dtype=np.float64,
+                 ranges: Optional[Dict[str, List[Optional[float]]]] = None):
+        self.features = list(features)
+        self.dtype = np.dtype(dtype)
+        self._index = pd.Index(self.features)
+        bounds = np.array([(ranges or {}).get(f) or [None, None] for f in self.features], dtype=np.float64)
+        self.lower = bounds[:, 0] if len(bounds) else np.empty(0)
+        self.upper = bounds[:, 1] if len(bounds) else np.empty(0)
+        self.has_ranges = bool(ranges)
+
+    @staticmethod
+    def ranges_from(X: pd.DataFrame) -> Dict[str, List[Optional[float]]]:
+        """Rango [mín, máx] por columna (null si la columna no tiene valores), para el manifiesto."""
+        values = X.to_numpy(dtype=np.float64)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # columnas sin valores
+            lower, upper = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+        return {
+            c: None if np.isnan(lo) else [float(lo), float(hi)]
+            for c, lo, hi in zip(X.columns, lower, upper)
+        }
+
+    def _is_aligned(self, X: pd.DataFrame) -> bool:
+        """Entrada ya alineada: mismas columnas y dtype, sin infinitos (no hay nada que convertir)."""
+        if list(X.columns) != self.features or not (X.dtypes == self.dtype).all():
+            return False
+        return not np.isinf(X.to_numpy()).any()
+
+    def validate(self, X: pd.DataFrame, report: bool = True,
+                 strict: bool = False) -> Tuple[pd.DataFrame, Optional[Dict[str, Any]]]:
+        """
+        Alinea X con el esquema.
+
+        Args:
+            report: Si es False sólo se alinea y convierte (sin conteos)
+            strict: Rechazar la entrada si hay valores no numéricos o infinitos
+
+        Returns:
+            (X alineado con dtype del pipeline, reporte o None)
+
+        Raises:
+            SchemaError: En modo estricto, si alguna columna tiene valores inválidos
+        """
+        if not report and not strict and self._is_aligned(X):
+            return X, None
+
+        n, n_features = len(X), len(self.features)
+        present = self._index.isin(X.columns)
+        # Orden Fortran: cada feature se escribe como un bloque contiguo
+        out = np.empty((n, n_features), dtype=self.dtype, order="F")
+        invalid = np.zeros(n_features, dtype=np.int64)
+        non_finite = np.zeros(n_features, dtype=np.int64)
+        flagged = np.zeros(n, dtype=bool)
+
+        for j in np.flatnonzero(~present):
+            out[:, j] = np.nan
+        for j in np.flatnonzero(present):
+            column = X[self.features[j]]
+            if pd.api.types.is_numeric_dtype(column.dtype):
+                values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                if isinstance(column.dtype, pd.CategoricalDtype):
+                    column = column.astype(object)
+                values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+                bad = np.isnan(values) & column.notna().to_numpy()
+                if bad.any():
+                    invalid[j] = bad.sum()
+                    flagged |= bad
+            infinite = np.isinf(values)
+            if infinite.any():
+                non_finite[j] = infinite.sum()
+                flagged |= infinite
+                values = np.where(infinite, np.nan, values)
+            out[:, j] = values
+
+        aligned = pd.DataFrame(out, columns=self.features, index=X.index, copy=False)
+        if not report and not strict:
+            return aligned, None
+
+        # Fuera del rango de entrenamiento (NaN y features sin rango nunca cuentan)
+        out_of_range = np.zeros(n_features, dtype=np.int64)
+        if self.has_ranges and n:
+            with np.errstate(invalid="ignore"):
+                outside = (out < self.lower) | (out > self.upper)
+            out_of_range = outside.sum(axis=0)
+            flagged |= outside.any(axis=1)
+        missing = np.isnan(out).sum(axis=0) if n else np.zeros(n_features, dtype=np.int64)
+
+        issues = np.flatnonzero((invalid > 0) | (non_finite > 0) | (out_of_range > 0))
+        result = {
+            "rows": n,
+            "missing_columns": [self.features[j] for j in np.flatnonzero(~present)],
+            "ignored_columns": [str(c) for c in X.columns[~X.columns.isin(self._index)]],
+            "rows_with_issues": int(flagged.sum()),
+            "ranges_checked": self.has_ranges,
+            "columns": {
+                self.features[j]: {
+                    "invalid": int(invalid[j]),
+                    "non_finite": int(non_finite[j]),
+                    "out_of_range": int(out_of_range[j]),
+                    "missing": int(missing[j]),
+                }
+                for j in issues
+            },
+        }
+        if strict and (invalid.any() or non_finite.any()):
+            raise SchemaError(result)
+        return aligned, result
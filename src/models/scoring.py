@@ -0,0 +1,141 @@
+"""
+Anotación de predicciones y formato del CSV de salida, compartidos por la API y el scoring por lotes.
+"""
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+import numpy as np
+import pandas as pd
+
+from .hgb_exoplanet import HGBExoplanetModel
+
+
+def annotate_predictions(
+    df: pd.DataFrame,
+    X: pd.DataFrame,
+    model_instance: HGBExoplanetModel,
+    explain: bool = False,
+    top_k: int = 5,
+    generated_at: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Agrega a df las columnas prediction_label, confidence, top_features (si explain) y generated_at.
+
+    Args:
+        df: DataFrame original (se modifica en el lugar)
+        X: Features alineadas con el modelo para las mismas filas
+        model_instance: Modelo cargado
+        generated_at: Marca de tiempo común (default: ahora)
+
+    Returns:
+        El mismo df con las columnas de predicción
+    """
+    # Predicciones
+    y_pred = model_instance.predict(X)
+
+    # Obtener probabilidades si el modelo las soporta
+    try:
+        y_proba = model_instance.predict_proba(X)
+        # Obtener la probabilidad máxima (confianza)
+        confidence = np.max(y_proba, axis=1) * 100  # Convertir a porcentaje
+    except AttributeError:
+        # Si el modelo no soporta predict_proba
+        confidence = [np.nan] * len(y_pred)
+
+    # Agregar columnas de predicción
+    df["prediction_label"] = y_pred
+    df["confidence"] = confidence
+    if explain:
+        explanations = model_instance.explain(X, predicted=y_pred, top_k=top_k)
+        df["top_features"] = [
+            "; ".join(f"{item['feature']}:{item['contribution']:+.3f}" for item in row)
+            for row in explanations
+        ]
+
+    # Agregar marca de tiempo
+    df["generated_at"] = generated_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return df
+
+
+def annotate_ensemble(df: pd.DataFrame, result: Dict[str, Any], generated_at: Optional[str] = None) -> pd.DataFrame:
+    """
+    Agrega a df la predicción del ensemble (prediction_label, confidence) y, por versión,
+    prediction_label_<versión> y confidence_<versión>.
+
+    Args:
+        df: DataFrame original (se modifica en el lugar)
+        result: Resultado de VersionEnsemble.score
+    """
+    classes = np.asarray(result["classes"], dtype=object)
+    df["prediction_label"] = result["predicted"]
+    df["confidence"] = result["mean"].max(axis=1) * 100
+    for version, proba in result["per_version"].items():
+        df[f"prediction_label_{version}"] = classes[proba.argmax(axis=1)]
+        df[f"confidence_{version}"] = proba.max(axis=1) * 100
+
+    df["generated_at"] = generated_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return df
+
+
+def format_csv_output(df: pd.DataFrame, model_instance: HGBExoplanetModel) -> pd.DataFrame:
+    """
+    Formatea el DataFrame para generar un CSV legible y bien estructurado.
+    
+    Args:
+        df: DataFrame con datos originales y predicciones
+        model_instance: Instancia del modelo usado para las predicciones
+        
+    Returns:
+        DataFrame formateado con columnas ordenadas y valores redondeados
+    """
+    # Crear una copia para no modificar el original
+    formatted_df = df.copy()
+    
+    # Definir columnas de identificación (prioridad alta)
+    id_columns = ['kepid', 'kepoi_name', 'kepler_name', 'koi_disposition', 'koi_pdisposition', 'koi_score']
+    
+    # Definir columnas de predicción (nuevas)
+    prediction_columns = ['prediction_label', 'confidence', 'top_features']
+    
+    # Columnas por versión de un ensemble (prediction_label_<versión>, confidence_<versión>)
+    prediction_columns += [col for col in df.columns if col.startswith(('prediction_label_', 'confidence_'))]
+    
+    # Obtener columnas numéricas del modelo (excluyendo las de identificación y predicción)
+    model_columns = [col for col in model_instance.X_num.columns if col not in id_columns + prediction_columns]
+    
+    # Obtener otras columnas del dataset original
+    other_columns = [col for col in df.columns if col not in id_columns + model_columns + prediction_columns + ['predicted_disposition']]
+    
+    # Ordenar columnas: identificación, modelo, otras, predicción
+    ordered_columns = []
+    
+    # 1. Columnas de identificación (las que existen)
+    for col in id_columns:
+        if col in formatted_df.columns:
+            ordered_columns.append(col)
+    
+    # 2. Columnas del modelo
+    for col in model_columns:
+        if col in formatted_df.columns:
+            ordered_columns.append(col)
+    
+    # 3. Otras columnas del dataset
+    for col in other_columns:
+        if col not in ordered_columns:
+            ordered_columns.append(col)
+    
+    # 4. Columnas de predicción
+    for col in prediction_columns:
+        if col in formatted_df.columns:
+            ordered_columns.append(col)
+    
+    # Reordenar DataFrame
+    formatted_df = formatted_df[ordered_columns]
+    
+    # Redondear valores numéricos a 3 decimales
+    numeric_columns = formatted_df.select_dtypes(include=[np.number]).columns
+    for col in numeric_columns:
+        if col not in ['kepid', 'koi_score']:  # No redondear IDs y scores
+            formatted_df[col] = formatted_df[col].round(3)
+    
+    return formatted_df
@@ -0,0 +1,214 @@
+"""
+Índice de similitud por versión: KOIs conocidos más cercanos en el espacio de features del modelo.
+"""
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from ..utils.config import settings
+
+
+# Columnas de identificación guardadas con cada KOI del índice
+ID_COLUMNS = ["kepid", "kepoi_name", "kepler_name"]
+
+
+class SimilarityIndex:
+    """
+    Búsqueda exacta de vecinos por fuerza bruta vectorizada (distancia euclídea).
+
+    Las features se imputan con las medianas del imputer del pipeline, se comprimen con
+    asinh (periodos, profundidades e insolaciones abarcan varios órdenes de magnitud) y se
+    escalan por mediana/IQR. La matriz se guarda en float32 junto con sus normas, así cada
+    consulta es un producto matriz-vector y un argpartition (< 1 ms sobre el catálogo Kepler).
+    """
+
+    def __init__(self, features: List[str], fill: np.ndarray, center: np.ndarray, scale: np.ndarray,
+                 matrix: np.ndarray, ids: Dict[str, np.ndarray], disposition: np.ndarray):
+        self.features = list(features)
+        self.fill = fill
+        self.center = center
+        self.scale = scale
+        self.matrix = matrix
+        self.norms = np.einsum("ij,ij->i", matrix, matrix)
+        self.ids = ids
+        self.disposition = disposition
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def _transform(self, X: np.ndarray) -> np.ndarray:
+        X = np.where(np.isnan(X), self.fill, X)
+        return ((np.arcsinh(X) - self.center) / self.scale).astype(np.float32)
+
+    @classmethod
+    def build(cls, pipe, df: pd.DataFrame, target: str = "koi_disposition",
+              label_mapping: Optional[Dict[str, str]] = None) -> "SimilarityIndex":
+        """Construye el índice sobre las filas de df con las features y el imputer del pipeline."""
+        features = list(pipe.feature_names_in_)
+        X = df.reindex(columns=features).to_numpy(dtype=np.float64)
+        fill = np.asarray(pipe.named_steps["imputer"].statistics_, dtype=np.float64)
+        Z = np.arcsinh(np.where(np.isnan(X), fill, X))
+        center = np.median(Z, axis=0)
+        scale = np.subtract(*np.percentile(Z, [75, 25], axis=0))
+        scale[scale == 0] = 1.0
+
+        matrix = ((Z - center) / scale).astype(np.float32)
+        ids = {c: df[c].to_numpy() if c in df.columns else np.full(len(df), "") for c in ID_COLUMNS}
+        disposition = df[target].astype(str).replace(label_mapping or {}).to_numpy()
+        return cls(features, fill, center, scale, matrix, ids, disposition)
+
+    def query(self, X: pd.DataFrame, k: int = 5, disposition: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Los k KOIs conocidos más cercanos a cada fila de X (columnas faltantes = imputadas).
+
+        Args:
+            disposition: Si se indica, sólo se buscan KOIs con esa disposición (ej: CONFIRMED)
+        """
+        Q = self._transform(X.reindex(columns=self.features).to_numpy(dtype=np.float64))
+        candidates = np.flatnonzero(self.disposition == disposition) if disposition else None
+        matrix = self.matrix if candidates is None else self.matrix[candidates]
+        norms = self.norms if candidates is None else self.norms[candidates]
+        k = min(k, len(matrix))
+        if k == 0:
+            return [[] for _ in range(len(Q))]
+
+        # ||q - x||² = ||x||² - 2 q·x + ||q||²
+        d2 = norms[None, :] - 2.0 * (Q @ matrix.T) + np.einsum("ij,ij->i", Q, Q)[:, None]
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(d2, nearest, axis=1).argsort(axis=1, kind="stable")
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        distances = np.sqrt(np.maximum(np.take_along_axis(d2, nearest, axis=1), 0.0))
+
+        results = []
+        for row_idx, row_dist in zip(nearest, distances):
+            rows = row_idx if candidates is None else candidates[row_idx]
+            results.append([
+                {
+                    **{c: _plain(self.ids[c][r]) for c in ID_COLUMNS},
+                    "disposition": str(self.disposition[r]),
+                    "distance": round(float(dist), 4),
+                }
+                for r, dist in zip(rows, row_dist)
+            ])
+        return results
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.stem}.tmp.npz")
+        np.savez(
+            tmp_path,
+            features=np.array(self.features), fill=self.fill, center=self.center, scale=self.scale,
+            matrix=self.matrix, disposition=self.disposition.astype(str),
+            **{f"id_{c}": self.ids[c].astype(str) for c in ID_COLUMNS}
+        )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "SimilarityIndex":
+        with np.load(path, allow_pickle=False) as data:
+            ids = {c: data[f"id_{c}"] for c in ID_COLUMNS}
+            return cls(list(data["features"]), data["fill"], data["center"], data["scale"],
+                       data["matrix"], ids, data["disposition"])
+
+
+def _plain(value: Any) -> Any:
+    """Valor JSON de un identificador (los vacíos del CSV se guardan como 'nan')."""
+    value = str(value)
+    if value in ("nan", "None", ""):
+        return None
+    return int(value) if value.isdigit() else value
+
+
+def _read_rows(csv_path: Path, columns: List[str], target: str, rows: np.ndarray) -> pd.DataFrame:
+    """Lee por bloques sólo las filas con etiqueta en las posiciones indicadas (ordenadas)."""
+    parts, offset = [], 0
+    for chunk in pd.read_csv(csv_path, comment="#", usecols=columns, chunksize=settings.OOC_CHUNK_ROWS):
+        chunk = chunk[chunk[target].notna()]
+        lo, hi = np.searchsorted(rows, [offset, offset + len(chunk)])
+        if hi > lo:
+            parts.append(chunk.iloc[rows[lo:hi] - offset])
+        offset += len(chunk)
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+
+
+def build_similarity_index(model_name: str, version: str, pipe=None, csv_path: Optional[Path] = None,
+                           rows: Optional[np.ndarray] = None) -> Path:
+    """
+    Construye y guarda el índice de una versión sobre el catálogo (default: settings.DATASET_PATH).
+
+    Args:
+        rows: Posiciones (entre las filas con etiqueta) a indexar; se leen por bloques sin cargar
+            el archivo completo. Los entrenamientos fuera de memoria pasan su muestra.
+    """
+    from .hgb_exoplanet import HGBExoplanetModel
+
+    paths = settings.get_version_paths(model_name, version)
+    pipe = pipe if pipe is not None else joblib.load(paths["model_path"])
+    csv_path = csv_path or settings.get_dataset_path()
+    target = "koi_disposition"
+    header = pd.read_csv(csv_path, comment="#", nrows=0).columns
+    wanted = set(pipe.feature_names_in_) | set(ID_COLUMNS) | {target}
+    columns = [c for c in header if c in wanted]
+    if rows is not None:
+        df = _read_rows(csv_path, columns, target, np.asarray(rows, dtype=np.int64))
+    else:
+        df = pd.read_csv(csv_path, comment="#", usecols=columns)
+        df = df[df[target].notna()]
+
+    index = SimilarityIndex.build(pipe, df, target, HGBExoplanetModel.LABEL_MAPPING)
+    index.save(paths["similarity_index_path"])
+    return paths["similarity_index_path"]
+
+
+def _out_of_core(model_name: str, version: str) -> bool:
+    """Si la versión se entrenó fuera de memoria (según su metadata.json)."""
+    metadata_path = settings.get_version_paths(model_name, version)["metadata_path"]
+    if not metadata_path.exists():
+        return False
+    with open(metadata_path, "r") as f:
+        return bool(json.load(f).get("out_of_core"))
+
+
+class SimilarityIndexCache:
+    """Índices cargados en memoria; si una versión no tiene índice guardado se construye una vez."""
+
+    def __init__(self):
+        self._indexes: Dict[Tuple[str, str], SimilarityIndex] = {}
+        self._lock = threading.Lock()
+        self._build_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def get(self, model_name: str, version: str) -> SimilarityIndex:
+        key = (model_name, version)
+        with self._lock:
+            if key in self._indexes:
+                return self._indexes[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                if key in self._indexes:
+                    return self._indexes[key]
+            path = settings.get_version_paths(model_name, version)["similarity_index_path"]
+            if not path.exists():
+                # Construirlo ahora leería el catálogo completo en el proceso de la API
+                if _out_of_core(model_name, version):
+                    raise FileNotFoundError(f"La versión {model_name}:{version} se entrenó fuera de memoria "
+                                            f"y no tiene índice de similitud")
+                start = time.perf_counter()
+                build_similarity_index(model_name, version)
+                print(f"[INFO] Índice de similitud de {model_name}:{version} construido en "
+                      f"{time.perf_counter() - start:.2f} s")
+            index = SimilarityIndex.load(path)
+            with self._lock:
+                self._indexes[key] = index
+            return index
+
+
+# Instancia global de índices de similitud
+similarity_indexes = SimilarityIndexCache()
@@ -0,0 +1,247 @@
+"""
+Canal de predicción en streaming: filas por WebSocket, lotes armados en el servidor y respuestas en orden.
+"""
+import json
+import time
+import asyncio
+import threading
+import contextlib
+from typing import Optional, Dict, Any, List, Callable, Tuple, Union
+
+import numpy as np
+
+from ..utils.config import settings
+from ..utils.executor import run_blocking
+
+
+# Tipos de los frames binarios (little-endian); float32 es el formato compacto por defecto
+BINARY_DTYPES = {"float32": np.dtype("<f4"), "float64": np.dtype("<f8")}
+
+
+def decode_json_frame(text: str, features: List[str]) -> np.ndarray:
+    """
+    Filas de un frame de texto: un objeto (una fila) o una lista de objetos. Las columnas
+    faltantes y los null valen NaN (los imputa el pipeline, como en /predict).
+
+    Raises:
+        ValueError: Si el frame no es JSON válido o alguna fila no es un objeto numérico
+    """
+    payload = json.loads(text)
+    rows = payload if isinstance(payload, list) else [payload]
+    if not rows or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Frame must be a JSON object or a non-empty list of objects")
+    try:
+        return np.array([[row.get(f) for f in features] for row in rows], dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("Feature values must be numbers or null")
+
+
+def decode_binary_frame(data: bytes, n_features: int, dtype: np.dtype) -> np.ndarray:
+    """
+    Filas de un frame binario: matriz (n, F) en el orden de features anunciado, NaN = faltante.
+
+    Raises:
+        ValueError: Si el tamaño no es múltiplo de una fila
+    """
+    row_bytes = n_features * dtype.itemsize
+    if not data or len(data) % row_bytes:
+        raise ValueError(f"Binary frame size must be a multiple of {row_bytes} bytes ({n_features} x {dtype.name})")
+    return np.frombuffer(data, dtype=dtype).reshape(-1, n_features).astype(np.float64)
+
+
+class PredictionStream:
+    """
+    Una conexión de streaming ligada a una versión del modelo.
+
+    Un task lee y decodifica frames y los encola; otro arma lotes con lo que haya en cola
+    (hasta STREAM_MAX_BATCH_ROWS filas, esperando a lo sumo STREAM_MAX_WAIT_MS por más),
+    puntúa el lote con una sola llamada a ``score(X) -> probabilidades`` en el pool de
+    trabajo bloqueante y responde frame por frame en el orden de llegada:
+
+    - frame de texto -> ``{"seq", "predictions": [{"class", "probabilities"}]}``
+    - frame binario  -> probabilidades (n, clases) en el mismo dtype, orden de ``classes``
+    - frame inválido -> ``{"seq", "error"}`` sin cortar la conexión
+
+    La cola acotada (STREAM_MAX_PENDING frames) frena la lectura del socket si el cliente
+    envía más rápido de lo que se puntúa.
+    """
+
+    def __init__(self, websocket, score: Callable[[np.ndarray], np.ndarray], features: List[str],
+                 classes: List[str], binary_dtype: str = "float32", max_batch_rows: Optional[int] = None,
+                 max_wait: Optional[float] = None, max_pending: Optional[int] = None):
+        self.websocket = websocket
+        self.score = score
+        self.features = list(features)
+        self.classes = [str(c) for c in classes]
+        self.binary_dtype = BINARY_DTYPES[binary_dtype]
+        self.max_batch_rows = max(1, max_batch_rows or settings.STREAM_MAX_BATCH_ROWS)
+        self.max_wait = settings.STREAM_MAX_WAIT_MS / 1e3 if max_wait is None else max_wait
+        self._queue: "asyncio.Queue[Optional[Tuple[int, str, Union[np.ndarray, str]]]]" = asyncio.Queue(
+            max(1, max_pending or settings.STREAM_MAX_PENDING)
+        )
+        self._eof = False
+
+        # Métricas de la conexión
+        self.frames = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+
+    async def run(self) -> None:
+        """Atiende la conexión hasta que el cliente la cierra."""
+        reader = asyncio.create_task(self._read())
+        try:
+            await self._score_batches()
+        finally:
+            reader.cancel()
+
+    async def _read(self) -> None:
+        seq = 0
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    kind, decode = "binary", lambda m: decode_binary_frame(m["bytes"], len(self.features), self.binary_dtype)
+                else:
+                    kind, decode = "json", lambda m: decode_json_frame(m.get("text") or "", self.features)
+                try:
+                    item = decode(message)
+                except ValueError as e:
+                    item = str(e)
+                await self._queue.put((seq, kind, item))
+                seq += 1
+        finally:
+            # Sin await: con la cola llena (o el lector cancelado) no debe quedar bloqueado.
+            # Si el marcador no cabe, el lote lo detecta con _eof al vaciar la cola
+            self._eof = True
+            with contextlib.suppress(asyncio.QueueFull):
+                self._queue.put_nowait(None)
+
+    async def _get(self) -> Optional[Tuple[int, str, Union[np.ndarray, str]]]:
+        """Siguiente frame, o None cuando el lector terminó y no queda nada pendiente."""
+        if self._eof and self._queue.empty():
+            return None
+        return await self._queue.get()
+
+    async def _next_batch(self) -> Tuple[List[Tuple[int, str, Union[np.ndarray, str]]], bool]:
+        """Frames del próximo lote y si la conexión terminó."""
+        first = await self._get()
+        if first is None:
+            return [], True
+        batch, rows = [first], len(first[2]) if isinstance(first[2], np.ndarray) else 0
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_rows:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            rows += len(item[2]) if isinstance(item[2], np.ndarray) else 0
+        return batch, False
+
+    async def _score_batches(self) -> None:
+        done = False
+        while not done:
+            batch, done = await self._next_batch()
+            valid = [item[2] for item in batch if isinstance(item[2], np.ndarray)]
+            proba = None
+            if valid:
+                X = np.concatenate(valid) if len(valid) > 1 else valid[0]
+                try:
+                    proba = await run_blocking(self.score, X)
+                except Exception as e:
+                    # Fallo del modelo: se informa en cada frame del lote
+                    batch = [(seq, kind, f"Prediction error: {e}") for seq, kind, _ in batch]
+                self.batches += 1
+            if not await self._send(batch, proba):
+                return
+
+    async def _send(self, batch: List[Tuple[int, str, Union[np.ndarray, str]]], proba: Optional[np.ndarray]) -> bool:
+        """Envía las respuestas del lote en orden. Returns: False si el cliente ya se fue."""
+        offset = 0
+        try:
+            for seq, kind, item in batch:
+                self.frames += 1
+                if isinstance(item, str):
+                    self.errors += 1
+                    await self.websocket.send_text(json.dumps({"seq": seq, "error": item}))
+                    continue
+                rows = proba[offset:offset + len(item)]
+                offset += len(item)
+                self.rows += len(item)
+                if kind == "binary":
+                    await self.websocket.send_bytes(rows.astype(self.binary_dtype).tobytes())
+                else:
+                    await self.websocket.send_text(json.dumps({"seq": seq, "predictions": [
+                        {
+                            "class": self.classes[int(np.argmax(row))],
+                            "probabilities": {c: float(p) for c, p in zip(self.classes, row)}
+                        }
+                        for row in rows
+                    ]}))
+        except Exception:
+            # WebSocketDisconnect / RuntimeError de starlette al escribir en un socket cerrado
+            return False
+        return True
+
+
+class StreamRegistry:
+    """Conexiones de streaming abiertas (límite STREAM_MAX_CONNECTIONS) y totales acumulados."""
+
+    def __init__(self, max_connections: Optional[int] = None):
+        self.max_connections = max_connections or settings.STREAM_MAX_CONNECTIONS
+        self._active: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+        self.frames = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+
+    def open(self, stream: PredictionStream, model_name: str, version: str) -> bool:
+        """Registra una conexión; False si ya se alcanzó el límite."""
+        with self._lock:
+            if len(self._active) >= self.max_connections:
+                self.rejected += 1
+                return False
+            self._active[id(stream)] = {"model_name": model_name, "version": version, "stream": stream}
+            self.opened += 1
+            return True
+
+    def close(self, stream: PredictionStream) -> None:
+        with self._lock:
+            if self._active.pop(id(stream), None) is not None:
+                self.frames += stream.frames
+                self.rows += stream.rows
+                self.batches += stream.batches
+                self.errors += stream.errors
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            active = list(self._active.values())
+            return {
+                "active": len(active),
+                "max_connections": self.max_connections,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "frames": self.frames + sum(a["stream"].frames for a in active),
+                "rows": self.rows + sum(a["stream"].rows for a in active),
+                "batches": self.batches + sum(a["stream"].batches for a in active),
+                "errors": self.errors + sum(a["stream"].errors for a in active),
+                "connections": [{"model_name": a["model_name"], "version": a["version"]} for a in active],
+            }
+
+
+# Instancia global de conexiones de streaming
+prediction_streams = StreamRegistry()
@@ -0,0 +1,166 @@
+"""
+Control de admisión: límites de concurrencia, colas acotadas y reparto justo por versión de modelo.
+"""
+import math
+import time
+import asyncio
+from collections import Counter, deque
+from typing import Deque, Dict, Any, Tuple, Optional
+
+from .config import settings
+
+
+class AdmissionRejected(Exception):
+    """Petición rechazada por el control de admisión (429 cola llena, 503 espera agotada)."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """
+    Semáforo con cola acotada para un tipo de petición.
+
+    Como máximo ``max_concurrent`` peticiones se ejecutan a la vez y ninguna clave
+    (modelo:versión) puede ocupar más de ``per_key_limit`` de esos cupos. Las que no
+    entran esperan en una cola FIFO de ``max_queue`` posiciones durante ``queue_timeout``
+    segundos. Debe usarse desde un único event loop (no requiere locks).
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int,
+                 per_key_limit: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.per_key_limit = max(1, min(per_key_limit, self.max_concurrent))
+        self.queue_timeout = queue_timeout
+
+        self._active = 0
+        self._active_by_key: Counter = Counter()
+        self._waiters: Deque[Tuple[str, asyncio.Future]] = deque()
+
+        # Métricas
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.service_time_ema = None
+
+    def _can_run(self, key: str) -> bool:
+        return self._active < self.max_concurrent and self._active_by_key[key] < self.per_key_limit
+
+    def _grant(self, key: str) -> None:
+        self._active += 1
+        self._active_by_key[key] += 1
+
+    def _retry_after(self) -> int:
+        """Estimación de segundos hasta que haya cupo, según el tiempo medio de servicio."""
+        service = self.service_time_ema or 1.0
+        return max(1, math.ceil(service * (len(self._waiters) + 1) / self.max_concurrent))
+
+    async def acquire(self, key: str) -> float:
+        """
+        Obtiene un cupo para la clave indicada, esperando en cola si es necesario.
+
+        Returns:
+            Segundos de espera en cola
+
+        Raises:
+            AdmissionRejected: 429 si la cola está llena, 503 si se agota la espera
+        """
+        start = time.perf_counter()
+        if self._can_run(key):
+            self._grant(key)
+            self.admitted += 1
+            return 0.0
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(429, f"Too many concurrent '{self.name}' requests, queue is full", self._retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (key, future)
+        self._waiters.append(entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not future.done():
+                self._waiters.remove(entry)
+                self.rejected_timeout += 1
+                raise AdmissionRejected(503, f"Timed out waiting for a '{self.name}' slot", self._retry_after())
+        except asyncio.CancelledError:
+            # Cliente desconectado: devolver el cupo si ya se había concedido
+            if future.done():
+                self.release(key)
+            else:
+                self._waiters.remove(entry)
+            raise
+
+        waited = time.perf_counter() - start
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def release(self, key: str, service_seconds: Optional[float] = None) -> None:
+        """Libera el cupo de la clave y concede los siguientes a los que esperan y pueden entrar."""
+        self._active -= 1
+        self._active_by_key[key] -= 1
+        if self._active_by_key[key] <= 0:
+            del self._active_by_key[key]
+
+        if service_seconds is not None:
+            self.service_time_ema = service_seconds if self.service_time_ema is None \
+                else 0.8 * self.service_time_ema + 0.2 * service_seconds
+
+        for entry in list(self._waiters):
+            if self._active >= self.max_concurrent:
+                break
+            waiting_key, future = entry
+            if future.done():
+                self._waiters.remove(entry)
+            elif self._can_run(waiting_key):
+                self._waiters.remove(entry)
+                self._grant(waiting_key)
+                future.set_result(True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado y contadores de la compuerta."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "per_version_limit": self.per_key_limit,
+            "active": self._active,
+            "queued": len(self._waiters),
+            "active_by_version": dict(self._active_by_key),
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_queue_wait_seconds": round(self.total_wait / self.admitted, 4) if self.admitted else 0.0,
+            "max_queue_wait_seconds": round(self.max_wait, 4),
+            "avg_service_seconds": round(self.service_time_ema, 4) if self.service_time_ema is not None else None,
+        }
+
+
+def _gate(name: str, concurrency: int, queue: int) -> AdmissionGate:
+    return AdmissionGate(
+        name=name,
+        max_concurrent=concurrency,
+        max_queue=queue,
+        # floor: con ceil una concurrencia de 2 daría 2 cupos por versión (sin reparto)
+        per_key_limit=max(1, math.floor(concurrency * settings.ADMISSION_VERSION_SHARE)),
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT
+    )
+
+
+# Compuertas por tipo de petición
+admission_gates: Dict[str, AdmissionGate] = {
+    "predict": _gate("predict", settings.ADMISSION_PREDICT_CONCURRENCY, settings.ADMISSION_PREDICT_QUEUE),
+    "predict_upload": _gate("predict_upload", settings.ADMISSION_UPLOAD_CONCURRENCY, settings.ADMISSION_UPLOAD_QUEUE),
+    "train": _gate("train", settings.ADMISSION_TRAIN_CONCURRENCY, settings.ADMISSION_TRAIN_QUEUE),
+    "train_preview": _gate("train_preview", settings.ADMISSION_PREVIEW_CONCURRENCY, settings.ADMISSION_PREVIEW_QUEUE),
+}
@@ -2,8 +2,10 @@
 Configuración centralizada para el proyecto ExoPlanetas.
 """
 import os
+import json
+import threading
 from pathlib import Path
-from typing import Union
+from typing import Union, Optional
 
 class Settings:
     """Configuración de la aplicación."""
@@ -26,7 +28,109 @@ class Settings:
         self.DEFAULT_MIN_SAMPLES_LEAF = int(os.getenv("MIN_SAMPLES_LEAF", "20"))
         self.DEFAULT_EARLY_STOPPING = os.getenv("EARLY_STOPPING", "true").lower() == "true"
         
+        # Entrenamiento de prueba (preview) sobre una submuestra
+        self.PREVIEW_SAMPLE_SIZE = int(os.getenv("PREVIEW_SAMPLE_SIZE", "3000"))
+        self.PREVIEW_N_BOOTSTRAP = int(os.getenv("PREVIEW_N_BOOTSTRAP", "0"))
+        
+        # Telemetría de entrenamiento (intervalo de muestreo de memoria; 0 = desactivado)
+        self.TELEMETRY_SAMPLE_INTERVAL = float(os.getenv("TELEMETRY_SAMPLE_INTERVAL", "0.01"))
+        
+        # Modelo destilado (tier de baja latencia) y umbral de confianza para volver al modelo completo
+        self.DISTILL_MAX_LEAF_NODES = int(os.getenv("DISTILL_MAX_LEAF_NODES", "8"))
+        self.DISTILL_MAX_ITER = int(os.getenv("DISTILL_MAX_ITER", "30"))
+        self.DISTILL_LEARNING_RATE = float(os.getenv("DISTILL_LEARNING_RATE", "0.25"))
+        self.FAST_TIER_THRESHOLD = float(os.getenv("FAST_TIER_THRESHOLD", "0.8"))
+        
+        # Caché de matrices binneadas entre entrenamientos (ajustes y reentrenamientos)
+        self.BINNING_CACHE = os.getenv("BINNING_CACHE", "true").lower() == "true"
+        self.BINNING_CACHE_SIZE = int(os.getenv("BINNING_CACHE_SIZE", "8"))
+        
+        # Modo de datos compacto (float32/categorías y liberación de frames de entrenamiento)
+        self.COMPACT_DATA = os.getenv("COMPACT_DATA", "false").lower() == "true"
+        
+        # Proyección de columnas al leer el dataset: infer | manifest | off
+        self.PROJECTION_MODE = os.getenv("PROJECTION_MODE", "infer").lower()
+        self.PROJECTION_SAMPLE_ROWS = int(os.getenv("PROJECTION_SAMPLE_ROWS", "1000"))
+        
+        # Entrenamiento fuera de memoria (CSV por bloques y matriz binneada uint8)
+        self.OUT_OF_CORE = os.getenv("OUT_OF_CORE", "false").lower() == "true"
+        self.OOC_CHUNK_ROWS = int(os.getenv("OOC_CHUNK_ROWS", "50000"))
+        self.OOC_SKETCH_ROWS = int(os.getenv("OOC_SKETCH_ROWS", "200000"))
+        
+        # Puerta de promoción a 'latest': límites como razón versión nueva / actual (0 = sin límite),
+        # exactitud mínima y caída de exactitud tolerada frente a la actual
+        self.PROMOTION_GATE = os.getenv("PROMOTION_GATE", "true").lower() == "true"
+        self.PROMOTION_PROBE_ROWS = int(os.getenv("PROMOTION_PROBE_ROWS", "1000"))
+        self.PROMOTION_SINGLE_ROW_REPEATS = int(os.getenv("PROMOTION_SINGLE_ROW_REPEATS", "50"))
+        self.PROMOTION_LOAD_REPEATS = int(os.getenv("PROMOTION_LOAD_REPEATS", "3"))
+        self.PROMOTION_MAX_SIZE_RATIO = float(os.getenv("PROMOTION_MAX_SIZE_RATIO", "2.0"))
+        self.PROMOTION_MAX_LOAD_RATIO = float(os.getenv("PROMOTION_MAX_LOAD_RATIO", "2.0"))
+        self.PROMOTION_MAX_LATENCY_RATIO = float(os.getenv("PROMOTION_MAX_LATENCY_RATIO", "1.5"))
+        self.PROMOTION_MIN_ACCURACY = float(os.getenv("PROMOTION_MIN_ACCURACY", "0"))
+        self.PROMOTION_MAX_ACCURACY_DROP = float(os.getenv("PROMOTION_MAX_ACCURACY_DROP", "0.02"))
+        
+        # Importancia de features por permutación (procesos: 0 = presupuesto de entrenamiento, nunca más)
+        self.IMPORTANCE_N_REPEATS = int(os.getenv("IMPORTANCE_N_REPEATS", "5"))
+        self.IMPORTANCE_N_JOBS = int(os.getenv("IMPORTANCE_N_JOBS", "0"))
+        
         # Configuración de la API
+        self.EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+        self.UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+        self.ENSEMBLE_WORKERS = int(os.getenv("ENSEMBLE_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.ENSEMBLE_MAX_VERSIONS = int(os.getenv("ENSEMBLE_MAX_VERSIONS", "5"))
+        
+        # Validación de la entrada de predicción: con SCHEMA_STRICT los valores no numéricos o
+        # infinitos se rechazan (422) en lugar de tratarse como faltantes
+        self.SCHEMA_STRICT = os.getenv("SCHEMA_STRICT", "false").lower() == "true"
+        
+        # Segundos entre comprobaciones del puntero 'latest' para recargar en caliente (0 = desactivado)
+        self.MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "2"))
+        
+        # Predicción en streaming por WebSocket (/ws/predict): tamaño de lote, espera máxima para
+        # completarlo, frames en cola por conexión y conexiones simultáneas
+        self.STREAM_MAX_BATCH_ROWS = int(os.getenv("STREAM_MAX_BATCH_ROWS", "256"))
+        self.STREAM_MAX_WAIT_MS = float(os.getenv("STREAM_MAX_WAIT_MS", "2"))
+        self.STREAM_MAX_PENDING = int(os.getenv("STREAM_MAX_PENDING", "1024"))
+        self.STREAM_MAX_CONNECTIONS = int(os.getenv("STREAM_MAX_CONNECTIONS", "32"))
+        
+        # Hilos OpenMP compartidos por todas las llamadas de entrenamiento e inferencia (0 = automático: la mitad de los
+        # núcleos del worker para inferencia y el resto para entrenamiento)
+        self.CPU_TRAIN_THREADS = int(os.getenv("CPU_TRAIN_THREADS", "0"))
+        self.CPU_INFERENCE_THREADS = int(os.getenv("CPU_INFERENCE_THREADS", "0"))
+        
+        # Retención de CSV de predicciones (direccionados por contenido)
+        self.PREDICTIONS_TTL_SECONDS = int(os.getenv("PREDICTIONS_TTL_SECONDS", str(7 * 24 * 3600)))
+        self.PREDICTIONS_MAX_BYTES = int(os.getenv("PREDICTIONS_MAX_BYTES", str(1024 * 1024 * 1024)))
+        self.PREDICTIONS_EVICTION_INTERVAL = int(os.getenv("PREDICTIONS_EVICTION_INTERVAL", "300"))
+        
+        # Monitoreo de drift (histogramas por feature sobre el tráfico de predicción)
+        self.DRIFT_ENABLED = os.getenv("DRIFT_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.DRIFT_BINS = int(os.getenv("DRIFT_BINS", "20"))
+        
+        # Profiler de peticiones (tasa de muestreo 0 = sólo bajo demanda)
+        self.PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "20"))
+        
+        # Captura de tráfico a JSONL para replay.py (tasa de muestreo 0 = desactivada)
+        self.TRAFFIC_CAPTURE_RATE = float(os.getenv("TRAFFIC_CAPTURE_RATE", "0"))
+        self.TRAFFIC_LOG_PATH = Path(os.getenv("TRAFFIC_LOG_PATH", str(self.OUTPUT_DIR / "traffic.jsonl")))
+        self.TRAFFIC_MAX_BODY_BYTES = int(os.getenv("TRAFFIC_MAX_BODY_BYTES", str(64 * 1024)))
+        self.TRAFFIC_BUFFER_SIZE = int(os.getenv("TRAFFIC_BUFFER_SIZE", "100"))
+        self.TRAFFIC_FLUSH_INTERVAL = float(os.getenv("TRAFFIC_FLUSH_INTERVAL", "5"))
+        
+        # Control de admisión (concurrencia y cola por tipo de petición)
+        self.ADMISSION_PREDICT_CONCURRENCY = int(os.getenv("ADMISSION_PREDICT_CONCURRENCY", "8"))
+        self.ADMISSION_PREDICT_QUEUE = int(os.getenv("ADMISSION_PREDICT_QUEUE", "32"))
+        self.ADMISSION_UPLOAD_CONCURRENCY = int(os.getenv("ADMISSION_UPLOAD_CONCURRENCY", "2"))
+        self.ADMISSION_UPLOAD_QUEUE = int(os.getenv("ADMISSION_UPLOAD_QUEUE", "4"))
+        self.ADMISSION_TRAIN_CONCURRENCY = int(os.getenv("ADMISSION_TRAIN_CONCURRENCY", "1"))
+        self.ADMISSION_TRAIN_QUEUE = int(os.getenv("ADMISSION_TRAIN_QUEUE", "1"))
+        self.ADMISSION_PREVIEW_CONCURRENCY = int(os.getenv("ADMISSION_PREVIEW_CONCURRENCY", "1"))
+        self.ADMISSION_PREVIEW_QUEUE = int(os.getenv("ADMISSION_PREVIEW_QUEUE", "4"))
+        self.ADMISSION_VERSION_SHARE = float(os.getenv("ADMISSION_VERSION_SHARE", "0.75"))
+        self.ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+        
         self.APP_NAME = os.getenv("APP_NAME", "Exoplanet Classifier API")
         self.APP_VERSION = os.getenv("APP_VERSION", "1.0.0")
         self.DEBUG = os.getenv("DEBUG", "false").lower() == "true"
@@ -64,6 +168,11 @@ class Settings:
         """Obtener ruta del dataset."""
         return self.DATASET_PATH
     
+    @staticmethod
+    def version_key(version: str) -> tuple:
+        """Clave de orden semántico (ej: "v1.0.10" -> (1, 0, 10))."""
+        return tuple(int(part) for part in version[1:].split('.'))
+    
     def get_latest_version(self, model_name: str) -> str:
         """Obtener la versión más reciente del modelo."""
         model_dir = self.MODELS_DIR / model_name
@@ -73,12 +182,7 @@ class Settings:
         versions = [d.name for d in model_dir.iterdir() if d.is_dir() and d.name.startswith("v")]
         if versions:
             # Ordenamiento semántico de versiones
-            def version_key(version):
-                # Extraer números de versión (ej: "v1.0.10" -> [1, 0, 10])
-                parts = version[1:].split('.')
-                return tuple(int(part) for part in parts)
-            
-            return sorted(versions, key=version_key)[-1]
+            return sorted(versions, key=self.version_key)[-1]
         return "v1.0.0"
     
     def get_all_versions(self, model_name: str) -> list:
@@ -89,12 +193,7 @@ class Settings:
         
         versions = [d.name for d in model_dir.iterdir() if d.is_dir() and d.name.startswith("v")]
         # Ordenamiento semántico de versiones
-        def version_key(version):
-            # Extraer números de versión (ej: "v1.0.10" -> [1, 0, 10])
-            parts = version[1:].split('.')
-            return tuple(int(part) for part in parts)
-        
-        return sorted(versions, key=version_key)
+        return sorted(versions, key=self.version_key)
     
     def version_exists(self, model_name: str, version: str) -> bool:
         """Verificar si una versión específica existe."""
@@ -107,9 +206,48 @@ class Settings:
         return {
             "model_path": version_dir / "model.pkl",
             "metrics_path": version_dir / "metrics" / "classification_report.json",
-            "matrix_path": version_dir / "matrix" / "confusion_matrix.npy"
+            "matrix_path": version_dir / "matrix" / "confusion_matrix.npy",
+            "importance_path": version_dir / "metrics" / "feature_importance.json",
+            "manifest_path": version_dir / "manifest.json",
+            "drift_reference_path": version_dir / "drift_reference.npz",
+            "similarity_index_path": version_dir / "similarity_index.npz",
+            "holdout_path": version_dir / "holdout.npz",
+            "promotion_path": version_dir / "promotion.json",
+            "metadata_path": version_dir / "metadata.json",
+            "distilled_model_path": version_dir / "distilled" / "model.pkl",
+            "distilled_report_path": version_dir / "distilled" / "report.json"
         }
     
+    def load_manifest(self, model_name: str, version: str = "latest") -> Optional[dict]:
+        """Cargar el manifiesto (esquema de features) de una versión, si existe."""
+        version = self.resolve_version(model_name, version)
+        manifest_path = self.get_version_paths(model_name, version)["manifest_path"]
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    
+    def publish_latest(self, model_name: str, version: str) -> None:
+        """
+        Apunta 'latest' a una versión de forma atómica: se crea un symlink temporal y se
+        renombra sobre 'latest', así ningún proceso ve nunca el puntero ausente o a medias.
+        """
+        model_dir = self.MODELS_DIR / model_name
+        tmp_link = model_dir / f".latest.{os.getpid()}.{threading.get_ident()}.tmp"
+        if tmp_link.is_symlink():
+            tmp_link.unlink()
+        tmp_link.symlink_to(version)
+        os.replace(tmp_link, model_dir / "latest")
+    
+    def resolve_version(self, model_name: str, version: str = "latest") -> str:
+        """Resolver 'latest' al nombre real de la versión (destino del symlink)."""
+        if version != "latest":
+            return version
+        latest_link = self.MODELS_DIR / model_name / "latest"
+        if latest_link.exists():
+            return latest_link.resolve().name
+        return self.get_latest_version(model_name)
+    
     def get_available_models(self) -> list:
         """Obtener lista de todos los modelos disponibles."""
         if not self.MODELS_DIR.exists():
@@ -0,0 +1,125 @@
+"""
+Presupuestos de hilos OpenMP separados para entrenamiento e inferencia.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+from threadpoolctl import ThreadpoolController
+
+from .config import settings
+
+
+def available_cores() -> int:
+    """Núcleos utilizables por este proceso, repartidos entre los workers del servidor (WEB_CONCURRENCY)."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    return max(1, cores // workers)
+
+
+class CpuBudget:
+    """
+    Reserva compartida de hilos OpenMP para un tipo de trabajo (entrenamiento o inferencia).
+
+    HistGradientBoosting toma el número de hilos de ``omp_get_max_threads()`` del hilo que
+    llama a fit/predict, y ese valor es propio de cada hilo. Cada bloque ``limit()`` toma
+    fichas de una reserva de ``threads`` y fija ese número de hilos sólo en el hilo actual,
+    así la suma de hilos de las llamadas concurrentes nunca supera el presupuesto: una
+    llamada sola usa todas las fichas; con varias, cada una toma su parte (al menos una) y
+    si no queda ninguna espera a que otra termine. Un bloque anidado en el mismo hilo
+    reutiliza las fichas del exterior.
+    """
+
+    def __init__(self, name: str, threads: int):
+        self.name = name
+        self.threads = max(1, threads)
+        self.active = 0
+        self.calls = 0
+        self.waits = 0
+        self.in_use = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    def _acquire(self) -> int:
+        with self._condition:
+            self.calls += 1
+            if self.threads - self.in_use < 1:
+                self.waits += 1
+                self._waiting += 1
+                try:
+                    self._condition.wait_for(lambda: self.threads - self.in_use >= 1)
+                finally:
+                    self._waiting -= 1
+            # Parte justa entre las llamadas en curso y las que esperan
+            share = -(-self.threads // (self.active + self._waiting + 1))
+            tokens = max(1, min(self.threads - self.in_use, share))
+            self.in_use += tokens
+            self.active += 1
+            return tokens
+
+    def _release(self, tokens: int) -> None:
+        with self._condition:
+            self.in_use -= tokens
+            self.active -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def limit(self) -> Iterator[int]:
+        """Ejecuta el bloque con las fichas obtenidas como límite de hilos OpenMP del hilo actual."""
+        held = getattr(self._local, "tokens", 0)
+        if held:
+            yield held
+            return
+
+        tokens = self._acquire()
+        self._local.tokens = tokens
+        try:
+            openmp = _openmp_controller()
+            if openmp is None:
+                yield tokens
+            else:
+                with openmp.limit(limits=tokens):
+                    yield tokens
+        finally:
+            self._local.tokens = 0
+            self._release(tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {"threads": self.threads, "active": self.active, "in_use": self.in_use,
+                    "waiting": self._waiting, "calls": self.calls, "waits": self.waits}
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def _openmp_controller() -> Optional[ThreadpoolController]:
+    """
+    Controlador de threadpoolctl restringido a OpenMP, creado una sola vez (inspeccionar las
+    librerías cargadas cuesta varios ms; aplicar un límite sobre el controlador, unos µs).
+    """
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = ThreadpoolController().select(user_api="openmp")
+    return _controller if _controller.lib_controllers else None
+
+
+def _default_budgets() -> Dict[str, CpuBudget]:
+    cores = available_cores()
+    inference = settings.CPU_INFERENCE_THREADS or max(1, cores // 2)
+    train = settings.CPU_TRAIN_THREADS or max(1, cores - inference)
+    return {"train": CpuBudget("train", train), "inference": CpuBudget("inference", inference)}
+
+
+# Presupuestos globales: cpu_budgets["train"] y cpu_budgets["inference"]
+cpu_budgets = _default_budgets()
+train_budget = cpu_budgets["train"]
+inference_budget = cpu_budgets["inference"]
@@ -0,0 +1,22 @@
+"""
+Ejecución de trabajo bloqueante (CPU y disco) fuera del event loop.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from .config import settings
+
+
+# Pool acotado compartido por los endpoints async: parseo, inferencia y escritura de CSV
+blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.EXECUTOR_WORKERS,
+    thread_name_prefix="blocking-worker"
+)
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Ejecuta func en el pool acotado y espera su resultado sin bloquear el event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, functools.partial(func, *args, **kwargs))
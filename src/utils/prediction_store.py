@@ -0,0 +1,150 @@
+"""
+Almacén direccionado por contenido de los CSV de predicciones, con retención por TTL y tamaño.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+import pandas as pd
+
+from .config import settings
+
+
+class PredictionStore:
+    """
+    Guarda cada CSV de predicciones bajo una clave derivada del hash del archivo subido,
+    el modelo, la versión resuelta y las opciones de salida. Una subida repetida devuelve
+    el artefacto existente sin volver a calcularlo. Sólo gestiona sus propios archivos
+    (``predictions_<clave>.csv`` y su metadata ``.json``) dentro de OUTPUT_DIR.
+    """
+
+    PREFIX = "predictions_"
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def make_key(content_hash: str, model_name: str, version: str, **options: Any) -> str:
+        """Clave del artefacto: hash del contenido + modelo + versión + opciones de salida."""
+        payload = json.dumps(
+            {"content": content_hash, "model": model_name, "version": version, "options": options},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def filename(self, key: str) -> str:
+        return f"{self.PREFIX}{key}.csv"
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        csv_path = settings.get_output_path(self.filename(key))
+        return csv_path, csv_path.with_suffix(".json")
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Devuelve la respuesta guardada para la clave (y renueva su uso) o None si no existe."""
+        csv_path, meta_path = self._paths(key)
+        if not csv_path.exists() or not meta_path.exists():
+            return None
+        try:
+            with open(meta_path, "r") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Marcar como usado recientemente (la evicción por tamaño elimina primero lo menos usado)
+        now = time.time()
+        for path in (csv_path, meta_path):
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return metadata
+
+    def save(self, key: str, df: pd.DataFrame, metadata: Dict[str, Any]) -> Path:
+        """Escribe el CSV y su metadata de forma atómica (archivo temporal + rename)."""
+        csv_path, meta_path = self._paths(key)
+        tmp_csv = csv_path.with_name(f".{csv_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_meta = meta_path.with_name(f".{meta_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+        # Guardar con formato UTF-8 y separador de coma
+        df.to_csv(tmp_csv, index=False, encoding='utf-8', sep=',')
+        with open(tmp_meta, "w") as f:
+            json.dump(metadata, f)
+        os.replace(tmp_csv, csv_path)
+        os.replace(tmp_meta, meta_path)
+        return csv_path
+
+    def download_name(self, filename: str) -> Optional[str]:
+        """Nombre legible (archivo original + versión) para la descarga de un artefacto."""
+        meta_path = settings.get_output_path(filename).with_suffix(".json")
+        if not filename.startswith(self.PREFIX) or not meta_path.exists():
+            return None
+        try:
+            with open(meta_path, "r") as f:
+                return json.load(f).get("download_name")
+        except (OSError, ValueError):
+            return None
+
+    def _entries(self) -> List[Tuple[Path, float, int]]:
+        """(csv, último uso, bytes de csv + metadata) de cada artefacto del almacén."""
+        entries = []
+        for csv_path in settings.OUTPUT_DIR.glob(f"{self.PREFIX}*.csv"):
+            meta_path = csv_path.with_suffix(".json")
+            try:
+                stat = csv_path.stat()
+                size = stat.st_size + (meta_path.stat().st_size if meta_path.exists() else 0)
+            except OSError:
+                continue
+            entries.append((csv_path, stat.st_mtime, size))
+        return entries
+
+    def evict(self) -> Dict[str, int]:
+        """
+        Elimina artefactos con más de PREDICTIONS_TTL_SECONDS sin uso y, si el almacén supera
+        PREDICTIONS_MAX_BYTES, los menos usados recientemente hasta volver al límite.
+        """
+        now = time.time()
+        removed = freed = 0
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+
+        for csv_path, last_used, size in entries:
+            expired = now - last_used > settings.PREDICTIONS_TTL_SECONDS
+            if not expired and total <= settings.PREDICTIONS_MAX_BYTES:
+                continue
+            csv_path.unlink(missing_ok=True)
+            csv_path.with_suffix(".json").unlink(missing_ok=True)
+            total -= size
+            freed += size
+            removed += 1
+
+        if removed:
+            print(f"[INFO] Predicciones eliminadas: {removed} archivos ({freed / 1024 ** 2:.1f} MB)")
+        return {"removed": removed, "freed_bytes": freed, "remaining_bytes": total}
+
+    def start_background_eviction(self) -> None:
+        """Lanza un hilo daemon que ejecuta evict() cada PREDICTIONS_EVICTION_INTERVAL segundos."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(settings.PREDICTIONS_EVICTION_INTERVAL):
+                try:
+                    self.evict()
+                except Exception as e:
+                    print(f"[WARNING] Error en la evicción de predicciones: {e}")
+
+        self._thread = threading.Thread(target=loop, name="prediction-eviction", daemon=True)
+        self._thread.start()
+
+    def stop_background_eviction(self) -> None:
+        self._stop.set()
+
+
+# Instancia global del almacén de predicciones
+prediction_store = PredictionStore()
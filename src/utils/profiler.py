@@ -0,0 +1,115 @@
+"""
+Profiler de peticiones bajo demanda (cabecera, parámetro o muestreo) con buffer circular de perfiles.
+"""
+import io
+import time
+import uuid
+import random
+import marshal
+import pstats
+import cProfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Optional, Dict, Any, List, Tuple
+
+from .config import settings
+
+
+class RequestProfiler:
+    """
+    Perfila con cProfile la parte bloqueante de una petición y guarda los últimos
+    ``capacity`` perfiles en memoria, en el formato de ``pstats`` (``.prof``), que se abre
+    con ``pstats.Stats``, snakeviz, gprof2dot, etc.
+
+    Si la petición no lo solicita y la tasa de muestreo es 0, no se agrega ningún costo
+    más allá de la comprobación de la cabecera y el parámetro.
+    """
+
+    HEADER = "x-profile"
+
+    def __init__(self, capacity: int, sample_rate: float):
+        self.capacity = max(1, capacity)
+        self.sample_rate = sample_rate
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def should_profile(self, headers: Any, requested: bool = False) -> bool:
+        """Decide si perfilar: parámetro explícito, cabecera ``X-Profile`` o muestreo aleatorio."""
+        if requested or headers.get(self.HEADER, "").lower() in ("1", "true", "yes"):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def run(self, label: str, func: Callable, *args: Any, **kwargs: Any) -> Tuple[Any, str]:
+        """
+        Ejecuta func bajo cProfile en el hilo actual y guarda el perfil.
+
+        Returns:
+            Resultado de func e identificador del perfil
+        """
+        profiler = cProfile.Profile()
+        started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+            profile_id = self._store(label, profiler, started_at, duration)
+        return result, profile_id
+
+    def _store(self, label: str, profiler: cProfile.Profile, started_at: str, duration: float) -> str:
+        profiler.create_stats()
+        profile_id = uuid.uuid4().hex[:16]
+        entry = {
+            "id": profile_id,
+            "label": label,
+            "started_at": started_at,
+            "duration_seconds": round(duration, 4),
+            "data": marshal.dumps(profiler.stats),
+        }
+        with self._lock:
+            self._profiles[profile_id] = entry
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadatos de los perfiles guardados, del más reciente al más antiguo."""
+        with self._lock:
+            entries = list(self._profiles.values())
+        return [
+            {key: value for key, value in entry.items() if key != "data"} | {"bytes": len(entry["data"])}
+            for entry in reversed(entries)
+        ]
+
+    def get(self, profile_id: str) -> Optional[bytes]:
+        """Perfil en formato pstats (marshal del diccionario de estadísticas)."""
+        with self._lock:
+            entry = self._profiles.get(profile_id)
+        return entry["data"] if entry else None
+
+    def summary(self, profile_id: str, limit: int = 30, sort: str = "cumulative") -> Optional[str]:
+        """Resumen en texto (pstats.print_stats) de un perfil."""
+        data = self.get(profile_id)
+        if data is None:
+            return None
+        stream = io.StringIO()
+        stats = pstats.Stats(_MarshalledStats(data), stream=stream)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+class _MarshalledStats:
+    """Adaptador para construir pstats.Stats desde los bytes guardados."""
+
+    def __init__(self, data: bytes):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self) -> None:
+        pass
+
+
+# Instancia global del profiler de peticiones
+request_profiler = RequestProfiler(settings.PROFILE_BUFFER_SIZE, settings.PROFILE_SAMPLE_RATE)
@@ -0,0 +1,113 @@
+"""
+Telemetría por etapa del entrenamiento: tiempo de reloj, tiempo de CPU y pico de memoria.
+"""
+import os
+import time
+import resource
+import functools
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional, Dict, Any
+
+
+_STATM = Path("/proc/self/statm")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> Optional[int]:
+    """Memoria residente actual del proceso en bytes (None si /proc no está disponible)."""
+    try:
+        return int(_STATM.read_text().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _RssSampler(threading.Thread):
+    """Hilo que muestrea la RSS del proceso y guarda el máximo observado."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="telemetry-rss", daemon=True)
+        self.interval = interval
+        self.peak = current_rss() or 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss() or 0)
+
+    def finish(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return max(self.peak, current_rss() or 0)
+
+
+class TrainingTelemetry:
+    """
+    Registra, por etapa, el tiempo de reloj, el tiempo de CPU del proceso (suma de todos
+    los hilos, por lo que supera al de reloj cuando el entrenamiento es paralelo) y el
+    pico de memoria residente, muestreada cada ``sample_interval`` segundos.
+    """
+
+    def __init__(self, sample_interval: float = 0.01):
+        self.sample_interval = sample_interval
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def start(self, name: str) -> Dict[str, Any]:
+        sampler = None
+        baseline = current_rss()
+        if baseline is not None and self.sample_interval > 0:
+            sampler = _RssSampler(self.sample_interval)
+            sampler.start()
+        return {
+            "name": name,
+            "wall": time.perf_counter(),
+            "cpu": time.process_time(),
+            "baseline": baseline,
+            "sampler": sampler,
+        }
+
+    def stop(self, token: Dict[str, Any], **counts: Any) -> Dict[str, Any]:
+        stage = {
+            "wall_seconds": round(time.perf_counter() - token["wall"], 4),
+            "cpu_seconds": round(time.process_time() - token["cpu"], 4),
+        }
+        if token["sampler"] is not None:
+            peak = token["sampler"].finish()
+            stage["peak_rss_mb"] = round(peak / 1024 ** 2, 1)
+            stage["peak_rss_delta_mb"] = round(max(peak - token["baseline"], 0) / 1024 ** 2, 1)
+        stage.update(counts)
+        self.stages[token["name"]] = stage
+        return stage
+
+    def summary(self) -> Dict[str, Any]:
+        """Etapas registradas, totales y pico de RSS del proceso."""
+        return {
+            "recorded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "stages": self.stages,
+            "total_wall_seconds": round(sum(s["wall_seconds"] for s in self.stages.values()), 4),
+            "total_cpu_seconds": round(sum(s["cpu_seconds"] for s in self.stages.values()), 4),
+            # ru_maxrss está en KB en Linux
+            "process_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+
+
+def track_stage(name: str, counts: Optional[Callable[[Any], Dict[str, Any]]] = None):
+    """
+    Decorador para métodos de etapa: mide la llamada con ``self.telemetry`` y agrega
+    los conteos que devuelva ``counts(self)`` al terminar.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            token = self.telemetry.start(name)
+            try:
+                result = method(self, *args, **kwargs)
+            except BaseException:
+                if token["sampler"] is not None:
+                    token["sampler"].finish()
+                raise
+            self.telemetry.stop(token, **(counts(self) if counts else {}))
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,228 @@
+"""
+Captura muestreada del tráfico HTTP a un log JSONL, para reproducirlo con replay.py.
+"""
+import json
+import time
+import random
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from .config import settings
+
+
+# Rutas que no son tráfico de la aplicación
+EXCLUDED_PREFIXES = ("/admin", "/docs", "/redoc", "/openapi.json")
+
+
+def payload_shape(content_type: str, body: bytes, body_bytes: int) -> Dict[str, Any]:
+    """
+    Forma del payload: filas y columnas de un JSON de /predict o de un CSV subido.
+    Si el cuerpo se truncó, las filas del CSV se estiman en proporción a los bytes.
+    """
+    shape: Dict[str, Any] = {}
+    truncated = len(body) < body_bytes
+    if content_type.startswith("application/json") and body and not truncated:
+        try:
+            rows = json.loads(body).get("data", [])
+            shape["rows"] = len(rows)
+            shape["columns"] = len(rows[0]) if rows else 0
+        except (ValueError, AttributeError, TypeError):
+            pass
+    elif content_type.startswith("multipart/form-data") and body:
+        # Contenido del archivo: tras las cabeceras de la parte y antes del boundary final
+        start = body.find(b"\r\n\r\n")
+        if start < 0:
+            return shape
+        content = body[start + 4:]
+        if not truncated:
+            content = content[:content.rfind(b"\r\n--")]
+        lines = [line for line in content.split(b"\n") if line.strip() and not line.startswith(b"#")]
+        if not lines:
+            return shape
+        rows = len(lines) - 1
+        shape["rows"] = int(rows * body_bytes / len(body)) if truncated else rows
+        shape["columns"] = lines[0].count(b",") + 1
+    return shape
+
+
+class TrafficRecorder:
+    """
+    Registra una muestra de las peticiones (ruta, query, modelo/versión, forma del payload,
+    estado y duración) en un archivo JSONL.
+
+    En el camino de la petición sólo se agrega la entrada a un buffer en memoria; el
+    decodificado del payload y la escritura los hace un hilo en segundo plano por lotes.
+    Los cuerpos JSON de hasta TRAFFIC_MAX_BODY_BYTES se guardan completos para poder
+    reproducirlos; de los CSV subidos sólo se guarda la forma.
+    """
+
+    def __init__(self, path: Optional[Path] = None, sample_rate: Optional[float] = None,
+                 max_body_bytes: Optional[int] = None, buffer_size: Optional[int] = None):
+        self.path = Path(path or settings.TRAFFIC_LOG_PATH)
+        self.sample_rate = settings.TRAFFIC_CAPTURE_RATE if sample_rate is None else sample_rate
+        self.max_body_bytes = settings.TRAFFIC_MAX_BODY_BYTES if max_body_bytes is None else max_body_bytes
+        self.buffer_size = max(1, buffer_size or settings.TRAFFIC_BUFFER_SIZE)
+        self._buffer: List[Tuple] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Métricas
+        self.captured = 0
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def should_capture(self, path: str) -> bool:
+        if not self.enabled or path.startswith(EXCLUDED_PREFIXES):
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, method: str, path: str, query_string: str, content_type: str,
+               body: bytes, body_bytes: int, status: Optional[int], duration: float) -> None:
+        """Agrega una petición al buffer (sin E/S)."""
+        entry = (time.time(), method, path, query_string, content_type, body, body_bytes, status, duration)
+        with self._lock:
+            # Acotar la memoria si el escritor no da abasto
+            if len(self._buffer) >= self.buffer_size * 10:
+                self.dropped += 1
+                return
+            self._buffer.append(entry)
+            self.captured += 1
+            full = len(self._buffer) >= self.buffer_size
+        if full:
+            self._wakeup.set()
+
+    def _to_line(self, entry: Tuple) -> str:
+        ts, method, path, query_string, content_type, body, body_bytes, status, duration = entry
+        query = {k: v if len(v) > 1 else v[0] for k, v in parse_qs(query_string).items()}
+        payload = None
+        if content_type.startswith("application/json") and body and len(body) == body_bytes:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                payload = None
+        return json.dumps({
+            "ts": datetime.fromtimestamp(ts).isoformat(timespec="milliseconds"),
+            "method": method,
+            "path": path,
+            "query": query,
+            "model_name": query.get("model_name", "hgb_exoplanet_model"),
+            "version": query.get("version", "latest"),
+            "status": status,
+            "duration_ms": round(duration * 1e3, 3),
+            "content_type": content_type.split(";")[0],
+            "body_bytes": body_bytes,
+            "shape": payload_shape(content_type, body, body_bytes),
+            "payload": payload,
+        })
+
+    def flush(self) -> int:
+        """Escribe en el log las entradas pendientes. Returns: entradas escritas."""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._buffer = self._buffer, []
+            if not entries:
+                return 0
+            lines = [self._to_line(entry) for entry in entries]
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            self.written += len(lines)
+            return len(lines)
+
+    def start(self) -> None:
+        """Lanza el hilo que vacía el buffer cada TRAFFIC_FLUSH_INTERVAL segundos o al llenarse."""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                self._wakeup.wait(settings.TRAFFIC_FLUSH_INTERVAL)
+                self._wakeup.clear()
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"[WARNING] Error escribiendo el log de tráfico: {e}")
+
+        self._thread = threading.Thread(target=loop, name="traffic-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._buffer)
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "path": str(self.path),
+            "captured": self.captured,
+            "written": self.written,
+            "pending": pending,
+            "dropped": self.dropped,
+        }
+
+
+class TrafficCaptureMiddleware:
+    """
+    Middleware ASGI que mide las peticiones muestreadas y copia su cuerpo (hasta el límite)
+    a medida que la aplicación lo lee, sin consumirlo ni cambiar el streaming de las subidas.
+    """
+
+    def __init__(self, app, recorder: TrafficRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.recorder.should_capture(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        limit = self.recorder.max_body_bytes
+        body = bytearray()
+        state = {"bytes": 0, "status": None}
+
+        async def capture_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                state["bytes"] += len(chunk)
+                if len(body) < limit:
+                    body.extend(chunk[:limit - len(body)])
+            return message
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            headers = dict(scope.get("headers") or [])
+            self.recorder.record(
+                scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"),
+                headers.get(b"content-type", b"").decode("latin-1"), bytes(body), state["bytes"],
+                state["status"], time.perf_counter() - start
+            )
+
+
+# Instancia global del registro de tráfico
+traffic_recorder = TrafficRecorder()
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from src.utils import admission
+from src.utils.admission import AdmissionGate, AdmissionRejected
+
+
+def test_queue_full_timeout_and_per_version_cap():
+    async def scenario():
+        gate = AdmissionGate("predict", max_concurrent=2, max_queue=1, per_key_limit=1, queue_timeout=0.05)
+        assert await gate.acquire("m:v1") == 0.0
+
+        # La misma versión no puede ocupar el segundo cupo: espera en cola aunque haya sitio
+        waiting = asyncio.ensure_future(gate.acquire("m:v1"))
+        await asyncio.sleep(0)
+        assert gate.stats()["queued"] == 1
+        assert await gate.acquire("m:v2") == 0.0
+
+        # Cola llena -> 429
+        with pytest.raises(AdmissionRejected) as full:
+            await gate.acquire("m:v3")
+        assert full.value.status_code == 429 and full.value.retry_after >= 1
+
+        # Espera agotada -> 503 con Retry-After
+        with pytest.raises(AdmissionRejected) as timeout:
+            await waiting
+        assert timeout.value.status_code == 503 and timeout.value.retry_after >= 1
+        assert gate.stats()["queued"] == 0 and gate.stats()["active"] == 2
+
+        # Al liberar v1 entra el siguiente de v1
+        waiting = asyncio.ensure_future(gate.acquire("m:v1"))
+        await asyncio.sleep(0)
+        gate.release("m:v1", 0.01)
+        assert await waiting >= 0.0
+        assert gate.stats()["active_by_version"] == {"m:v1": 1, "m:v2": 1}
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_returns_its_slot():
+    async def scenario():
+        gate = AdmissionGate("upload", max_concurrent=1, max_queue=2, per_key_limit=1, queue_timeout=5)
+        await gate.acquire("a")
+
+        # Cancelado en cola: deja la cola sin ocupar cupo
+        queued = asyncio.ensure_future(gate.acquire("b"))
+        await asyncio.sleep(0)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert gate.stats()["queued"] == 0
+
+        # Cancelado justo después de concederle el cupo: o lo devuelve acquire o (si wait_for
+        # absorbe la cancelación) lo recibe quien llamó, que lo libera
+        granted = asyncio.ensure_future(gate.acquire("b"))
+        await asyncio.sleep(0)
+        gate.release("a")
+        granted.cancel()
+        try:
+            await granted
+            gate.release("b")
+        except asyncio.CancelledError:
+            pass
+        assert gate.stats()["active"] == 0 and gate.stats()["active_by_version"] == {}
+        assert await gate.acquire("c") == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_per_version_share_rounds_down(monkeypatch):
+    monkeypatch.setattr(admission.settings, "ADMISSION_VERSION_SHARE", 0.75)
+    assert admission._gate("upload", 2, 4).per_key_limit == 1
+    assert admission._gate("train", 1, 1).per_key_limit == 1
+    assert admission._gate("predict", 8, 32).per_key_limit == 6
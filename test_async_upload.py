@@ -0,0 +1,72 @@
+"""
+Tests de /predict/upload: el procesamiento no debe bloquear el event loop.
+"""
+import time
+import asyncio
+
+import httpx
+import pandas as pd
+
+import API.main as api
+from src.utils.config import settings
+
+
+def _kepler_csv(rows: int = 200) -> bytes:
+    df = pd.read_csv(settings.get_dataset_path(), comment="#").head(rows)
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def test_model_info_stays_fast_during_upload(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(settings, "DRIFT_ENABLED", False)
+
+    # Simular un parseo lento (bloqueante) dentro del procesamiento del upload
+    original_reader = api.read_uploaded_csv
+
+    def slow_reader(*args, **kwargs):
+        time.sleep(1.5)
+        return original_reader(*args, **kwargs)
+
+    monkeypatch.setattr(api, "read_uploaded_csv", slow_reader)
+    content = _kepler_csv()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            upload = asyncio.create_task(
+                client.post("/predict/upload", files={"file": ("big.csv", content, "text/csv")})
+            )
+            await asyncio.sleep(0.2)
+
+            latencies = []
+            while not upload.done():
+                start = time.perf_counter()
+                response = await client.get("/model/info")
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200
+                await asyncio.sleep(0.05)
+            return await upload, latencies
+
+    upload_response, latencies = asyncio.run(scenario())
+
+    assert upload_response.status_code == 200
+    assert upload_response.json()["total_planets"] == 200
+    assert len(latencies) >= 5
+    assert max(latencies) < 0.5
+
+
+def test_upload_over_size_limit_is_rejected(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 1024)
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_BYTES", 256)
+
+    transport = httpx.ASGITransport(app=api.app)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/predict/upload", files={"file": ("big.csv", _kepler_csv(), "text/csv")})
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
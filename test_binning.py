@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import HistGradientBoostingClassifier
+
+from src.models.binning import CachedBinningHGBClassifier, binned_cache, check_sklearn_version
+
+
+def test_cached_fit_equals_uncached_fit_above_subsample():
+    # Más filas que _BinMapper.subsample (2e5): los cortes dependen de la semilla
+    rng = np.random.default_rng(0)
+    X = rng.lognormal(size=(210_000, 2))
+    y = (X[:, 0] > np.median(X[:, 0])).astype(int)
+    params = dict(max_iter=3, early_stopping=False)
+    binned_cache.clear()
+
+    CachedBinningHGBClassifier(random_state=0, **params).fit(X, y)
+    cached = CachedBinningHGBClassifier(random_state=1, **params).fit(X, y)
+    uncached = HistGradientBoostingClassifier(random_state=1, **params).fit(X, y)
+
+    for a, b in zip(cached._bin_mapper.bin_thresholds_, uncached._bin_mapper.bin_thresholds_):
+        np.testing.assert_array_equal(a, b)
+    np.testing.assert_array_equal(cached.predict_proba(X[:1000]), uncached.predict_proba(X[:1000]))
+
+    # Con la misma semilla sí se reutiliza
+    hits = binned_cache.stats()["hits"]
+    CachedBinningHGBClassifier(random_state=1, **params).fit(X, y)
+    assert binned_cache.stats()["hits"] == hits + 1
+
+
+def test_unsupported_sklearn_fails_loudly():
+    check_sklearn_version("1.3.2")
+    check_sklearn_version("1.5.2")
+    for version in ("1.2.2", "1.6.0", "1.7.dev0"):
+        with pytest.raises(ImportError, match="scikit-learn"):
+            check_sklearn_version(version)
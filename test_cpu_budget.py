@@ -0,0 +1,46 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from threadpoolctl import threadpool_info
+
+import sklearn.ensemble  # noqa: F401  (carga el runtime OpenMP)
+from src.utils.cpu_budget import CpuBudget
+
+
+def _openmp_threads():
+    return [lib["num_threads"] for lib in threadpool_info() if lib["user_api"] == "openmp"]
+
+
+def test_concurrent_calls_share_the_thread_budget():
+    budget = CpuBudget("inference", 4)
+    lock = threading.Lock()
+    running = []
+    peak = [0]
+
+    def call(_):
+        with budget.limit() as tokens:
+            assert set(_openmp_threads()) <= {tokens}
+            with lock:
+                running.append(tokens)
+                peak[0] = max(peak[0], sum(running))
+            time.sleep(0.02)
+            with lock:
+                running.remove(tokens)
+        return tokens
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        tokens = list(pool.map(call, range(32)))
+
+    # Nunca más hilos OpenMP en total que el presupuesto, y todas las llamadas terminan
+    assert peak[0] <= 4 and len(tokens) == 32
+    stats = budget.stats()
+    assert stats["in_use"] == 0 and stats["active"] == 0 and stats["calls"] == 32 and stats["waits"] > 0
+
+
+def test_single_call_uses_whole_budget_and_nested_blocks_reuse_it():
+    budget = CpuBudget("train", 3)
+    with budget.limit() as outer:
+        with budget.limit() as inner:
+            assert outer == inner == 3 and budget.stats()["in_use"] == 3
+    assert budget.stats()["in_use"] == 0
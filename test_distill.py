@@ -0,0 +1,55 @@
+import joblib
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import API.main as api
+from src.models.distill import distilled_models, train_student
+from src.models.hgb_exoplanet import HGBExoplanetModel
+from src.utils.config import settings
+
+
+def test_student_agrees_with_teacher_on_holdout():
+    teacher = joblib.load(settings.get_version_paths("hgb_exoplanet_model", "v1.0.2")["model_path"])
+
+    model = HGBExoplanetModel()
+    model.load_data()
+    model.prepare_features()
+    model.subsample(3000)
+    model.split_data()
+    columns = list(teacher.feature_names_in_)
+    X_train = model.X_train.reindex(columns=columns)
+    X_test = model.X_test.reindex(columns=columns)
+
+    student = train_student(teacher, X_train, max_leaf_nodes=8, max_iter=30, learning_rate=0.25)
+
+    assert list(student.classes_) == list(teacher.classes_)
+    assert student.n_iter_ <= 30
+    assert (student.predict(X_test) == teacher.predict(X_test)).mean() > 0.9
+
+
+def test_fast_tier_validates_input_once_for_both_models(monkeypatch):
+    monkeypatch.setattr(settings, "DRIFT_ENABLED", False)
+    version = "v1.0.2"
+    teacher = joblib.load(settings.get_version_paths("hgb_exoplanet_model", version)["model_path"])
+    columns = list(teacher.feature_names_in_)
+    X = pd.read_csv(settings.get_dataset_path(), comment="#", nrows=2000).reindex(columns=columns)
+    student = train_student(teacher, X, max_leaf_nodes=8, max_iter=10, learning_rate=0.25)
+    monkeypatch.setitem(distilled_models._models, ("hgb_exoplanet_model", version), student)
+
+    rows = pd.read_csv(settings.get_dataset_path(), comment="#", nrows=5)[columns[:-1]]
+    records = rows.fillna(0.0).to_dict("records")
+    for record in records:
+        record["not_a_feature"] = 1.0
+    client = TestClient(api.app)
+
+    # Umbral 1.0: todas las filas pasan al modelo completo con la matriz ya validada
+    response = client.post(f"/predict?tier=fast&version={version}&fallback_threshold=1.0", json={"data": records}).json()
+    assert response["validation"]["missing_columns"] == [columns[-1]]
+    assert response["validation"]["ignored_columns"] == ["not_a_feature"]
+    assert response["model_info"]["fallback_rows"] == 5
+
+    full = api.load_model_by_version("hgb_exoplanet_model", version, schema_only=True)
+    expected = full.predict_proba(full.validate_input(pd.DataFrame(records))[0])
+    got = np.array([list(p["probabilities"].values()) for p in response["predictions"]])
+    np.testing.assert_allclose(got, expected)
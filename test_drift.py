@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from src.models.drift import FeatureSketch, population_stability_index
+
+
+def _frame(rng, n, shift=0.0):
+    X = pd.DataFrame({
+        "koi_period": rng.lognormal(2.0, 1.0, n) + shift,
+        "koi_depth": rng.normal(500.0, 100.0, n),
+    })
+    X.loc[rng.random(n) < 0.1, "koi_depth"] = np.nan
+    return X
+
+
+def test_sketches_merge_and_detect_shift():
+    rng = np.random.default_rng(0)
+    reference = FeatureSketch.from_reference(_frame(rng, 5000), n_bins=10)
+
+    # Dos workers que se combinan equivalen a un único sketch con todas las filas
+    live = _frame(rng, 2000)
+    a, b, whole = reference.empty_like(), reference.empty_like(), reference.empty_like()
+    a.update(live.iloc[:700].to_numpy())
+    b.update(live.iloc[700:].to_numpy())
+    whole.update(live.to_numpy())
+    a.merge(b)
+    assert a.rows == whole.rows == 2000
+    np.testing.assert_array_equal(a.counts, whole.counts)
+    assert abs(whole.missing_rate()[1] - 0.1) < 0.03
+
+    psi_same = population_stability_index(reference.counts, whole.counts)
+    shifted = reference.empty_like()
+    shifted.update(_frame(rng, 2000, shift=20.0).to_numpy())
+    psi_shifted = population_stability_index(reference.counts, shifted.counts)
+
+    assert psi_same.max() < 0.1
+    assert psi_shifted[0] > 0.25 and psi_shifted[1] < 0.1
+
+
+def test_rebuilt_reference_uses_the_version_features(monkeypatch, tmp_path):
+    import joblib
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    from sklearn.pipeline import Pipeline
+
+    from src.models.drift import DriftMonitor
+    from src.utils.config import settings
+
+    # Versión antigua entrenada con otro esquema (subconjunto y otro orden de features)
+    features = ["koi_depth", "koi_period", "koi_duration"]
+    data = pd.read_csv(settings.get_dataset_path(), comment="#").head(300)
+    pipe = Pipeline([("hgb", HistGradientBoostingClassifier(max_iter=5))])
+    pipe.fit(data[features], data["koi_disposition"])
+    monkeypatch.setattr(settings, "MODELS_DIR", tmp_path)
+    paths = settings.get_version_paths("hgb_exoplanet_model", "v0.9.0")
+    paths["model_path"].parent.mkdir(parents=True)
+    joblib.dump(pipe, paths["model_path"])
+
+    DriftMonitor()._build_reference("hgb_exoplanet_model", "v0.9.0")
+    reference = FeatureSketch.load(paths["drift_reference_path"])
+    assert reference.features == features
+    assert reference.missing_rate().max() < 0.5
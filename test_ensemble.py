@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+import API.main as api
+from src.models.ensemble import VersionEnsemble, ensemble_members
+from src.models.hgb_exoplanet import HGBExoplanetModel
+from src.utils.config import settings
+
+
+def _load(version):
+    model = HGBExoplanetModel()
+    model.load_model("hgb_exoplanet_model", version, schema_only=True)
+    return model
+
+
+def test_ensemble_matches_per_version_scoring():
+    versions = ["v1.0.2", "v1.0.0"]
+    models = {v: _load(v) for v in versions}
+    ensemble = VersionEnsemble(models)
+
+    X = pd.read_csv(settings.get_dataset_path(), comment="#", nrows=200)
+    result = ensemble.score(X)
+
+    assert result["shared_schema"]
+    assert result["classes"] == ["CANDIDATE", "CONFIRMED", "FALSE_POSITIVE"]
+    for version, model in models.items():
+        expected = model.predict_proba(X.reindex(columns=model.X_num.columns, fill_value=0.0))
+        np.testing.assert_allclose(result["per_version"][version], expected)
+
+    np.testing.assert_allclose(result["mean"], np.mean([result["per_version"][v] for v in versions], axis=0))
+    np.testing.assert_allclose(result["mean"].sum(axis=1), 1.0)
+
+
+def test_validated_frame_is_reused_and_members_are_cached(monkeypatch):
+    monkeypatch.setattr(settings, "DRIFT_ENABLED", False)
+    X = pd.read_csv(settings.get_dataset_path(), comment="#", nrows=50)
+    ensemble = VersionEnsemble({v: _load(v) for v in ["v1.0.2", "v1.0.0"]})
+    X_primary, _ = ensemble.primary.validate_input(X)
+    np.testing.assert_allclose(ensemble.score(X, validated=X_primary)["mean"], ensemble.score(X)["mean"])
+
+    loads = []
+    load = api.load_model_by_version
+    monkeypatch.setattr(api, "load_model_by_version", lambda *a, **k: loads.append(a) or load(*a, **k))
+    ensemble_members.clear()
+    for _ in range(2):
+        with api.serving_ensemble("hgb_exoplanet_model", ["latest,v1.0.0"]) as served:
+            assert served.versions == [api.model_holder.version, "v1.0.0"]
+    # 'latest' sale del holder y v1.0.0 se lee de disco una sola vez
+    assert [a[1] for a in loads] == ["v1.0.0"]
@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+from sklearn.metrics import roc_auc_score, average_precision_score, precision_score, recall_score
+
+from src.models.holdout import HoldoutScores
+
+
+CLASSES = ["CANDIDATE", "CONFIRMED", "FALSE_POSITIVE"]
+
+
+def _scores(rng, n):
+    labels = rng.integers(0, 3, n)
+    logits = rng.normal(size=(n, 3)) + 2.0 * np.eye(3)[labels]
+    proba = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+    # Empates, como los de un modelo de árboles
+    proba = np.round(proba, 3)
+    return np.asarray(CLASSES)[labels], proba
+
+
+def test_curves_and_thresholds_match_sklearn_and_roundtrip(tmp_path):
+    rng = np.random.default_rng(0)
+    y_true, proba = _scores(rng, 3000)
+    scores = HoldoutScores.from_predictions(y_true, proba, CLASSES)
+    scores.save(tmp_path / "holdout.npz")
+    loaded = HoldoutScores.load(tmp_path / "holdout.npz")
+    assert loaded.classes == CLASSES and loaded.source == "evaluate"
+
+    positive = y_true == "CONFIRMED"
+    p = loaded.proba[:, 1]
+    curves = loaded.curves("CONFIRMED", max_points=50)["CONFIRMED"]
+    assert abs(curves["roc_auc"] - roc_auc_score(positive, p)) < 1e-6
+    assert abs(curves["average_precision"] - average_precision_score(positive, p)) < 1e-6
+    assert len(curves["roc"]["fpr"]) <= 50
+
+    sweep = loaded.thresholds("CONFIRMED", thresholds=[0.3, 0.6])
+    for t, precision, recall in zip(sweep["thresholds"], sweep["precision"], sweep["recall"]):
+        assert abs(precision - precision_score(positive, p >= t)) < 1e-6
+        assert abs(recall - recall_score(positive, p >= t)) < 1e-6
+
+    calibration = loaded.calibration(n_bins=10)
+    assert sum(calibration["bins"]["count"]) == 3000
+    assert 0.0 <= calibration["ece"] <= calibration["mce"] <= 1.0
+
+
+def test_queries_on_a_large_holdout_take_milliseconds():
+    rng = np.random.default_rng(1)
+    scores = HoldoutScores.from_predictions(*_scores(rng, 200_000), CLASSES)
+
+    start = time.perf_counter()
+    scores.curves(max_points=200)
+    scores.calibration("CONFIRMED", n_bins=20)
+    scores.thresholds("CONFIRMED", steps=100)
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,37 @@
+"""
+Tests de la recarga en caliente del modelo 'latest'.
+"""
+import os
+import shutil
+
+from src.models.hot_swap import ModelHolder
+from src.utils.config import settings
+
+
+def test_pointer_change_swaps_and_releases_after_last_reference(monkeypatch, tmp_path):
+    source = settings.MODELS_DIR / "hgb_exoplanet_model"
+    for version in ("v1.0.1", "v1.0.2"):
+        (tmp_path / "hgb_exoplanet_model" / version).mkdir(parents=True)
+        shutil.copy(source / version / "model.pkl", tmp_path / "hgb_exoplanet_model" / version / "model.pkl")
+    monkeypatch.setattr(settings, "MODELS_DIR", tmp_path)
+    settings.publish_latest("hgb_exoplanet_model", "v1.0.1")
+
+    holder = ModelHolder("hgb_exoplanet_model", watch_interval=0)
+    assert holder.load() == "v1.0.1"
+    assert not holder.check()
+
+    with holder.acquire() as in_flight:
+        settings.publish_latest("hgb_exoplanet_model", "v1.0.2")
+        assert os.readlink(tmp_path / "hgb_exoplanet_model" / "latest") == "v1.0.2"
+        assert holder.check()
+
+        # La petición en curso conserva la versión anterior; las nuevas ven la nueva
+        assert in_flight.version == "v1.0.1" and in_flight.pipe is not None
+        with holder.acquire() as current:
+            assert current.version == "v1.0.2"
+        assert holder.stats()["retired_in_flight"] == {"v1.0.1": 1}
+        assert holder.released == 0
+
+    assert holder.released == 1
+    assert holder.stats()["retired_in_flight"] == {}
+    assert [p.name for p in (tmp_path / "hgb_exoplanet_model").iterdir() if p.name.startswith(".")] == []
@@ -0,0 +1,36 @@
+import shutil
+import time
+
+from fastapi.testclient import TestClient
+
+import API.main as api
+from src.models.importance import FeatureImportanceService
+from src.utils.config import settings
+
+
+def test_importance_is_scheduled_once_then_served_from_cache(monkeypatch, tmp_path):
+    source = settings.MODELS_DIR / "hgb_exoplanet_model" / "v1.0.2"
+    shutil.copytree(source, tmp_path / "hgb_exoplanet_model" / "v1.0.2")
+    monkeypatch.setattr(settings, "MODELS_DIR", tmp_path)
+    monkeypatch.setattr(settings, "IMPORTANCE_N_REPEATS", 1)
+    monkeypatch.setattr(settings, "IMPORTANCE_N_JOBS", 2)
+    service = FeatureImportanceService()
+    monkeypatch.setattr(api, "importance_service", service)
+
+    client = TestClient(api.app)
+    url = "/model-info/hgb_exoplanet_model/v1.0.2/feature-importance"
+    response = client.get(url)
+    assert response.status_code == 202 and response.json()["status"] == "running"
+
+    deadline = time.time() + 120
+    while response.status_code == 202 and time.time() < deadline:
+        time.sleep(0.5)
+        response = client.get(url)
+    assert response.status_code == 200
+    importance = response.json()["importance"]
+    assert importance["n_repeats"] == 1 and importance["groups"]
+    assert settings.get_version_paths("hgb_exoplanet_model", "v1.0.2")["importance_path"].exists()
+
+    # Ya calculada: se sirve desde caché sin lanzar otro cálculo
+    assert client.get(url).json()["importance"] == importance
+    assert len(service._jobs) == 1
@@ -0,0 +1,40 @@
+"""
+Tests de la reutilización de versiones con la misma huella de entrenamiento.
+"""
+import json
+
+import pandas as pd
+
+from src.models.hgb_exoplanet import HGBExoplanetModel
+from src.utils.config import settings
+
+
+def test_identical_training_reuses_version_unless_forced(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "MODELS_DIR", tmp_path / "models")
+    monkeypatch.setattr(settings, "PROMOTION_GATE", False)
+    csv_path = tmp_path / "kepler_sample.csv"
+    pd.read_csv(settings.get_dataset_path(), comment="#").head(1500).to_csv(csv_path, index=False)
+    model_dir = settings.MODELS_DIR / "hgb_exoplanet_model"
+
+    first = HGBExoplanetModel(csv_path=csv_path, learning_rate=0.1)
+    first.run()
+    metadata = json.loads((model_dir / first.version / "metadata.json").read_text())
+    assert metadata["fingerprint"]["digest"] == first.fingerprint["digest"]
+
+    other = HGBExoplanetModel(csv_path=csv_path, learning_rate=0.2)
+    other.run()
+    assert other.version != first.version
+
+    again = HGBExoplanetModel(csv_path=csv_path, learning_rate=0.1)
+    again.run()
+    assert again.reused and again.version == first.version
+    assert "train_model" not in again.telemetry.stages
+    # La versión reutilizada es más antigua que 'latest': no lo mueve hacia atrás
+    assert settings.resolve_version("hgb_exoplanet_model", "latest") == other.version
+    assert not again.promotion["promoted"]
+    assert len(again.predict(pd.read_csv(csv_path).head(5))) == 5
+
+    forced = HGBExoplanetModel(csv_path=csv_path, learning_rate=0.1)
+    forced.run(force=True)
+    assert not forced.reused
+    assert settings.get_all_versions("hgb_exoplanet_model") == ["v1.0.0", "v1.0.1", "v1.0.2"]
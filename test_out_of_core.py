@@ -0,0 +1,72 @@
+"""
+Tests del entrenamiento fuera de memoria (CSV por bloques y matriz binneada uint8).
+"""
+import numpy as np
+import pandas as pd
+
+from src.models.hgb_exoplanet import HGBExoplanetModel
+from src.utils.config import settings
+
+
+def _sample_csv(tmp_path, rows=3000):
+    csv_path = tmp_path / "kepler_sample.csv"
+    pd.read_csv(settings.get_dataset_path(), comment="#").head(rows).to_csv(csv_path, index=False)
+    return csv_path
+
+
+def test_out_of_core_matches_in_memory_training(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "MODELS_DIR", tmp_path / "models")
+    monkeypatch.setattr(settings, "PROMOTION_GATE", False)
+    monkeypatch.setattr(settings, "OOC_CHUNK_ROWS", 700)
+    csv_path = _sample_csv(tmp_path)
+
+    # Sin early stopping los bins en memoria también se ajustan sobre todo X_train
+    in_memory = HGBExoplanetModel(csv_path=csv_path, out_of_core=False, early_stopping=False)
+    in_memory.run()
+    streamed = HGBExoplanetModel(csv_path=csv_path, out_of_core=True, early_stopping=False)
+    streamed.run()
+
+    # Con menos filas que la muestra, medianas, bins y split son los mismos que en memoria
+    assert streamed.version != in_memory.version
+    assert streamed.binned.chunks == 5
+    assert streamed.X_train.dtype == np.uint8 and streamed.X_train.flags.f_contiguous
+    assert list(streamed.X_num.columns) == list(in_memory.X_num.columns)
+    assert np.array_equal(np.sort(streamed.groups_test), np.sort(in_memory.groups_test.to_numpy()))
+    assert np.array_equal(streamed.y_pred, in_memory.y_pred)
+
+    X = pd.read_csv(csv_path).head(200)
+    assert np.allclose(streamed.predict_proba(X), in_memory.predict_proba(X))
+    assert (settings.MODELS_DIR / "hgb_exoplanet_model" / streamed.version / "drift_reference.npz").exists()
+
+    # Índice de similitud sobre la muestra (aquí, todas las filas) leída por bloques
+    from src.models.similarity import SimilarityIndex
+    indexes = [SimilarityIndex.load(settings.get_version_paths("hgb_exoplanet_model", m.version)["similarity_index_path"])
+               for m in (in_memory, streamed)]
+    assert len(indexes[1]) == 3000
+    assert np.array_equal(indexes[0].ids["kepoi_name"], indexes[1].ids["kepoi_name"])
+
+
+def test_out_of_core_sketch_is_bounded(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "OOC_CHUNK_ROWS", 500)
+    monkeypatch.setattr(settings, "OOC_SKETCH_ROWS", 800)
+    model = HGBExoplanetModel(csv_path=_sample_csv(tmp_path), out_of_core=True)
+    model.sketch_data()
+    model.bin_data()
+    model.train_model()
+    model.evaluate()
+
+    assert len(model.binned.reference) <= 800 and len(model.binned.sample_positions) == 800
+    assert len(model.X_train) + len(model.X_test) == 3000
+    assert np.mean(model.y_pred == model.y_test) > 0.8
+
+
+def test_reservoir_tracks_stream_positions():
+    from src.models.out_of_core import ReservoirSketch
+
+    stream = np.arange(5000, dtype=np.float64)
+    sketch = ReservoirSketch(n_features=1, capacity=300, seed=0)
+    for block in np.array_split(stream, 7):
+        sketch.update(block[:, None], block.astype(np.int64))
+    assert sketch.seen == 5000 and sketch.filled == 300
+    assert np.array_equal(sketch.values[:, 0], sketch.positions)
+    assert len(np.unique(sketch.positions)) == 300 and sketch.positions.max() > 300
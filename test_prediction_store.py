@@ -0,0 +1,88 @@
+import os
+import time
+import hashlib
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import API.main as api
+from src.models.hot_swap import ModelHolder
+from src.utils.config import settings
+from src.utils.prediction_store import PredictionStore, prediction_store
+
+
+def test_repeated_upload_is_served_from_the_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(settings, "DRIFT_ENABLED", False)
+    client = TestClient(api.app)
+    csv = pd.read_csv(settings.get_dataset_path(), comment="#").head(30).to_csv(index=False).encode("utf-8")
+
+    first = client.post("/predict/upload", files={"file": ("a.csv", csv, "text/csv")}).json()
+    # Mismo contenido con otro nombre: misma clave
+    second = client.post("/predict/upload", files={"file": ("b.csv", csv, "text/csv")}).json()
+    assert not first.get("cached") and second["cached"] is True
+    assert second["download_url"] == first["download_url"] and second["total_planets"] == 30
+    assert len(list(tmp_path.glob("predictions_*.csv"))) == 1
+
+    # Otra versión es otro artefacto
+    third = client.post("/predict/upload?version=v1.0.1", files={"file": ("a.csv", csv, "text/csv")}).json()
+    assert not third.get("cached") and third["download_url"] != first["download_url"]
+
+    # Otro modo de validación (SCHEMA_STRICT) tampoco reutiliza la salida
+    monkeypatch.setattr(settings, "SCHEMA_STRICT", True)
+    strict = client.post("/predict/upload", files={"file": ("a.csv", csv, "text/csv")}).json()
+    assert not strict.get("cached") and strict["download_url"] != first["download_url"]
+
+
+def test_outputs_from_an_older_processing_are_not_served(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(settings, "DRIFT_ENABLED", False)
+    csv = pd.read_csv(settings.get_dataset_path(), comment="#").head(10).to_csv(index=False).encode("utf-8")
+    content_hash = hashlib.sha256(csv).hexdigest()
+    version = settings.resolve_version("hgb_exoplanet_model", "latest")
+
+    # Artefacto guardado con la clave anterior (sin versión de procesamiento ni modo estricto)
+    old_key = prediction_store.make_key(content_hash, "hgb_exoplanet_model", version, explain=False, top_k=None)
+    prediction_store.save(old_key, pd.DataFrame({"prediction_label": ["CONFIRMED"] * 10}),
+                          {"response": {"total_planets": 10}})
+
+    response = TestClient(api.app).post("/predict/upload", files={"file": ("a.csv", csv, "text/csv")}).json()
+    assert not response["cached"] and "validation" in response
+
+
+def test_eviction_by_ttl_then_least_recently_used(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    store = PredictionStore()
+    df = pd.DataFrame({"prediction": ["CONFIRMED"] * 200})
+
+    now = time.time()
+    keys = ["expired", "old", "recent"]
+    for key, age in zip(keys, (3600, 60, 10)):
+        store.save(key, df, {"response": {}})
+        for path in store._paths(key):
+            os.utime(path, (now - age, now - age))
+    size = sum(p.stat().st_size for p in store._paths("recent"))
+
+    # 'expired' supera el TTL; el resto cabe sólo si se elimina el menos usado ('old')
+    monkeypatch.setattr(settings, "PREDICTIONS_TTL_SECONDS", 1800)
+    monkeypatch.setattr(settings, "PREDICTIONS_MAX_BYTES", size + 1)
+    result = store.evict()
+    assert result["removed"] == 2 and result["remaining_bytes"] == size
+    assert [store.lookup(k) is not None for k in keys] == [False, False, True]
+
+
+def test_upload_key_uses_the_version_the_holder_serves(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(settings, "DRIFT_ENABLED", False)
+    # El holder todavía sirve v1.0.1 aunque el puntero 'latest' en disco ya apunte a otra versión
+    holder = ModelHolder("hgb_exoplanet_model", watch_interval=0)
+    holder.publish(api.load_model_by_version("hgb_exoplanet_model", "v1.0.1", schema_only=True), "v1.0.1")
+    monkeypatch.setattr(api, "model_holder", holder)
+    client = TestClient(api.app)
+    csv = pd.read_csv(settings.get_dataset_path(), comment="#").head(10).to_csv(index=False).encode("utf-8")
+
+    latest = client.post("/predict/upload", files={"file": ("a.csv", csv, "text/csv")}).json()
+    assert settings.resolve_version("hgb_exoplanet_model", "latest") != "v1.0.1"
+    assert latest["model_info"]["version"] == "v1.0.1"
+    pinned = client.post("/predict/upload?version=v1.0.1", files={"file": ("a.csv", csv, "text/csv")}).json()
+    assert pinned["cached"] is True and pinned["download_url"] == latest["download_url"]
@@ -0,0 +1,23 @@
+from src.models.hgb_exoplanet import HGBExoplanetModel
+from src.utils.config import settings
+
+
+def test_preview_is_stratified_grouped_and_not_saved():
+    versions_before = sorted(p.name for p in (settings.MODELS_DIR / "hgb_exoplanet_model").iterdir())
+
+    model = HGBExoplanetModel()
+    model.load_data()
+    model.prepare_features()
+    full_shares = model.y.value_counts(normalize=True)
+
+    result = model.preview(sample_size=1200, n_bootstrap=20)
+
+    assert 1100 <= result["sample_rows"] <= 1400
+    sample_shares = model.y.value_counts(normalize=True)
+    assert (sample_shares - full_shares).abs().max() < 0.05
+    assert not set(model.groups_train) & set(model.groups_test)
+
+    low, high = result["confidence_intervals"]["accuracy"]
+    assert low <= result["metrics"]["accuracy"] <= high
+    assert "version" not in result
+    assert sorted(p.name for p in (settings.MODELS_DIR / "hgb_exoplanet_model").iterdir()) == versions_before
@@ -0,0 +1,41 @@
+import pstats
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import API.main as api
+from src.utils.config import settings
+from src.utils.profiler import RequestProfiler
+
+
+def test_opt_in_profiles_are_bounded_and_downloadable(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(settings, "DRIFT_ENABLED", False)
+    profiler = RequestProfiler(capacity=2, sample_rate=0)
+    monkeypatch.setattr(api, "request_profiler", profiler)
+    client = TestClient(api.app)
+    csv = pd.read_csv(settings.get_dataset_path(), comment="#").head(20).to_csv(index=False).encode("utf-8")
+
+    def upload(**kwargs):
+        return client.post("/predict/upload", files={"file": ("a.csv", csv, "text/csv")}, **kwargs).json()
+
+    # Sin pedirlo (y muestreo en 0) no se perfila
+    assert "profile_id" not in upload()
+    assert client.get("/admin/profiles").json()["profiles"] == []
+
+    # Por cabecera o parámetro; el buffer conserva sólo los dos últimos
+    ids = [upload(headers={"X-Profile": "1"})["profile_id"],
+           upload(params={"profile": "true"})["profile_id"],
+           upload(headers={"X-Profile": "true"})["profile_id"]]
+    listed = [p["id"] for p in client.get("/admin/profiles").json()["profiles"]]
+    assert listed == ids[:0:-1]
+    assert client.get(f"/admin/profiles/{ids[0]}").status_code == 404
+
+    response = client.get(f"/admin/profiles/{ids[2]}")
+    assert response.headers["content-type"] == "application/octet-stream"
+    (tmp_path / "request.prof").write_bytes(response.content)
+    functions = {name for _, _, name in pstats.Stats(str(tmp_path / "request.prof")).stats}
+    assert "score_csv_file" in functions
+
+    text = client.get(f"/admin/profiles/{ids[2]}", params={"format": "text", "limit": 5}).text
+    assert "cumulative" in text
@@ -0,0 +1,80 @@
+import json
+import shutil
+
+from src.models.promotion import PromotionGate
+from src.utils.config import settings
+
+
+def _models_dir(monkeypatch, tmp_path):
+    source = settings.MODELS_DIR / "hgb_exoplanet_model"
+    for version in ("v1.0.1", "v1.0.2"):
+        shutil.copytree(source / version, tmp_path / "hgb_exoplanet_model" / version)
+    monkeypatch.setattr(settings, "MODELS_DIR", tmp_path)
+    settings.publish_latest("hgb_exoplanet_model", "v1.0.1")
+
+
+def test_gate_blocks_over_budget_versions_and_records_measurements(monkeypatch, tmp_path):
+    _models_dir(monkeypatch, tmp_path)
+
+    # Límite de tamaño imposible: se mide, se registra y 'latest' no se mueve
+    strict = PromotionGate(enabled=True, probe_rows=200, max_size_ratio=0.5, max_load_ratio=0,
+                           max_latency_ratio=0, max_accuracy_drop=0.05)
+    report = strict.promote("hgb_exoplanet_model", "v1.0.2")
+    assert not report["promoted"] and report["reason"] == "failed: model_bytes"
+    assert [c["name"] for c in report["checks"]] == ["model_bytes", "accuracy_drop"]
+    assert set(report["measurements"]) == {"v1.0.1", "v1.0.2"}
+    assert report["measurements"]["v1.0.2"]["batch_rows"] == 200
+    assert 0.9 < report["agreement"] <= 1.0
+    assert settings.resolve_version("hgb_exoplanet_model", "latest") == "v1.0.1"
+    with open(settings.get_version_paths("hgb_exoplanet_model", "v1.0.2")["promotion_path"]) as f:
+        assert json.load(f)["reason"] == "failed: model_bytes"
+
+    # Forzada: se promueve igual y queda marcado
+    report = strict.promote("hgb_exoplanet_model", "v1.0.2", force=True)
+    assert report["forced"] and settings.resolve_version("hgb_exoplanet_model", "latest") == "v1.0.2"
+
+    # Ya en servicio: no se vuelve a medir
+    assert strict.promote("hgb_exoplanet_model", "v1.0.2")["reason"] == "already latest"
+
+
+def test_gate_promotes_within_budgets(monkeypatch, tmp_path):
+    _models_dir(monkeypatch, tmp_path)
+    gate = PromotionGate(enabled=True, probe_rows=200, max_size_ratio=10, max_load_ratio=10,
+                         max_latency_ratio=10, min_accuracy=0.5, max_accuracy_drop=0.05)
+    report = gate.promote("hgb_exoplanet_model", "v1.0.2")
+    assert report["promoted"] and report["reason"] == "within budgets"
+    assert all(c["passed"] for c in report["checks"])
+    assert settings.resolve_version("hgb_exoplanet_model", "latest") == "v1.0.2"
+
+
+def test_measurement_error_is_recorded_and_blocks_promotion(monkeypatch, tmp_path):
+    _models_dir(monkeypatch, tmp_path)
+    # La candidata no se puede cargar: queda guardada pero sin promover
+    settings.get_version_paths("hgb_exoplanet_model", "v1.0.2")["model_path"].write_bytes(b"not a pickle")
+    gate = PromotionGate(enabled=True, probe_rows=200)
+    report = gate.promote("hgb_exoplanet_model", "v1.0.2")
+    assert not report["promoted"] and report["reason"] == "failed: measurement"
+    assert report["checks"][0]["name"] == "measurement" and "error" in report["checks"][0]
+    assert settings.resolve_version("hgb_exoplanet_model", "latest") == "v1.0.1"
+    with open(settings.get_version_paths("hgb_exoplanet_model", "v1.0.2")["promotion_path"]) as f:
+        assert json.load(f)["reason"] == "failed: measurement"
+
+
+def test_corrupt_baseline_does_not_block_the_candidate(monkeypatch, tmp_path):
+    _models_dir(monkeypatch, tmp_path)
+    # El modelo en servicio está dañado: se registra y la candidata se evalúa sin referencia
+    settings.get_version_paths("hgb_exoplanet_model", "v1.0.1")["model_path"].write_bytes(b"not a pickle")
+    gate = PromotionGate(enabled=True, probe_rows=200)
+    report = gate.promote("hgb_exoplanet_model", "v1.0.2")
+    assert report["promoted"] and report["reason"] == "no baseline" and report["agreement"] is None
+    assert report["baseline"] == "v1.0.1" and "baseline_error" in report
+    assert list(report["measurements"]) == ["v1.0.2"]
+    assert settings.resolve_version("hgb_exoplanet_model", "latest") == "v1.0.2"
+
+
+def test_probe_is_sampled_in_chunks_and_cached(monkeypatch):
+    monkeypatch.setattr(settings, "OOC_CHUNK_ROWS", 1000)
+    gate = PromotionGate(enabled=True, probe_rows=300)
+    probe = gate.load_probe(["koi_period", "koi_depth", "not_a_column"])
+    assert probe.shape == (300, 2) and list(probe.columns) == ["koi_period", "koi_depth"]
+    assert gate.load_probe(["koi_period", "koi_depth"]) is probe
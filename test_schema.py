@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.schema import FeatureSchema, SchemaError
+
+
+def _schema():
+    train = pd.DataFrame({"koi_period": [1.0, 50.0, np.nan], "koi_depth": [10.0, 900.0, 40.0], "koi_prad": [np.nan] * 3})
+    return FeatureSchema(["koi_period", "koi_depth", "koi_prad"], ranges=FeatureSchema.ranges_from(train))
+
+
+def test_validate_coerces_maps_absent_to_nan_and_reports_per_column():
+    X = pd.DataFrame({
+        "koi_period": ["12.5", "abc", None, "3"],
+        "koi_depth": [np.inf, 5000.0, 20.0, 5.0],
+        "kepoi_name": ["K1", "K2", "K3", "K4"],
+    })
+    aligned, report = _schema().validate(X)
+
+    assert list(aligned.columns) == ["koi_period", "koi_depth", "koi_prad"]
+    np.testing.assert_array_equal(aligned["koi_period"], [12.5, np.nan, np.nan, 3.0])
+    np.testing.assert_array_equal(aligned["koi_depth"], [np.nan, 5000.0, 20.0, 5.0])
+    assert aligned["koi_prad"].isna().all()
+
+    assert report["missing_columns"] == ["koi_prad"]
+    assert report["ignored_columns"] == ["kepoi_name"]
+    assert report["columns"]["koi_period"] == {"invalid": 1, "non_finite": 0, "out_of_range": 0, "missing": 2}
+    assert report["columns"]["koi_depth"] == {"invalid": 0, "non_finite": 1, "out_of_range": 2, "missing": 1}
+    assert report["rows_with_issues"] == 3
+
+    with pytest.raises(SchemaError) as error:
+        _schema().validate(X, strict=True)
+    assert "koi_period" in str(error.value) and error.value.report["rows"] == 4
+
+
+def test_aligned_input_is_returned_without_copy():
+    schema = _schema()
+    aligned, _ = schema.validate(pd.DataFrame({"koi_depth": [1.0, 2.0]}))
+    again, report = schema.validate(aligned, report=False)
+    assert again is aligned and report is None
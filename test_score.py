@@ -0,0 +1,49 @@
+import io
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import API.main as api
+import score
+from src.utils.config import settings
+
+
+def _kepler_sample(tmp_path, rows=300):
+    path = tmp_path / "sample.csv"
+    pd.read_csv(settings.get_dataset_path(), comment="#").head(rows).to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("drop", [[], ["koi_depth", "koi_period"]])
+def test_chunked_bulk_scoring_matches_upload(monkeypatch, tmp_path, drop):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(settings, "DRIFT_ENABLED", False)
+    sample = _kepler_sample(tmp_path)
+    # Features ausentes: las dos rutas las imputan igual
+    pd.read_csv(sample).drop(columns=drop).to_csv(sample, index=False)
+
+    summary = score.score_files([sample], version="v1.0.2", output_dir=tmp_path / "bulk",
+                                workers=2, chunk_rows=60)
+    assert summary["chunks"] >= 4 and summary["rows"] == 300
+    bulk = pd.read_csv(summary["files"][0]["output"])
+    assert list((tmp_path / "bulk").iterdir()) == [tmp_path / "bulk" / "sample_predictions_v1.0.2.csv"]
+
+    client = TestClient(api.app)
+    response = client.post("/predict/upload?version=v1.0.2",
+                           files={"file": ("sample.csv", sample.read_bytes(), "text/csv")}).json()
+    upload = pd.read_csv(io.BytesIO(client.get(response["download_url"]).content))
+    pd.testing.assert_frame_equal(bulk.drop(columns="generated_at"), upload.drop(columns="generated_at"))
+
+
+def test_failed_chunk_leaves_no_shards(tmp_path):
+    sample = _kepler_sample(tmp_path, rows=200)
+    # Una fila con campos de más hace fallar el parseo de su bloque
+    lines = sample.read_text().splitlines()
+    lines[150] += ",1,2,3"
+    sample.write_text("\n".join(lines) + "\n")
+    output_dir = tmp_path / "bulk"
+
+    with pytest.raises(Exception, match="fields"):
+        score.score_files([sample], version="v1.0.2", output_dir=output_dir, workers=2, chunk_rows=40)
+    assert list(output_dir.iterdir()) == []
@@ -0,0 +1,24 @@
+import joblib
+import pandas as pd
+
+from src.models.hgb_exoplanet import HGBExoplanetModel
+from src.models.similarity import SimilarityIndex
+from src.utils.config import settings
+
+
+def test_index_roundtrip_finds_catalog_row_and_filters_disposition(tmp_path):
+    pipe = joblib.load(settings.get_version_paths("hgb_exoplanet_model", "v1.0.2")["model_path"])
+    df = pd.read_csv(settings.get_dataset_path(), comment="#")
+
+    index = SimilarityIndex.build(pipe, df, label_mapping=HGBExoplanetModel.LABEL_MAPPING)
+    index.save(tmp_path / "similarity_index.npz")
+    loaded = SimilarityIndex.load(tmp_path / "similarity_index.npz")
+
+    query = df.iloc[[10, 20]]
+    neighbors = loaded.query(query, k=3)
+    assert [row[0]["kepoi_name"] for row in neighbors] == list(query["kepoi_name"])
+    assert all(row[0]["distance"] == 0.0 for row in neighbors)
+    assert all(row[i]["distance"] <= row[i + 1]["distance"] for row in neighbors for i in range(2))
+
+    false_positives = loaded.query(query, k=10, disposition="FALSE_POSITIVE")
+    assert all(n["disposition"] == "FALSE_POSITIVE" for row in false_positives for n in row)
@@ -0,0 +1,74 @@
+"""
+Tests del canal de predicción en streaming por WebSocket (/ws/predict).
+"""
+import json
+import time
+import asyncio
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from API import main as api
+from src.models.streaming import PredictionStream
+from src.utils.config import settings
+
+
+def _rows(n):
+    return pd.read_csv(settings.get_dataset_path(), comment="#").head(n)
+
+
+def test_stream_matches_predict_in_order(monkeypatch):
+    monkeypatch.setattr(settings, "DRIFT_ENABLED", False)
+    client = TestClient(api.app)
+    df = _rows(40)
+    with client.websocket_connect("/ws/predict") as ws:
+        ready = ws.receive_json()
+        assert ready["type"] == "ready" and ready["version"] == api.model_holder.version
+        features, classes = ready["features"], ready["classes"]
+
+        # null = faltante (lo imputa el pipeline)
+        records = df[features].astype(object).where(df[features].notna(), None).to_dict("records")
+        for record in records[:20]:
+            ws.send_text(json.dumps(record))
+        ws.send_text("not json")
+        ws.send_bytes(df[features].iloc[20:].to_numpy(dtype="<f4").tobytes())
+
+        streamed = [ws.receive_json() for _ in range(21)]
+        binary = np.frombuffer(ws.receive_bytes(), dtype="<f4").reshape(-1, len(classes))
+
+    assert [m["seq"] for m in streamed] == list(range(21))
+    assert "error" in streamed[20]
+
+    with api.model_holder.acquire() as model:
+        expected = model.predict_proba(df[features].iloc[:20])
+        expected_binary = model.predict_proba(df[features].iloc[20:].astype("float32"))
+    got = np.array([[m["predictions"][0]["probabilities"][c] for c in classes] for m in streamed[:20]])
+    assert np.allclose(got, expected)
+    assert np.allclose(binary, expected_binary, atol=1e-6)
+    assert client.get("/admin/streams").json()["rows"] >= 40
+
+
+def test_disconnect_with_a_full_queue_still_ends_the_stream():
+    class FakeSocket:
+        def __init__(self, messages):
+            self.messages = list(messages)
+            self.sent = []
+
+        async def receive(self):
+            return self.messages.pop(0)
+
+        async def send_text(self, text):
+            self.sent.append(json.loads(text))
+
+    frames = [{"type": "websocket.receive", "text": json.dumps({"x": i})} for i in range(3)]
+    socket = FakeSocket(frames + [{"type": "websocket.disconnect"}])
+
+    def score(X):
+        # Más lento que la lectura: la cola (de 1) está llena cuando llega la desconexión
+        time.sleep(0.05)
+        return np.tile([0.25, 0.75], (len(X), 1))
+
+    stream = PredictionStream(socket, score, ["x"], ["A", "B"], max_batch_rows=1, max_wait=0, max_pending=1)
+    asyncio.run(asyncio.wait_for(stream.run(), 5))
+    assert [m["seq"] for m in socket.sent] == [0, 1, 2]
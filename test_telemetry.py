@@ -0,0 +1,36 @@
+import json
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import API.main as api
+from src.models.hgb_exoplanet import HGBExoplanetModel
+from src.utils.config import settings
+
+
+STAGES = ["load_data", "prepare_features", "split_data", "train_model", "evaluate", "save_model"]
+
+
+def test_run_records_stage_telemetry_in_metadata_and_model_info(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(settings, "MODELS_DIR", tmp_path / "models")
+    monkeypatch.setattr(settings, "PROMOTION_GATE", False)
+    csv_path = tmp_path / "kepler_sample.csv"
+    pd.read_csv(settings.get_dataset_path(), comment="#").head(800).to_csv(csv_path, index=False)
+
+    model = HGBExoplanetModel(csv_path=csv_path)
+    model.run()
+    metadata_path = settings.get_version_paths("hgb_exoplanet_model", model.version)["metadata_path"]
+    metadata = json.loads(metadata_path.read_text())
+
+    stages = metadata["telemetry"]["stages"]
+    for name in STAGES:
+        assert stages[name]["wall_seconds"] >= 0 and stages[name]["cpu_seconds"] >= 0
+    assert stages["load_data"]["rows"] == 800
+    assert stages["split_data"]["train_rows"] + stages["split_data"]["test_rows"] == metadata["rows"]
+    assert stages["save_model"]["model_bytes"] == metadata["model_bytes"] > 0
+    assert metadata["telemetry"]["total_wall_seconds"] >= stages["train_model"]["wall_seconds"]
+
+    response = TestClient(api.app).get(f"/model-info/hgb_exoplanet_model/{model.version}")
+    assert response.status_code == 200
+    assert response.json()["training"]["telemetry"]["stages"].keys() >= set(STAGES)
@@ -0,0 +1,39 @@
+"""
+Tests de la captura de tráfico y su reproducción con replay.py.
+"""
+import json
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import API.main as api
+from replay import PayloadFactory, build_request
+from src.utils.config import settings
+from src.utils.traffic import traffic_recorder
+
+
+def test_captured_requests_replay_with_same_shape(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(settings, "DRIFT_ENABLED", False)
+    monkeypatch.setattr(traffic_recorder, "sample_rate", 1.0)
+    monkeypatch.setattr(traffic_recorder, "path", tmp_path / "traffic.jsonl")
+
+    client = TestClient(api.app)
+    payload = {"data": [{"koi_period": 10.5, "koi_duration": 2.1, "koi_depth": 100.0}]}
+    csv = pd.read_csv(settings.get_dataset_path(), comment="#").head(50).to_csv(index=False).encode("utf-8")
+    assert client.post("/predict?version=v1.0.2", json=payload).status_code == 200
+    assert client.post("/predict/upload", files={"file": ("a.csv", csv, "text/csv")}).status_code == 200
+    assert client.get("/admin/traffic").status_code == 200
+    assert traffic_recorder.flush() == 2
+
+    entries = [json.loads(line) for line in (tmp_path / "traffic.jsonl").read_text().splitlines()]
+    predict, upload = entries
+    assert predict["payload"] == payload and predict["version"] == "v1.0.2" and predict["status"] == 200
+    assert upload["payload"] is None and upload["shape"]["rows"] == 50
+
+    factory = PayloadFactory(settings.get_dataset_path())
+    method, url, body, headers = build_request(predict, factory)
+    assert (method, url, json.loads(body)) == ("POST", "/predict?version=v1.0.2", payload)
+    method, url, body, headers = build_request(upload, factory)
+    assert headers["Content-Type"].startswith("multipart/form-data")
+    assert client.post(url, content=body, headers=headers).json()["total_planets"] == 50
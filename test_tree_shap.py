@@ -0,0 +1,60 @@
+"""
+Tests del explicador TreeSHAP para HistGradientBoostingClassifier.
+"""
+import numpy as np
+import pandas as pd
+
+from sklearn.pipeline import Pipeline
+from sklearn.impute import SimpleImputer
+from sklearn.ensemble import HistGradientBoostingClassifier
+
+from src.models.tree_shap import HGBTreeExplainer
+
+
+def _fit_pipeline(n_classes: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(600, 6)), columns=[f"f{i}" for i in range(6)])
+    X.iloc[rng.integers(0, 600, 40), 2] = np.nan
+    score = X["f0"].fillna(0) + 0.5 * X["f1"] * X["f3"]
+    y = pd.cut(score, bins=n_classes, labels=[f"c{i}" for i in range(n_classes)]).astype(str)
+    pipe = Pipeline(steps=[
+        ("imputer", SimpleImputer(strategy="median")),
+        ("hgb", HistGradientBoostingClassifier(max_iter=30, max_leaf_nodes=15, random_state=seed)),
+    ])
+    pipe.fit(X, y)
+    return pipe, X
+
+
+def test_contributions_sum_to_raw_margin_multiclass():
+    pipe, X = _fit_pipeline(n_classes=3)
+    explainer = HGBTreeExplainer(pipe)
+
+    phi = explainer.shap_values(X)
+    reconstructed = phi.sum(axis=1) + explainer.expected_value
+
+    assert phi.shape == (len(X), X.shape[1], 3)
+    np.testing.assert_allclose(reconstructed, explainer.raw_margin(X), atol=1e-8)
+
+
+def test_contributions_sum_to_raw_margin_binary():
+    pipe, X = _fit_pipeline(n_classes=2, seed=1)
+    explainer = HGBTreeExplainer(pipe, chunk_size=128)
+
+    phi = explainer.shap_values(X)
+    reconstructed = phi.sum(axis=1) + explainer.expected_value
+
+    np.testing.assert_allclose(reconstructed, explainer.raw_margin(X), atol=1e-8)
+
+
+def test_top_contributions_are_sorted_by_magnitude():
+    pipe, X = _fit_pipeline(n_classes=3)
+    explainer = HGBTreeExplainer(pipe)
+
+    top = explainer.top_contributions(X.head(20), top_k=3)
+
+    assert len(top) == 20
+    for row in top:
+        assert len(row) == 3
+        magnitudes = [abs(item["contribution"]) for item in row]
+        assert magnitudes == sorted(magnitudes, reverse=True)
+        assert all(item["feature"] in X.columns for item in row)